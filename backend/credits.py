@@ -129,6 +129,12 @@ async def use_credits(user_id: str, feature: str, amount: int = None) -> tuple[b
         }
     )
     
+    try:
+        from services.ai_usage import record_credit_event
+        await record_credit_event(user_id, feature, cost)
+    except Exception:
+        pass  # Don't fail the AI request if the usage event can't be written
+    
     # Get updated credits
     updated_credits = await get_user_credits(user_id)
     
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import logging
 import os
 
 # MongoDB connection
@@ -8,5 +9,63 @@ db_name = os.environ.get('DB_NAME', 'instagrowth_db')
 client = AsyncIOMotorClient(mongo_url)
 db = client[db_name]
 
+logger = logging.getLogger(__name__)
+
 def get_database():
     return db
+
+# Indexes the list/lookup queries rely on: collection -> [(keys, options)]
+INDEXES = {
+    "users": [
+        ([("user_id", 1)], {"unique": True}),
+        ([("created_at", -1), ("user_id", -1)], {}),
+        ([("search_terms", 1)], {}),
+        ([("ai_usage_current", -1)], {}),
+    ],
+    "instagram_accounts": [
+        ([("user_id", 1)], {}),
+        ([("created_at", -1), ("account_id", -1)], {}),
+        ([("search_terms", 1)], {}),
+    ],
+    "audits": [([("user_id", 1)], {}), ([("created_at", -1)], {})],
+    "subscriptions": [
+        ([("created_at", -1), ("subscription_id", -1)], {}),
+        ([("status", 1), ("cancelled_at", -1)], {}),
+    ],
+    "plans": [([("plan_id", 1)], {})],
+    "revenue_snapshots": [([("date", 1)], {"unique": True})],
+    "support_tickets": [
+        ([("created_at", -1), ("ticket_id", -1)], {}),
+        ([("search_terms", 1)], {}),
+        ([("user_id", 1), ("created_at", -1)], {}),
+    ],
+    "ticket_messages": [([("ticket_id", 1), ("created_at", -1), ("message_id", -1)], {})],
+    "credit_events": [([("created_at", -1)], {}), ([("user_id", 1), ("created_at", -1)], {})],
+    "content_items": [([("created_at", -1)], {})],
+    "growth_plans": [([("created_at", -1)], {})],
+    "deletion_jobs": [([("job_id", 1)], {"unique": True}), ([("status", 1), ("run_after", 1)], {})],
+    "admin_logs": [([("created_at", -1), ("log_id", -1)], {}), ([("log_id", 1)], {"unique": True})],
+    "assets": [([("hash", 1)], {"unique": True})],
+    "notifications": [([("user_id", 1), ("created_at", -1)], {})],
+    # TTL expiry (see services/retention.py)
+    "oauth_states": [([("state", 1)], {}), ([("expire_at", 1)], {"expireAfterSeconds": 0})],
+    "user_sessions": [([("session_token", 1)], {}), ([("expire_at", 1)], {"expireAfterSeconds": 0})],
+    "admin_logs_archive": [([("day", 1), ("first_id", 1)], {"unique": True})],
+    "email_logs_archive": [([("day", 1), ("first_id", 1)], {"unique": True}), ([("subjects", 1)], {})],
+    "notification_counters": [([("user_id", 1)], {"unique": True})],
+    "posting_time_stats": [([("account_id", 1)], {"unique": True})],
+    "posting_time_niches": [([("niche", 1)], {"unique": True})],
+    "niche_benchmarks": [([("niche", 1)], {"unique": True})],
+    "user_dismissed_announcements": [
+        ([("user_id", 1)], {"unique": True, "partialFilterExpression": {"announcement_ids": {"$exists": True}}})
+    ],
+}
+
+async def ensure_indexes():
+    """Create the registered indexes (idempotent, called on startup)"""
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.warning(f"Could not create index {keys} on {collection}: {e}")
@@ -115,17 +115,6 @@ async def increment_ai_usage(user_id: str, db, feature: str = "content"):
     return success, result
 
 async def create_notification(user_id: str, type: str, title: str, message: str, action_url: Optional[str], db):
-    """Create a notification for a user"""
-    import uuid
-    notification_doc = {
-        "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
-        "user_id": user_id,
-        "type": type,
-        "title": title,
-        "message": message,
-        "read": False,
-        "action_url": action_url,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    await db.notifications.insert_one(notification_doc)
-    return notification_doc
+    """Create a notification for a user (written in the next notification batch)"""
+    from services.notifications import get_notification_service
+    return await get_notification_service().create(user_id, type, title, message, action_url)
@@ -1,7 +1,38 @@
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union, get_args, get_origin
 from datetime import datetime
 
+def list_projection(model, exclude: tuple = ()) -> Dict[str, int]:
+    """Mongo projection that fetches exactly the fields of a response model"""
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in model.model_fields if field not in exclude})
+    return projection
+
+def _is_int(annotation) -> bool:
+    if get_origin(annotation) is Union:
+        return any(_is_int(arg) for arg in get_args(annotation) if arg is not type(None))
+    return annotation is int
+
+def response_projection(model, exclude: tuple = ()) -> Dict[str, Any]:
+    """Mongo projection returning documents already in the response model's shape
+
+    Every field is present, missing or null fields get the model default and
+    int fields are converted, so the rows can be serialized without
+    response_model validation (see utils.trusted_response).
+    """
+    projection: Dict[str, Any] = {"_id": 0}
+    for name, field in model.model_fields.items():
+        if name in exclude:
+            continue
+        value: Any = f"${name}"
+        if not field.is_required():
+            default = field.get_default(call_default_factory=True)
+            value = {"$ifNull": [value, {"$literal": default}]}
+        if _is_int(field.annotation):
+            value = {"$toInt": value}
+        projection[name] = value
+    return projection
+
 # User Models
 class UserCreate(BaseModel):
     email: EmailStr
@@ -99,6 +130,13 @@ class InstagramAccountCreate(BaseModel):
     client_name: Optional[str] = None
     client_email: Optional[str] = None
 
+class BulkAccountImport(BaseModel):
+    accounts: List[InstagramAccountCreate]
+    enrich: bool = False  # AI estimates in the background
+
+class BulkAccountRefresh(BaseModel):
+    account_ids: Optional[List[str]] = None  # all of the user's accounts when omitted
+
 class InstagramAccountUpdate(BaseModel):
     username: Optional[str] = None
     niche: Optional[str] = None
@@ -134,6 +172,7 @@ class InstagramAccount(BaseModel):
     estimated_reach: Optional[int] = None
     posting_frequency: Optional[str] = None
     best_posting_time: Optional[str] = None
+    data_source: Optional[str] = None  # "niche_benchmark", "ai_estimated" or "instagram_api"
     last_audit_date: Optional[datetime] = None
     last_refreshed: Optional[str] = None
     status: str = "active"
@@ -163,6 +202,16 @@ class Audit(BaseModel):
     content_analysis: Optional[str] = None
     created_at: datetime
 
+class AuditSummary(BaseModel):
+    """Audit list row (the full audit is fetched by id)"""
+    audit_id: str
+    account_id: str
+    username: str
+    engagement_score: int
+    shadowban_risk: str
+    content_consistency: int
+    created_at: datetime
+
 # Content Models
 class ContentRequest(BaseModel):
     account_id: str
@@ -198,6 +247,15 @@ class GrowthPlan(BaseModel):
     metrics_at_creation: Optional[Dict[str, Any]] = None
     created_at: datetime
 
+class GrowthPlanSummary(BaseModel):
+    """Growth plan list row without daily_tasks (the full plan is fetched by id)"""
+    plan_id: str
+    account_id: str
+    duration: int
+    task_count: int = 0
+    based_on_real_data: Optional[bool] = None
+    created_at: datetime
+
 # DM Template Models
 class DMTemplateCreate(BaseModel):
     name: str
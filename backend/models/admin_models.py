@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -64,15 +64,24 @@ class Plan(BaseModel):
     status: str = "active"
     created_at: str
 
-# System Settings
+# System Settings (immutable snapshot of the "global" system_settings document)
 class SystemSettings(BaseModel):
+    model_config = ConfigDict(extra="allow", frozen=True)
+    version: int = 0
     platform_name: str = "InstaGrowth OS"
     support_email: str = "support@instagrowth.com"
     default_ai_model: str = "gpt-5.2"
+    sender_email: Optional[str] = None
     openai_api_key: Optional[str] = None
-    stripe_api_key: Optional[str] = None
+    stripe_secret_key: Optional[str] = None
+    stripe_publishable_key: Optional[str] = None
+    stripe_webhook_secret: Optional[str] = None
     resend_api_key: Optional[str] = None
-    meta_api_key: Optional[str] = None
+    meta_app_id: Optional[str] = None
+    meta_app_secret: Optional[str] = None
+    meta_access_token: Optional[str] = None
+    instagram_business_id: Optional[str] = None
+    graph_api_token: Optional[str] = None
 
 # IP Whitelist
 class IPWhitelistEntry(BaseModel):
@@ -1,29 +1,41 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
 from datetime import datetime, timezone
 from typing import List, Optional
 import uuid
 
-from models import InstagramAccount, InstagramAccountCreate, InstagramAccountUpdate
+from models import InstagramAccount, InstagramAccountCreate, InstagramAccountUpdate, BulkAccountImport, BulkAccountRefresh, list_projection
 from database import get_database
 from dependencies import get_current_user, get_user_with_team_access, check_account_limit, check_ai_usage, increment_ai_usage
-from services import estimate_instagram_metrics, generate_posting_recommendations
+from services import estimate_instagram_metrics, generate_posting_narrative
+from routers.admin_websocket import notify_new_account
+from services.counters import get_counters
+from services.search import with_search_terms, refresh_search_terms
+from services.posting_times import get_posting_time_engine
+from services.benchmarks import get_niche_benchmarks, enrich_account, ai_estimate_fields, ACCOUNT_AI_ENRICHMENT
+from services.bulk_accounts import import_accounts, normalize_username, parse_csv, refresh_accounts, run_in_background
 
 router = APIRouter(prefix="/accounts", tags=["Instagram Accounts"])
 
+# OAuth tokens never leave the server in list responses
+ACCOUNT_LIST_PROJECTION = list_projection(InstagramAccount, exclude=("access_token", "token_expires_at"))
+
 @router.post("", response_model=InstagramAccount)
 async def create_account(data: InstagramAccountCreate, request: Request):
     db = get_database()
     user = await get_current_user(request, db)
     await check_account_limit(user, db)
     
-    metrics = await estimate_instagram_metrics(data.username, data.niche)
+    metrics = get_niche_benchmarks().estimate(data.niche)
+    username = normalize_username(data.username)
+    if not username:
+        raise HTTPException(status_code=400, detail="Username is required")
     
     account_id = f"acc_{uuid.uuid4().hex[:12]}"
     account_doc = {
         "account_id": account_id,
         "user_id": user.user_id,
         "team_id": user.team_id,
-        "username": data.username,
+        "username": username,
         "niche": data.niche,
         "notes": data.notes,
         "client_name": data.client_name,
@@ -33,13 +45,44 @@ async def create_account(data: InstagramAccountCreate, request: Request):
         "estimated_reach": metrics.get("estimated_reach"),
         "posting_frequency": metrics.get("posting_frequency"),
         "best_posting_time": metrics.get("best_posting_time"),
+        "data_source": "niche_benchmark",
         "last_audit_date": None,
         "status": "active",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.instagram_accounts.insert_one(account_doc)
+    await db.instagram_accounts.insert_one(with_search_terms("instagram_accounts", account_doc))
+    await get_counters().record(user.user_id, "accounts_count", 1)
+    
+    try:
+        await notify_new_account(account_doc)
+    except Exception:
+        pass  # Don't fail account creation if admin notification fails
+    if ACCOUNT_AI_ENRICHMENT:
+        run_in_background(enrich_account(account_id, user.user_id, username, data.niche))
     return InstagramAccount(**account_doc)
 
+@router.post("/import")
+async def import_accounts_json(data: BulkAccountImport, request: Request):
+    """Add up to BULK_MAX_ACCOUNTS accounts at once (progress of enrichment arrives over the WebSocket)"""
+    db = get_database()
+    user = await get_current_user(request, db)
+    return await import_accounts(user, [account.model_dump() for account in data.accounts], enrich=data.enrich)
+
+@router.post("/import/csv")
+async def import_accounts_csv(file: UploadFile = File(...), enrich: bool = False, request: Request = None):
+    """CSV import with columns username, niche, notes, client_name, client_email"""
+    db = get_database()
+    user = await get_current_user(request, db)
+    
+    rows = parse_csv(await file.read())
+    return await import_accounts(user, rows, enrich=enrich)
+
+@router.post("/bulk-refresh")
+async def bulk_refresh_accounts(data: BulkAccountRefresh, request: Request):
+    db = get_database()
+    user = await get_current_user(request, db)
+    return await refresh_accounts(user, data.account_ids)
+
 @router.get("", response_model=List[InstagramAccount])
 async def get_accounts(request: Request):
     db = get_database()
@@ -49,8 +92,8 @@ async def get_accounts(request: Request):
     if team_ids:
         query["$or"].append({"team_id": {"$in": team_ids}})
     
-    accounts = await db.instagram_accounts.find(query, {"_id": 0}).to_list(100)
-    return [InstagramAccount(**acc) for acc in accounts]
+    # Accounts are written by several paths (OAuth, sync, imports), so they are validated
+    return await db.instagram_accounts.find(query, ACCOUNT_LIST_PROJECTION).to_list(100)
 
 @router.get("/{account_id}", response_model=InstagramAccount)
 async def get_account(account_id: str, request: Request):
@@ -83,6 +126,8 @@ async def update_account(account_id: str, data: InstagramAccountUpdate, request:
         raise HTTPException(status_code=404, detail="Account not found")
     
     account = await db.instagram_accounts.find_one({"account_id": account_id}, {"_id": 0})
+    if "username" in update_data or "niche" in update_data:
+        await refresh_search_terms("instagram_accounts", {"account_id": account_id}, account)
     return InstagramAccount(**account)
 
 @router.delete("/{account_id}")
@@ -93,6 +138,9 @@ async def delete_account(account_id: str, request: Request):
     result = await db.instagram_accounts.delete_one({"account_id": account_id, "user_id": user.user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Account not found")
+    await get_counters().record(user.user_id, "accounts_count", -1)
+    await db.posting_time_stats.delete_one({"account_id": account_id})
+    await get_posting_time_engine().invalidate(account_id)
     return {"message": "Account deleted"}
 
 @router.post("/{account_id}/refresh-metrics")
@@ -108,22 +156,17 @@ async def refresh_account_metrics(account_id: str, request: Request):
     
     await check_ai_usage(user, db, feature="audit")
     metrics = await estimate_instagram_metrics(account["username"], account["niche"])
+    fields = ai_estimate_fields(metrics) if metrics else {}
+    if not fields:
+        raise HTTPException(status_code=502, detail="Could not estimate metrics right now. Please try again.")
     
-    await db.instagram_accounts.update_one(
-        {"account_id": account_id},
-        {"$set": {
-            "follower_count": metrics.get("estimated_followers"),
-            "engagement_rate": metrics.get("estimated_engagement_rate"),
-            "estimated_reach": metrics.get("estimated_reach"),
-            "posting_frequency": metrics.get("posting_frequency"),
-            "best_posting_time": metrics.get("best_posting_time")
-        }}
-    )
+    await db.instagram_accounts.update_one({"account_id": account_id}, {"$set": fields})
     await increment_ai_usage(user.user_id, db, feature="audit")
     return metrics
 
 @router.get("/{account_id}/posting-recommendations")
-async def get_posting_recommendations(account_id: str, request: Request):
+async def get_posting_recommendations(account_id: str, request: Request, narrative: bool = False):
+    """Posting slots ranked from the account's engagement history; `narrative` adds an AI explanation (uses credits)"""
     db = get_database()
     user = await get_current_user(request, db)
     
@@ -133,14 +176,21 @@ async def get_posting_recommendations(account_id: str, request: Request):
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    await check_ai_usage(user, db, feature="posting_recommendations")
-    
-    current_metrics = {
-        "estimated_followers": account.get("follower_count"),
-        "estimated_engagement_rate": account.get("engagement_rate")
-    }
-    recommendations = await generate_posting_recommendations(
-        account["username"], account["niche"], current_metrics
-    )
-    await increment_ai_usage(user.user_id, db, feature="posting_recommendations")
+    engine = get_posting_time_engine()
+    recommendations = await engine.get_schedule(account_id, account.get("niche"))
+    needs_history = recommendations["data_source"] != "account_history" and account.get("access_token")
+    if needs_history and await engine.claim_cold_start(account_id):
+        # Cold start: pull the account's media (retried after a backoff, not per request)
+        from routers.audits import fetch_instagram_media
+        media = await fetch_instagram_media(account["access_token"], limit=25)
+        if await engine.ingest(account_id, account.get("niche"), media):
+            recommendations = await engine.get_schedule(account_id, account.get("niche"))
+    
+    if narrative:
+        await check_ai_usage(user, db, feature="posting_recommendations")
+        recommendations = {
+            **recommendations,
+            "reasoning": await generate_posting_narrative(account["username"], account["niche"], recommendations)
+        }
+        await increment_ai_usage(user.user_id, db, feature="posting_recommendations")
     return recommendations
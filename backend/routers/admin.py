@@ -4,6 +4,7 @@ from typing import Optional
 
 from database import get_database
 from dependencies import get_current_user
+from services.cascade import enqueue_user_deletion
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -94,11 +95,10 @@ async def delete_user(user_id: str, request: Request):
     if user_id == admin.user_id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
-    await db.users.delete_one({"user_id": user_id})
-    await db.instagram_accounts.delete_many({"user_id": user_id})
-    await db.audits.delete_many({"user_id": user_id})
-    await db.content_items.delete_many({"user_id": user_id})
-    await db.growth_plans.delete_many({"user_id": user_id})
-    await db.notifications.delete_many({"user_id": user_id})
+    user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "email": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    job_id = await enqueue_user_deletion(user_id, user.get("email"), "admin", admin.user_id)
     
-    return {"message": "User and related data deleted"}
+    return {"message": "User deletion started", "job_id": job_id}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List
 import uuid
@@ -12,6 +12,8 @@ import secrets
 
 from database import get_database
 from utils import hash_password, verify_password, JWT_SECRET
+from services.audit_log import get_audit_log_sink
+from services.admin_principals import get_admin_principal_cache
 
 router = APIRouter(prefix="/admin-panel", tags=["Admin Panel"])
 
@@ -25,6 +27,10 @@ ROLE_PERMISSIONS = {
     "finance": ["subscriptions", "revenue", "plans"]
 }
 
+# Precompiled for O(1) permission checks
+ROLE_PERMISSION_SETS = {role: frozenset(permissions) for role, permissions in ROLE_PERMISSIONS.items()}
+NO_PERMISSIONS = frozenset()
+
 def create_admin_token(admin_id: str, email: str, role: str, expires_hours: int = 8) -> str:
     payload = {
         "admin_id": admin_id,
@@ -36,7 +42,10 @@ def create_admin_token(admin_id: str, email: str, role: str, expires_hours: int
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 async def verify_admin_token(request: Request):
-    db = get_database()
+    # Resolved once per request, however many times an endpoint asks
+    cached = getattr(request.state, "admin", None)
+    if cached is not None:
+        return cached
     
     admin_token = request.cookies.get("admin_panel_token")
     if not admin_token:
@@ -52,10 +61,11 @@ async def verify_admin_token(request: Request):
         if not payload.get("is_admin_panel"):
             raise HTTPException(status_code=403, detail="Invalid admin token")
         
-        admin = await db.admins.find_one({"admin_id": payload["admin_id"]}, {"_id": 0})
+        admin = await get_admin_principal_cache().get(payload["admin_id"])
         if not admin or admin.get("status") != "active":
             raise HTTPException(status_code=403, detail="Admin account disabled")
         
+        request.state.admin = admin
         return admin
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Admin session expired")
@@ -63,14 +73,21 @@ async def verify_admin_token(request: Request):
         raise HTTPException(status_code=401, detail="Invalid admin token")
 
 async def check_permission(admin: dict, resource: str):
-    role = admin.get("role", "support")
-    permissions = ROLE_PERMISSIONS.get(role, [])
+    permissions = ROLE_PERMISSION_SETS.get(admin.get("role", "support"), NO_PERMISSIONS)
     
     if "*" not in permissions and resource not in permissions:
         raise HTTPException(status_code=403, detail=f"No permission to access {resource}")
 
+def require_permission(resource: str):
+    """Dependency form: `admin: dict = Depends(require_permission("users"))`"""
+    async def dependency(request: Request) -> dict:
+        admin = await verify_admin_token(request)
+        await check_permission(admin, resource)
+        return admin
+    return dependency
+
 async def log_admin_action(admin: dict, action: str, target_type: str, target_id: str = None, details: dict = None, ip: str = None):
-    db = get_database()
+    """Queue an admin_logs entry (written in batches by the audit log sink)"""
     log_doc = {
         "log_id": f"log_{uuid.uuid4().hex[:12]}",
         "admin_id": admin["admin_id"],
@@ -82,7 +99,7 @@ async def log_admin_action(admin: dict, action: str, target_type: str, target_id
         "ip_address": ip or "unknown",
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.admin_logs.insert_one(log_doc)
+    await get_audit_log_sink().submit(log_doc)
 
 def get_client_ip(request: Request) -> str:
     forwarded = request.headers.get("X-Forwarded-For")
@@ -133,7 +150,7 @@ async def admin_panel_login(email: str, password: str, admin_code: str, totp_cod
     
     # Verify admin code
     if admin_code != ADMIN_SECRET_CODE:
-        await db.admin_logs.insert_one({
+        await get_audit_log_sink().submit({
             "log_id": f"log_{uuid.uuid4().hex[:12]}",
             "admin_id": None,
             "admin_email": email,
@@ -273,6 +290,7 @@ async def verify_and_enable_2fa(totp_code: str, request: Request):
             "$unset": {"pending_2fa_secret": "", "pending_backup_codes": ""}
         }
     )
+    await get_admin_principal_cache().invalidate(admin["admin_id"])
     
     await log_admin_action(admin, "enable_2fa", "security", admin["admin_id"], {}, get_client_ip(request))
     
@@ -292,6 +310,7 @@ async def disable_2fa(password: str, request: Request):
         {"admin_id": admin["admin_id"]},
         {"$set": {"is_2fa_enabled": False, "totp_secret": None, "backup_codes": []}}
     )
+    await get_admin_principal_cache().invalidate(admin["admin_id"])
     
     await log_admin_action(admin, "disable_2fa", "security", admin["admin_id"], {}, get_client_ip(request))
     
@@ -310,9 +329,8 @@ async def admin_panel_logout(request: Request, response: Response):
     return {"message": "Logged out"}
 
 @router.get("/auth/me")
-async def get_current_admin(request: Request):
+async def get_current_admin(admin: dict = Depends(verify_admin_token)):
     """Get current admin info"""
-    admin = await verify_admin_token(request)
     return {
         "admin_id": admin["admin_id"],
         "name": admin["name"],
@@ -349,6 +367,7 @@ async def add_ip_to_whitelist(ip_address: str, description: str = "", request: R
         {"admin_id": admin["admin_id"]},
         {"$push": {"allowed_ips": entry}}
     )
+    await get_admin_principal_cache().invalidate(admin["admin_id"])
     
     await log_admin_action(admin, "add_ip_whitelist", "security", None, {"ip": ip_address}, get_client_ip(request))
     
@@ -364,6 +383,7 @@ async def remove_ip_from_whitelist(ip_address: str, request: Request):
         {"admin_id": admin["admin_id"]},
         {"$pull": {"allowed_ips": {"ip": ip_address}}}
     )
+    await get_admin_principal_cache().invalidate(admin["admin_id"])
     
     await log_admin_action(admin, "remove_ip_whitelist", "security", None, {"ip": ip_address}, get_client_ip(request))
     
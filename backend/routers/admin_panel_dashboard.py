@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 import uuid
 
 from database import get_database
-from routers.admin_panel_auth import verify_admin_token, check_permission, log_admin_action, get_client_ip
+from routers.admin_panel_auth import verify_admin_token, check_permission, require_permission, log_admin_action, get_client_ip
+from services.settings_cache import get_settings_cache
+from services.counters import get_counters
+from services.admin_lists import one_lookup
+from services.pagination import keyset_page
+from services import ai_usage
+from services.revenue import get_revenue_engine
+from services.search import search_filter, rank_stages, SEARCH_TERMS_FIELD
+from services.retention import read_archive, list_archive_days
+from services.admin_principals import get_admin_principal_cache
 
 router = APIRouter(prefix="/admin-panel", tags=["Admin Panel - Dashboard & Analytics"])
 
@@ -16,17 +25,20 @@ async def get_dashboard_stats(request: Request):
     db = get_database()
     admin = await verify_admin_token(request)
     
+    # Accounts/audits/content come from in-memory counters (live deltas on the "dashboard" channel)
+    counters = await get_counters().get_global_counters()
+    
     # Basic counts
     total_users = await db.users.count_documents({})
     active_subscriptions = await db.subscriptions.count_documents({"status": "active"})
-    total_accounts = await db.instagram_accounts.count_documents({})
-    total_audits = await db.audits.count_documents({})
-    total_content = await db.content_items.count_documents({})
+    total_accounts = counters["total_accounts"]
+    total_audits = counters["total_audits"]
+    total_content = counters["total_content"]
     
     # Today's stats
     today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
     new_users_today = await db.users.count_documents({"created_at": {"$gte": today_start}})
-    audits_today = await db.audits.count_documents({"created_at": {"$gte": today_start}})
+    audits_today = counters["audits_today"]
     
     # AI usage
     ai_requests_today = await db.users.aggregate([
@@ -158,112 +170,27 @@ async def get_ai_usage_chart(days: int = 30, request: Request = None):
 @router.get("/revenue/stats")
 async def get_revenue_stats(request: Request):
     """Get revenue statistics"""
-    db = get_database()
     admin = await verify_admin_token(request)
     await check_permission(admin, "revenue")
     
-    # Calculate MRR
-    active_subs = await db.subscriptions.find({"status": "active"}, {"_id": 0}).to_list(10000)
-    
-    PLAN_PRICES = {
-        "starter": 19,
-        "pro": 49,
-        "agency": 149,
-        "enterprise": 299
-    }
-    
-    mrr = sum(PLAN_PRICES.get(sub.get("plan_id", "starter"), 0) for sub in active_subs)
-    arr = mrr * 12
-    
-    # Total users for churn calculation
-    total_users = await db.users.count_documents({})
-    cancelled_last_month = await db.subscriptions.count_documents({
-        "status": "cancelled",
-        "cancelled_at": {"$gte": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()}
-    })
-    churn_rate = (cancelled_last_month / total_users * 100) if total_users > 0 else 0
-    
-    # ARPU
-    arpu = mrr / total_users if total_users > 0 else 0
-    
-    # Revenue by plan
-    revenue_by_plan = {}
-    for plan, price in PLAN_PRICES.items():
-        count = await db.users.count_documents({"role": plan})
-        revenue_by_plan[plan] = count * price
-    
-    # Total revenue
-    total_transactions = await db.payment_transactions.aggregate([
-        {"$match": {"status": "completed"}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-    ]).to_list(1)
-    total_revenue = total_transactions[0]["total"] if total_transactions else 0
+    return await get_revenue_engine().get_stats()
+
+@router.get("/revenue/trends")
+async def get_revenue_trends(days: int = 90, request: Request = None):
+    """Get daily revenue snapshots (MRR, ARR, ARPU, churn) for trend charts"""
+    admin = await verify_admin_token(request)
+    await check_permission(admin, "revenue")
     
-    return {
-        "mrr": mrr,
-        "arr": arr,
-        "churn_rate": round(churn_rate, 2),
-        "arpu": round(arpu, 2),
-        "total_revenue": total_revenue,
-        "revenue_by_plan": revenue_by_plan,
-        "active_subscriptions": len(active_subs)
-    }
+    return {"snapshots": await get_revenue_engine().get_trends(min(max(days, 1), 730))}
 
 # ==================== AI USAGE ANALYTICS ====================
 
 @router.get("/ai-usage/stats")
-async def get_ai_usage_stats(request: Request):
+async def get_ai_usage_stats(request: Request, top: int = 10):
     """Get AI usage statistics"""
-    db = get_database()
     admin = await verify_admin_token(request)
     
-    # Total usage
-    users = await db.users.find({}, {"_id": 0, "user_id": 1, "name": 1, "email": 1, "ai_usage_current": 1, "ai_usage_limit": 1, "role": 1}).to_list(10000)
-    
-    total_usage = sum(u.get("ai_usage_current", 0) for u in users)
-    
-    # Today's usage (from content and audits)
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    
-    content_today = await db.content_items.count_documents({"created_at": {"$gte": today_start}})
-    audits_today = await db.audits.count_documents({"created_at": {"$gte": today_start}})
-    growth_plans_today = await db.growth_plans.count_documents({"created_at": {"$gte": today_start}})
-    
-    requests_today = content_today + audits_today + growth_plans_today
-    
-    # This month
-    month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
-    
-    content_month = await db.content_items.count_documents({"created_at": {"$gte": month_start}})
-    audits_month = await db.audits.count_documents({"created_at": {"$gte": month_start}})
-    growth_plans_month = await db.growth_plans.count_documents({"created_at": {"$gte": month_start}})
-    
-    requests_month = content_month + audits_month + growth_plans_month
-    
-    # Estimated cost (assuming $0.01 per request)
-    COST_PER_REQUEST = 0.01
-    estimated_cost = requests_month * COST_PER_REQUEST
-    
-    # Usage by feature
-    usage_by_feature = {
-        "content_generation": content_month,
-        "audits": audits_month,
-        "growth_plans": growth_plans_month
-    }
-    
-    # Top users
-    top_users = sorted(users, key=lambda x: x.get("ai_usage_current", 0), reverse=True)[:10]
-    
-    return {
-        "total_requests_today": requests_today,
-        "total_requests_month": requests_month,
-        "estimated_cost_month": round(estimated_cost, 2),
-        "usage_by_feature": usage_by_feature,
-        "top_users": [
-            {"user_id": u["user_id"], "name": u.get("name", ""), "email": u.get("email", ""), "usage": u.get("ai_usage_current", 0), "limit": u.get("ai_usage_limit", 0), "plan": u.get("role", "starter")}
-            for u in top_users
-        ]
-    }
+    return await ai_usage.get_ai_usage_stats(top_n=min(max(top, 1), 100))
 
 # ==================== INSTAGRAM ACCOUNTS ====================
 
@@ -273,6 +200,8 @@ async def get_all_instagram_accounts(
     limit: int = 50,
     status: str = None,
     search: str = None,
+    cursor: str = None,
+    count: str = "cached",
     request: Request = None
 ):
     """Get all Instagram accounts"""
@@ -284,20 +213,19 @@ async def get_all_instagram_accounts(
     if status:
         query["status"] = status
     if search:
-        query["$or"] = [
-            {"username": {"$regex": search, "$options": "i"}},
-            {"niche": {"$regex": search, "$options": "i"}}
-        ]
-    
-    accounts = await db.instagram_accounts.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.instagram_accounts.count_documents(query)
-    
-    # Enrich with owner info
-    for acc in accounts:
-        user = await db.users.find_one({"user_id": acc.get("user_id")}, {"_id": 0, "name": 1, "email": 1})
-        acc["owner"] = user
+        query.update(search_filter(search))
+    
+    # Page and owner info in a single aggregation; total is cached
+    # Searches are ranked by relevance, newest first otherwise
+    page = await keyset_page(
+        db.instagram_accounts, query, "search_score" if search else "created_at", "account_id", -1, limit, cursor, skip,
+        projection={"_id": 0, SEARCH_TERMS_FIELD: 0},
+        lookups=one_lookup("users", "user_id", "user_id", "owner", ["name", "email"]),
+        count=count,
+        computed=rank_stages(search) if search else None
+    )
     
-    return {"accounts": accounts, "total": total}
+    return {"accounts": page["items"], "total": page["total"], "next_cursor": page["next_cursor"], "has_more": page["has_more"]}
 
 @router.post("/instagram-accounts/{account_id}/disconnect")
 async def disconnect_account(account_id: str, request: Request):
@@ -337,6 +265,8 @@ async def flag_account(account_id: str, reason: str, request: Request):
 async def get_admin_logs(
     skip: int = 0,
     limit: int = 100,
+    cursor: str = None,
+    count: str = "cached",
     action: str = None,
     admin_id: str = None,
     target_type: str = None,
@@ -364,10 +294,25 @@ async def get_admin_logs(
         else:
             query["created_at"] = {"$lte": end_date}
     
-    logs = await db.admin_logs.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.admin_logs.count_documents(query)
+    page = await keyset_page(db.admin_logs, query, "created_at", "log_id", -1, limit, cursor, skip, count=count)
+    
+    return {"logs": page["items"], "total": page["total"], "next_cursor": page["next_cursor"], "has_more": page["has_more"]}
+
+@router.get("/logs/archive")
+async def get_archived_admin_logs(
+    day: str = None,
+    action: str = None,
+    admin_id: str = None,
+    target_type: str = None,
+    admin: dict = Depends(require_permission("logs"))
+):
+    """Archived admin logs: the list of archived days, or every log of one day (YYYY-MM-DD)"""
+    if not day:
+        return {"days": await list_archive_days("admin_logs")}
     
-    return {"logs": logs, "total": total}
+    filters = {k: v for k, v in {"action": action, "admin_id": admin_id, "target_type": target_type}.items() if v}
+    logs = await read_archive("admin_logs", day, filters)
+    return {"day": day, "logs": logs, "total": len(logs)}
 
 # ==================== SYSTEM SETTINGS ====================
 
@@ -456,11 +401,13 @@ async def update_system_settings(
     
     if update_data:
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+        # Bumping the version makes every worker's settings snapshot reload
         await db.system_settings.update_one(
             {"setting_id": "global"},
-            {"$set": update_data},
+            {"$set": update_data, "$inc": {"version": 1}},
             upsert=True
         )
+        await get_settings_cache().refresh(force=True)
     
     await log_admin_action(admin, "update_settings", "system", None, {"fields_updated": list(update_data.keys())}, get_client_ip(request))
     
@@ -630,6 +577,7 @@ async def update_admin_role(admin_id: str, role: str, request: Request):
         {"admin_id": admin_id},
         {"$set": {"role": role, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await get_admin_principal_cache().invalidate(admin_id)
     
     await log_admin_action(admin, "update_admin_role", "admin", admin_id, {"new_role": role}, get_client_ip(request))
     
@@ -654,6 +602,7 @@ async def update_admin_status(admin_id: str, status: str, request: Request):
         {"admin_id": admin_id},
         {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await get_admin_principal_cache().invalidate(admin_id)
     
     await log_admin_action(admin, f"admin_{status}", "admin", admin_id, {}, get_client_ip(request))
     
@@ -685,12 +634,12 @@ async def get_all_instagram_accounts(request: Request):
     db = get_database()
     admin = await verify_admin_token(request)
     
-    accounts = []
-    async for acc in db.instagram_accounts.find({}, {"_id": 0, "access_token": 0}):
-        # Get user email
-        user = await db.users.find_one({"user_id": acc.get("user_id")}, {"email": 1, "_id": 0})
-        acc["user_email"] = user.get("email") if user else "Unknown"
-        accounts.append(acc)
+    pipeline = [
+        *one_lookup("users", "user_id", "user_id", "owner", ["email"]),
+        {"$set": {"user_email": {"$ifNull": ["$owner.email", "Unknown"]}}},
+        {"$project": {"_id": 0, "access_token": 0, "owner": 0, SEARCH_TERMS_FIELD: 0}}
+    ]
+    accounts = await db.instagram_accounts.aggregate(pipeline).to_list(None)
     
     return {"accounts": accounts}
 
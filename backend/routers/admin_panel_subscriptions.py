@@ -5,6 +5,9 @@ import uuid
 
 from database import get_database
 from routers.admin_panel_auth import verify_admin_token, check_permission, log_admin_action, get_client_ip
+from services.admin_lists import one_lookup
+from services.pagination import keyset_page
+from services.revenue import get_revenue_engine
 
 router = APIRouter(prefix="/admin-panel", tags=["Admin Panel - Subscriptions & Plans"])
 
@@ -14,6 +17,8 @@ router = APIRouter(prefix="/admin-panel", tags=["Admin Panel - Subscriptions & P
 async def get_all_subscriptions(
     skip: int = 0,
     limit: int = 50,
+    cursor: str = None,
+    count: str = "cached",
     status: str = None,
     plan: str = None,
     request: Request = None
@@ -29,15 +34,14 @@ async def get_all_subscriptions(
     if plan:
         query["plan_id"] = plan
     
-    subscriptions = await db.subscriptions.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.subscriptions.count_documents(query)
-    
-    # Enrich with user info
-    for sub in subscriptions:
-        user = await db.users.find_one({"user_id": sub.get("user_id")}, {"_id": 0, "name": 1, "email": 1})
-        sub["user"] = user
+    # Page and user info in a single aggregation; total is cached
+    page = await keyset_page(
+        db.subscriptions, query, "created_at", "subscription_id", -1, limit, cursor, skip,
+        lookups=one_lookup("users", "user_id", "user_id", "user", ["name", "email"]),
+        count=count
+    )
     
-    return {"subscriptions": subscriptions, "total": total}
+    return {"subscriptions": page["items"], "total": page["total"], "next_cursor": page["next_cursor"], "has_more": page["has_more"]}
 
 @router.put("/subscriptions/{subscription_id}/cancel")
 async def cancel_subscription(subscription_id: str, request: Request):
@@ -61,6 +65,8 @@ async def cancel_subscription(subscription_id: str, request: Request):
         {"$set": {"role": "starter", "account_limit": 1, "ai_usage_limit": 10}}
     )
     
+    get_revenue_engine().invalidate()
+    
     await log_admin_action(admin, "cancel_subscription", "subscription", subscription_id, {"user_id": sub["user_id"]}, get_client_ip(request))
     
     return {"message": "Subscription cancelled"}
@@ -97,6 +103,8 @@ async def change_subscription_plan(subscription_id: str, new_plan: str, request:
         }}
     )
     
+    get_revenue_engine().invalidate()
+    
     await log_admin_action(admin, "change_subscription_plan", "subscription", subscription_id, {"old_plan": old_plan, "new_plan": new_plan}, get_client_ip(request))
     
     return {"message": f"Subscription plan changed to {new_plan}"}
@@ -158,6 +166,8 @@ async def create_plan(
     }
     await db.plans.insert_one(plan_doc)
     
+    get_revenue_engine().invalidate()
+    
     await log_admin_action(admin, "create_plan", "plan", plan_id, {"name": name, "price": price}, get_client_ip(request))
     
     return {"plan_id": plan_id, "message": "Plan created successfully"}
@@ -209,6 +219,8 @@ async def update_plan(
         update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
         await db.plans.update_one({"plan_id": plan_id}, {"$set": update_data})
     
+    get_revenue_engine().invalidate()
+    
     await log_admin_action(admin, "update_plan", "plan", plan_id, update_data, get_client_ip(request))
     
     return {"message": "Plan updated successfully"}
@@ -227,6 +239,8 @@ async def delete_plan(plan_id: str, request: Request):
     
     await db.plans.update_one({"plan_id": plan_id}, {"$set": {"status": "disabled"}})
     
+    get_revenue_engine().invalidate()
+    
     await log_admin_action(admin, "disable_plan", "plan", plan_id, {}, get_client_ip(request))
     
     return {"message": "Plan disabled"}
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List
 import uuid
-from io import StringIO
-import csv
 
 from database import get_database
 from routers.admin_panel_auth import verify_admin_token, check_permission, log_admin_action, get_client_ip
 from utils import hash_password
+from services.admin_lists import count_lookup
+from services.pagination import keyset_page
+from services.search import search_filter, rank_stages, SEARCH_TERMS_FIELD
+from services.cascade import enqueue_user_deletion, get_deletion_job, cancel_deletion_job
+from services.exports import export_projection, export_response
 
 router = APIRouter(prefix="/admin-panel", tags=["Admin Panel - Users"])
 
@@ -17,6 +20,8 @@ router = APIRouter(prefix="/admin-panel", tags=["Admin Panel - Users"])
 async def get_all_users(
     skip: int = 0, 
     limit: int = 50, 
+    cursor: str = None,
+    count: str = "cached",
     search: str = None,
     plan: str = None,
     status: str = None,
@@ -31,10 +36,7 @@ async def get_all_users(
     
     query = {}
     if search:
-        query["$or"] = [
-            {"email": {"$regex": search, "$options": "i"}},
-            {"name": {"$regex": search, "$options": "i"}}
-        ]
+        query.update(search_filter(search))
     if plan:
         query["role"] = plan
     if status:
@@ -42,15 +44,29 @@ async def get_all_users(
     
     sort_dir = -1 if sort_order == "desc" else 1
     
-    users = await db.users.find(query, {"_id": 0, "password_hash": 0}).sort(sort_by, sort_dir).skip(skip).limit(limit).to_list(limit)
-    total = await db.users.count_documents(query)
-    
-    # Enrich with account counts
-    for user in users:
-        user["accounts_count"] = await db.instagram_accounts.count_documents({"user_id": user["user_id"]})
-        user["audits_count"] = await db.audits.count_documents({"user_id": user["user_id"]})
+    # Page and per-user counts in a single aggregation; total is cached
+    # Searches are ranked by relevance instead of the requested sort
+    if search:
+        sort_by, sort_dir = "search_score", -1
+    page = await keyset_page(
+        db.users, query, sort_by, "user_id", sort_dir, limit, cursor, skip,
+        projection={"_id": 0, "password_hash": 0, SEARCH_TERMS_FIELD: 0},
+        computed=rank_stages(search) if search else None,
+        lookups=(
+            count_lookup("instagram_accounts", "user_id", "user_id", "accounts_count")
+            + count_lookup("audits", "user_id", "user_id", "audits_count")
+        ),
+        count=count
+    )
     
-    return {"users": users, "total": total, "skip": skip, "limit": limit}
+    return {
+        "users": page["items"],
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"],
+        "skip": skip,
+        "limit": limit
+    }
 
 @router.get("/users/{user_id}")
 async def get_user_details(user_id: str, request: Request):
@@ -59,12 +75,12 @@ async def get_user_details(user_id: str, request: Request):
     admin = await verify_admin_token(request)
     await check_permission(admin, "users")
     
-    user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0})
+    user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0, SEARCH_TERMS_FIELD: 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get related data
-    accounts = await db.instagram_accounts.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+    accounts = await db.instagram_accounts.find({"user_id": user_id}, {"_id": 0, SEARCH_TERMS_FIELD: 0}).to_list(100)
     audits = await db.audits.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
     subscription = await db.subscriptions.find_one({"user_id": user_id, "status": "active"}, {"_id": 0})
     
@@ -175,40 +191,54 @@ async def delete_user(user_id: str, request: Request):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Delete all related data
-    await db.users.delete_one({"user_id": user_id})
-    await db.instagram_accounts.delete_many({"user_id": user_id})
-    await db.audits.delete_many({"user_id": user_id})
-    await db.content_items.delete_many({"user_id": user_id})
-    await db.growth_plans.delete_many({"user_id": user_id})
-    await db.notifications.delete_many({"user_id": user_id})
-    await db.dm_templates.delete_many({"user_id": user_id})
-    await db.subscriptions.delete_many({"user_id": user_id})
+    # Related data is removed in the background by the cascade worker
+    job_id = await enqueue_user_deletion(user_id, user.get("email"), "admin_panel", admin["admin_id"])
+    
+    await log_admin_action(admin, "delete_user", "user", user_id, {"email": user.get("email"), "job_id": job_id}, get_client_ip(request))
+    
+    return {"message": "User deletion started", "job_id": job_id}
+
+@router.get("/deletion-jobs/{job_id}")
+async def get_deletion_job_status(job_id: str, request: Request):
+    """Get progress of a user deletion job"""
+    admin = await verify_admin_token(request)
+    await check_permission(admin, "users")
+    
+    job = await get_deletion_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
     
-    await log_admin_action(admin, "delete_user", "user", user_id, {"email": user.get("email")}, get_client_ip(request))
+    return job
+
+@router.post("/deletion-jobs/{job_id}/cancel")
+async def cancel_deletion(job_id: str, request: Request):
+    """Cancel a deletion job that has not started (e.g. a disputed GDPR request)"""
+    admin = await verify_admin_token(request)
+    await check_permission(admin, "users")
     
-    return {"message": "User deleted successfully"}
+    if not await cancel_deletion_job(job_id):
+        raise HTTPException(status_code=400, detail="Job not found or already started")
+    
+    await log_admin_action(admin, "cancel_deletion_job", "deletion_job", job_id, {}, get_client_ip(request))
+    
+    return {"message": "Deletion job cancelled"}
 
 @router.get("/users/export/csv")
-async def export_users_csv(request: Request):
-    """Export users to CSV"""
+async def export_users_csv(request: Request, format: str = "csv", gzip: bool = False):
+    """Export users to CSV (streamed, no row cap)"""
     db = get_database()
     admin = await verify_admin_token(request)
     await check_permission(admin, "users")
     
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(10000)
-    
-    output = StringIO()
     fields = ["user_id", "name", "email", "role", "account_limit", "ai_usage_current", "ai_usage_limit", "email_verified", "created_at"]
-    writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
-    writer.writeheader()
-    writer.writerows(users)
+    cursor = db.users.find({}, export_projection(fields))
+    ip = get_client_ip(request)
     
-    await log_admin_action(admin, "export_users", "users", None, {"count": len(users)}, get_client_ip(request))
+    async def log_export(count: int, finished: bool):
+        status = "completed" if finished else "aborted"
+        await log_admin_action(admin, "export_users", "users", None, {"format": format, "status": status, "count": count}, ip)
     
-    output.seek(0)
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=users_export.csv"}
-    )
+    response = export_response(cursor, fields, "users_export", fmt=format, compress=gzip, on_complete=log_export)
+    # Logged up front so an aborted download is still audited
+    await log_admin_action(admin, "export_users", "users", None, {"format": format, "status": "started"}, ip)
+    return response
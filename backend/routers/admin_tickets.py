@@ -3,10 +3,15 @@ Admin Support Ticket Management
 """
 from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime, timezone
+from pymongo import ReturnDocument
 
 from database import get_database
 from routers.admin_panel_auth import verify_admin_token
 from services import send_email
+from services.pagination import keyset_page
+from services.search import search_filter, rank_stages
+from services.ticket_stats import STATS_FIELDS, get_ticket_stats
+from services.tickets import HEADER_PROJECTION, build_message, add_message, get_messages, get_ticket_with_messages, delete_ticket_messages
 
 router = APIRouter(prefix="/admin-panel/tickets", tags=["Admin Tickets"])
 
@@ -18,6 +23,8 @@ async def get_all_tickets(
     search: str = None,
     limit: int = 50,
     skip: int = 0,
+    cursor: str = None,
+    count: str = "cached",
     request: Request = None
 ):
     """Get all support tickets"""
@@ -32,61 +39,30 @@ async def get_all_tickets(
     if category:
         query["category"] = category
     if search:
-        query["$or"] = [
-            {"subject": {"$regex": search, "$options": "i"}},
-            {"user_email": {"$regex": search, "$options": "i"}},
-            {"ticket_id": {"$regex": search, "$options": "i"}}
-        ]
-    
-    total = await db.support_tickets.count_documents(query)
-    tickets = await db.support_tickets.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    
-    # Get counts by status
-    open_count = await db.support_tickets.count_documents({"status": "open"})
-    pending_count = await db.support_tickets.count_documents({"status": "pending"})
-    closed_count = await db.support_tickets.count_documents({"status": "closed"})
+        query.update(search_filter(search))
+    
+    # Searches are ranked by relevance, newest first otherwise
+    page = await keyset_page(
+        db.support_tickets, query, "search_score" if search else "created_at", "ticket_id", -1, limit, cursor, skip,
+        projection=HEADER_PROJECTION,
+        count=count,
+        computed=rank_stages(search) if search else None
+    )
     
     return {
-        "tickets": tickets,
-        "total": total,
-        "counts": {
-            "open": open_count,
-            "pending": pending_count,
-            "closed": closed_count
-        }
+        "tickets": page["items"],
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"],
+        "counts": await get_ticket_stats().get_status_counts()
     }
 
 @router.get("/stats")
-async def get_ticket_stats(request: Request = None):
+async def get_ticket_stats_admin(request: Request = None):
     """Get support ticket statistics"""
-    db = get_database()
     await verify_admin_token(request)
     
-    total = await db.support_tickets.count_documents({})
-    open_tickets = await db.support_tickets.count_documents({"status": "open"})
-    pending_tickets = await db.support_tickets.count_documents({"status": "pending"})
-    closed_tickets = await db.support_tickets.count_documents({"status": "closed"})
-    
-    # Priority counts
-    urgent = await db.support_tickets.count_documents({"priority": "urgent", "status": {"$ne": "closed"}})
-    high = await db.support_tickets.count_documents({"priority": "high", "status": {"$ne": "closed"}})
-    
-    # Category breakdown
-    pipeline = [
-        {"$match": {"status": {"$ne": "closed"}}},
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}}
-    ]
-    category_counts = await db.support_tickets.aggregate(pipeline).to_list(20)
-    
-    return {
-        "total": total,
-        "open": open_tickets,
-        "pending": pending_tickets,
-        "closed": closed_tickets,
-        "urgent": urgent,
-        "high_priority": high,
-        "by_category": {item["_id"]: item["count"] for item in category_counts}
-    }
+    return await get_ticket_stats().get_stats()
 
 @router.get("/{ticket_id}")
 async def get_ticket_admin(ticket_id: str, request: Request = None):
@@ -94,13 +70,19 @@ async def get_ticket_admin(ticket_id: str, request: Request = None):
     db = get_database()
     await verify_admin_token(request)
     
-    ticket = await db.support_tickets.find_one({"ticket_id": ticket_id}, {"_id": 0})
+    ticket = await get_ticket_with_messages({"ticket_id": ticket_id})
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
     return ticket
 
+@router.get("/{ticket_id}/messages")
+async def get_ticket_messages_admin(ticket_id: str, cursor: str = None, limit: int = 50, request: Request = None):
+    """Get older messages of a ticket (admin)"""
+    await verify_admin_token(request)
+    return await get_messages(ticket_id, cursor, limit)
+
 @router.post("/{ticket_id}/reply")
 async def admin_reply_to_ticket(
     ticket_id: str,
@@ -111,32 +93,13 @@ async def admin_reply_to_ticket(
     db = get_database()
     admin = await verify_admin_token(request)
     
-    ticket = await db.support_tickets.find_one({"ticket_id": ticket_id})
+    ticket = await db.support_tickets.find_one({"ticket_id": ticket_id}, HEADER_PROJECTION)
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    new_message = {
-        "message_id": f"MSG-{admin['admin_id'][:8]}",
-        "sender_type": "admin",
-        "sender_id": admin["admin_id"],
-        "sender_name": admin["name"],
-        "message": message,
-        "attachments": [],
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.support_tickets.update_one(
-        {"ticket_id": ticket_id},
-        {
-            "$push": {"messages": new_message},
-            "$set": {
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "status": "pending",
-                "assigned_to": admin["admin_id"]
-            }
-        }
-    )
+    new_message = build_message("admin", admin["admin_id"], admin["name"], message)
+    await add_message(ticket_id, new_message, {"status": "pending", "assigned_to": admin["admin_id"]})
     
     # Send email notification to user
     try:
@@ -184,14 +147,18 @@ async def update_ticket_status(
     if status == "closed":
         update_data["resolved_at"] = datetime.now(timezone.utc).isoformat()
     
-    result = await db.support_tickets.update_one(
+    before = await db.support_tickets.find_one_and_update(
         {"ticket_id": ticket_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=STATS_FIELDS,
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not before:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    get_ticket_stats().record_change(before, {**before, "status": status})
+    
     return {"message": f"Ticket status updated to {status}"}
 
 @router.put("/{ticket_id}/priority")
@@ -207,17 +174,21 @@ async def update_ticket_priority(
     if priority not in ["low", "normal", "high", "urgent"]:
         raise HTTPException(status_code=400, detail="Invalid priority")
     
-    result = await db.support_tickets.update_one(
+    before = await db.support_tickets.find_one_and_update(
         {"ticket_id": ticket_id},
         {"$set": {
             "priority": priority,
             "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
+        }},
+        projection=STATS_FIELDS,
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not before:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    get_ticket_stats().record_change(before, {**before, "priority": priority})
+    
     return {"message": f"Ticket priority updated to {priority}"}
 
 @router.put("/{ticket_id}/assign")
@@ -254,9 +225,13 @@ async def delete_ticket(ticket_id: str, request: Request = None):
     if admin["role"] != "super_admin":
         raise HTTPException(status_code=403, detail="Super admin access required")
     
-    result = await db.support_tickets.delete_one({"ticket_id": ticket_id})
+    deleted = await db.support_tickets.find_one_and_delete({"ticket_id": ticket_id}, projection=STATS_FIELDS)
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    get_ticket_stats().record_change(deleted, None)
+    
+    await delete_ticket_messages([ticket_id])
+    
     return {"message": "Ticket deleted"}
@@ -6,68 +6,231 @@ Provides real-time notifications to admin panel for:
 - Subscription changes
 - AI usage alerts
 - System events
+
+Admin sockets subscribe to channels (see AdminChannel); a publish only touches
+the subscribers of its channel. High-rate channels (audits, accounts) are
+opt-in and coalesced into "batch" frames every ADMIN_WS_BATCH_INTERVAL seconds.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
 import json
 import logging
 import asyncio
+import os
+
+from services.realtime import QueuedWebSocket, encode_message, get_broker
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Admin WebSocket"])
 
+ADMIN_EVENTS_CHANNEL = "admin_events"
+
+# Coalescing interval for high-rate channels (seconds)
+ADMIN_WS_BATCH_INTERVAL = float(os.environ.get('ADMIN_WS_BATCH_INTERVAL', 2))
+# Max events carried by a single batched frame; older ones are counted, not sent
+ADMIN_WS_BATCH_MAX_EVENTS = 100
+
+# Event types for admin notifications
+class AdminEventType:
+    NEW_USER = "new_user"
+    USER_UPGRADED = "user_upgraded"
+    USER_DOWNGRADED = "user_downgraded"
+    SUBSCRIPTION_CANCELLED = "subscription_cancelled"
+    NEW_PAYMENT = "new_payment"
+    AI_LIMIT_WARNING = "ai_limit_warning"
+    SYSTEM_ALERT = "system_alert"
+    NEW_AUDIT = "new_audit"
+    NEW_ACCOUNT = "new_account"
+    ADMIN_LOGIN = "admin_login"
+    ADMIN_ACTION = "admin_action"
+    STATS_DELTA = "stats_delta"
+
+# Channels admins can subscribe to
+class AdminChannel:
+    USERS = "users"
+    SUBSCRIPTIONS = "subscriptions"
+    PAYMENTS = "payments"
+    AI_USAGE = "ai_usage"
+    SYSTEM = "system"
+    AUDITS = "audits"
+    ACCOUNTS = "accounts"
+    ADMIN_ACTIVITY = "admin_activity"
+    DASHBOARD = "dashboard"
+
+EVENT_CHANNELS = {
+    AdminEventType.NEW_USER: AdminChannel.USERS,
+    AdminEventType.USER_UPGRADED: AdminChannel.SUBSCRIPTIONS,
+    AdminEventType.USER_DOWNGRADED: AdminChannel.SUBSCRIPTIONS,
+    AdminEventType.SUBSCRIPTION_CANCELLED: AdminChannel.SUBSCRIPTIONS,
+    AdminEventType.NEW_PAYMENT: AdminChannel.PAYMENTS,
+    AdminEventType.AI_LIMIT_WARNING: AdminChannel.AI_USAGE,
+    AdminEventType.SYSTEM_ALERT: AdminChannel.SYSTEM,
+    AdminEventType.NEW_AUDIT: AdminChannel.AUDITS,
+    AdminEventType.NEW_ACCOUNT: AdminChannel.ACCOUNTS,
+    AdminEventType.ADMIN_LOGIN: AdminChannel.ADMIN_ACTIVITY,
+    AdminEventType.ADMIN_ACTION: AdminChannel.ADMIN_ACTIVITY,
+    AdminEventType.STATS_DELTA: AdminChannel.DASHBOARD,
+}
+
+ALL_CHANNELS = frozenset(EVENT_CHANNELS.values())
+
+# Channels each role may subscribe to
+ROLE_CHANNELS = {
+    "super_admin": ALL_CHANNELS,
+    "finance": frozenset({
+        AdminChannel.USERS, AdminChannel.SUBSCRIPTIONS, AdminChannel.PAYMENTS,
+        AdminChannel.AI_USAGE, AdminChannel.SYSTEM, AdminChannel.ADMIN_ACTIVITY,
+        AdminChannel.DASHBOARD
+    }),
+    "support": frozenset({
+        AdminChannel.USERS, AdminChannel.AI_USAGE, AdminChannel.SYSTEM,
+        AdminChannel.AUDITS, AdminChannel.ACCOUNTS, AdminChannel.ADMIN_ACTIVITY,
+        AdminChannel.DASHBOARD
+    }),
+}
+
+# High-rate channels are opt-in and delivered as batched frames
+COALESCED_CHANNELS = frozenset({AdminChannel.AUDITS, AdminChannel.ACCOUNTS})
+DEFAULT_CHANNELS = ALL_CHANNELS - COALESCED_CHANNELS
+
 class AdminConnectionManager:
-    """Manages WebSocket connections for admin panel"""
+    """Manages WebSocket connections for admin panel with per-channel subscriber indexes"""
     
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, broker=None):
+        self.active_connections: Dict[str, List[QueuedWebSocket]] = {}
         self.admin_roles: Dict[str, str] = {}
+        self.channel_subscribers: Dict[str, Set[QueuedWebSocket]] = defaultdict(set)
+        self.connection_channels: Dict[QueuedWebSocket, Set[str]] = {}
+        self.connection_roles: Dict[QueuedWebSocket, str] = {}
+        self.broker = broker or get_broker()
+        self._pending: Dict[str, List[dict]] = defaultdict(list)
+        self._flusher: Optional[asyncio.Task] = None
     
-    async def connect(self, websocket: WebSocket, admin_id: str, role: str):
+    async def connect(self, websocket: WebSocket, admin_id: str, role: str) -> QueuedWebSocket:
         await websocket.accept()
-        if admin_id not in self.active_connections:
-            self.active_connections[admin_id] = []
-        self.active_connections[admin_id].append(websocket)
+        connection = QueuedWebSocket(websocket)
+        connection.start()
+        self.active_connections.setdefault(admin_id, []).append(connection)
         self.admin_roles[admin_id] = role
+        self.connection_roles[connection] = role
+        self.connection_channels[connection] = set()
+        for channel in DEFAULT_CHANNELS:
+            self.subscribe(connection, channel)
         logger.info(f"Admin WebSocket connected: {admin_id} ({role})")
         
         # Send welcome message
-        await websocket.send_json({
+        connection.send_json({
             "type": "connection",
             "status": "connected",
-            "message": "Admin WebSocket connected"
+            "message": "Admin WebSocket connected",
+            "channels": sorted(self.connection_channels[connection]),
+            "available_channels": sorted(ROLE_CHANNELS.get(role, frozenset()))
         })
+        return connection
     
-    def disconnect(self, websocket: WebSocket, admin_id: str):
+    def disconnect(self, connection: QueuedWebSocket, admin_id: str):
+        connection.close()
+        for channel in self.connection_channels.pop(connection, set()):
+            self.channel_subscribers[channel].discard(connection)
+        self.connection_roles.pop(connection, None)
         if admin_id in self.active_connections:
-            if websocket in self.active_connections[admin_id]:
-                self.active_connections[admin_id].remove(websocket)
+            if connection in self.active_connections[admin_id]:
+                self.active_connections[admin_id].remove(connection)
             if not self.active_connections[admin_id]:
                 del self.active_connections[admin_id]
                 if admin_id in self.admin_roles:
                     del self.admin_roles[admin_id]
         logger.info(f"Admin WebSocket disconnected: {admin_id}")
     
+    def subscribe(self, connection: QueuedWebSocket, channel: str) -> bool:
+        """Subscribe a socket to a channel if its role allows it"""
+        role = self.connection_roles.get(connection, "support")
+        if channel not in ROLE_CHANNELS.get(role, frozenset()):
+            return False
+        self.connection_channels[connection].add(channel)
+        self.channel_subscribers[channel].add(connection)
+        return True
+    
+    def unsubscribe(self, connection: QueuedWebSocket, channel: str):
+        self.connection_channels.get(connection, set()).discard(channel)
+        self.channel_subscribers[channel].discard(connection)
+    
+    def _deliver(self, channel: str, text: str, roles: Optional[Set[str]] = None):
+        for connection in list(self.channel_subscribers.get(channel, ())):
+            if roles is None or self.connection_roles.get(connection) in roles:
+                connection.enqueue(text)
+    
+    def _publish_local(self, channel: str, message: dict, roles: Optional[Set[str]] = None):
+        if not self.channel_subscribers.get(channel):
+            return
+        if channel in COALESCED_CHANNELS:
+            self._pending[channel].append(message)
+            return
+        self._deliver(channel, encode_message(message), roles)
+    
+    async def publish(self, channel: str, message: dict, roles: Optional[Set[str]] = None):
+        """Publish an event to every subscriber of a channel, on every worker"""
+        self._publish_local(channel, message, roles)
+        await self.broker.publish(ADMIN_EVENTS_CHANNEL, {
+            "admin_channel": channel,
+            "message": message,
+            "roles": sorted(roles) if roles else None
+        })
+    
     async def send_to_admin(self, admin_id: str, message: dict):
         """Send message to specific admin"""
-        if admin_id in self.active_connections:
-            for connection in self.active_connections[admin_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending to admin {admin_id}: {e}")
+        text = encode_message(message)
+        for connection in list(self.active_connections.get(admin_id, [])):
+            connection.enqueue(text)
     
     async def broadcast_to_role(self, role: str, message: dict):
-        """Broadcast message to all admins with specific role"""
-        for admin_id, admin_role in self.admin_roles.items():
-            if admin_role == role or admin_role == "super_admin":
-                await self.send_to_admin(admin_id, message)
+        """Publish to the message's channel, limited to admins with the role (and super admins)"""
+        channel = EVENT_CHANNELS.get(message.get("type"), AdminChannel.SYSTEM)
+        await self.publish(channel, message, {role, "super_admin"})
     
     async def broadcast_all(self, message: dict):
-        """Broadcast message to all connected admins"""
-        for admin_id in list(self.active_connections.keys()):
-            await self.send_to_admin(admin_id, message)
+        """Publish to the message's channel"""
+        channel = EVENT_CHANNELS.get(message.get("type"), AdminChannel.SYSTEM)
+        await self.publish(channel, message)
+    
+    async def _on_remote_event(self, event: dict):
+        roles = set(event["roles"]) if event.get("roles") else None
+        self._publish_local(event["admin_channel"], event["message"], roles)
+    
+    def _flush_pending(self):
+        pending, self._pending = self._pending, defaultdict(list)
+        for channel, events in pending.items():
+            frame = {
+                "type": "batch",
+                "channel": channel,
+                "count": len(events),
+                "events": events[-ADMIN_WS_BATCH_MAX_EVENTS:]
+            }
+            self._deliver(channel, encode_message(frame))
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(ADMIN_WS_BATCH_INTERVAL)
+            try:
+                self._flush_pending()
+            except Exception as e:
+                logger.error(f"Admin WebSocket batch flush failed: {e}")
+    
+    def start(self):
+        self.broker.start(ADMIN_EVENTS_CHANNEL, self._on_remote_event)
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        self._flush_pending()
+        for connections in list(self.active_connections.values()):
+            for connection in connections:
+                connection.close(1001)
     
     def get_connected_admins(self) -> List[dict]:
         """Get list of connected admins"""
@@ -78,24 +241,10 @@ class AdminConnectionManager:
 
 admin_manager = AdminConnectionManager()
 
-# Event types for admin notifications
-class AdminEventType:
-    NEW_USER = "new_user"
-    USER_UPGRADED = "user_upgraded"
-    USER_DOWNGRADED = "user_downgraded"
-    SUBSCRIPTION_CANCELLED = "subscription_cancelled"
-    NEW_PAYMENT = "new_payment"
-    AI_LIMIT_WARNING = "ai_limit_warning"
-    SYSTEM_ALERT = "system_alert"
-    NEW_AUDIT = "new_audit"
-    NEW_ACCOUNT = "new_account"
-    ADMIN_LOGIN = "admin_login"
-    ADMIN_ACTION = "admin_action"
-
 @router.websocket("/admin-ws/{admin_id}")
 async def admin_websocket_endpoint(websocket: WebSocket, admin_id: str, role: str = "support"):
     """WebSocket endpoint for admin real-time updates"""
-    await admin_manager.connect(websocket, admin_id, role)
+    connection = await admin_manager.connect(websocket, admin_id, role)
     
     try:
         while True:
@@ -103,29 +252,41 @@ async def admin_websocket_endpoint(websocket: WebSocket, admin_id: str, role: st
             message = json.loads(data)
             
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong", "timestamp": message.get("timestamp")})
+                connection.send_json({"type": "pong", "timestamp": message.get("timestamp")})
             
             elif message.get("type") == "subscribe":
                 channel = message.get("channel")
-                await websocket.send_json({
-                    "type": "subscribed",
-                    "channel": channel,
-                    "message": f"Subscribed to {channel}"
-                })
+                if admin_manager.subscribe(connection, channel):
+                    connection.send_json({
+                        "type": "subscribed",
+                        "channel": channel,
+                        "message": f"Subscribed to {channel}"
+                    })
+                else:
+                    connection.send_json({
+                        "type": "subscribe_error",
+                        "channel": channel,
+                        "message": f"Channel {channel} is not available for your role"
+                    })
+            
+            elif message.get("type") == "unsubscribe":
+                channel = message.get("channel")
+                admin_manager.unsubscribe(connection, channel)
+                connection.send_json({"type": "unsubscribed", "channel": channel})
             
             elif message.get("type") == "get_online_admins":
                 admins = admin_manager.get_connected_admins()
-                await websocket.send_json({
+                connection.send_json({
                     "type": "online_admins",
                     "admins": admins,
                     "count": len(admins)
                 })
     
     except WebSocketDisconnect:
-        admin_manager.disconnect(websocket, admin_id)
+        admin_manager.disconnect(connection, admin_id)
     except Exception as e:
         logger.error(f"Admin WebSocket error: {e}")
-        admin_manager.disconnect(websocket, admin_id)
+        admin_manager.disconnect(connection, admin_id)
 
 # ==================== Event Broadcasting Functions ====================
 
@@ -213,6 +374,35 @@ async def notify_admin_action(admin_email: str, action: str, target: str, detail
         "priority": "low"
     })
 
+async def notify_new_audit(audit_data: dict):
+    """Notify subscribed admins of a new audit (coalesced into batched frames)"""
+    await admin_manager.publish(AdminChannel.AUDITS, {
+        "type": AdminEventType.NEW_AUDIT,
+        "title": "New Audit",
+        "message": f"Audit created for @{audit_data.get('username')}",
+        "data": {
+            "audit_id": audit_data.get("audit_id"),
+            "user_id": audit_data.get("user_id"),
+            "username": audit_data.get("username")
+        },
+        "priority": "low"
+    })
+
+async def notify_new_account(account_data: dict):
+    """Notify subscribed admins of a newly added Instagram account (coalesced)"""
+    await admin_manager.publish(AdminChannel.ACCOUNTS, {
+        "type": AdminEventType.NEW_ACCOUNT,
+        "title": "New Instagram Account",
+        "message": f"Account @{account_data.get('username')} added",
+        "data": {
+            "account_id": account_data.get("account_id"),
+            "user_id": account_data.get("user_id"),
+            "username": account_data.get("username"),
+            "niche": account_data.get("niche")
+        },
+        "priority": "low"
+    })
+
 # Export functions for use in other modules
 def get_admin_manager():
     return admin_manager
@@ -8,6 +8,10 @@ import uuid
 from database import get_database
 from dependencies import get_current_user
 from routers.admin_panel_auth import verify_admin_token
+from services.announcements import (
+    get_announcement_cache, get_dismissed_ids, dismiss, MAX_ACTIVE_ANNOUNCEMENTS
+)
+from services.notifications import get_notification_service, AUDIENCE_QUERIES
 
 router = APIRouter(prefix="/announcements", tags=["Announcements"])
 
@@ -16,20 +20,8 @@ router = APIRouter(prefix="/announcements", tags=["Announcements"])
 @router.get("")
 async def get_active_announcements(request: Request = None):
     """Get active announcements for users"""
-    db = get_database()
-    
-    now = datetime.now(timezone.utc).isoformat()
-    
-    announcements = await db.announcements.find({
-        "status": "active",
-        "start_date": {"$lte": now},
-        "$or": [
-            {"end_date": None},
-            {"end_date": {"$gte": now}}
-        ]
-    }, {"_id": 0}).sort("created_at", -1).to_list(10)
-    
-    return {"announcements": announcements}
+    announcements = await get_announcement_cache().active()
+    return {"announcements": list(announcements[:MAX_ACTIVE_ANNOUNCEMENTS])}
 
 @router.post("/{announcement_id}/dismiss")
 async def dismiss_announcement(announcement_id: str, request: Request = None):
@@ -37,13 +29,7 @@ async def dismiss_announcement(announcement_id: str, request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
     
-    await db.user_dismissed_announcements.update_one(
-        {"user_id": user.user_id, "announcement_id": announcement_id},
-        {"$set": {
-            "dismissed_at": datetime.now(timezone.utc).isoformat()
-        }},
-        upsert=True
-    )
+    await dismiss(user.user_id, announcement_id)
     
     return {"message": "Announcement dismissed"}
 
@@ -53,24 +39,11 @@ async def get_unread_announcements(request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
     
-    # Get dismissed announcement IDs
-    dismissed = await db.user_dismissed_announcements.find(
-        {"user_id": user.user_id},
-        {"announcement_id": 1}
-    ).to_list(100)
-    dismissed_ids = [d["announcement_id"] for d in dismissed]
-    
-    now = datetime.now(timezone.utc).isoformat()
-    
-    announcements = await db.announcements.find({
-        "status": "active",
-        "announcement_id": {"$nin": dismissed_ids},
-        "start_date": {"$lte": now},
-        "$or": [
-            {"end_date": None},
-            {"end_date": {"$gte": now}}
-        ]
-    }, {"_id": 0}).sort("created_at", -1).to_list(10)
+    dismissed_ids = await get_dismissed_ids(user.user_id)
+    announcements = [
+        a for a in await get_announcement_cache().active()
+        if a["announcement_id"] not in dismissed_ids
+    ][:MAX_ACTIVE_ANNOUNCEMENTS]
     
     return {"announcements": announcements, "count": len(announcements)}
 
@@ -95,9 +68,10 @@ async def create_announcement(
     end_date: str = None,
     link_url: str = None,
     link_text: str = None,
+    notify_users: bool = False,
     request: Request = None
 ):
-    """Create a new announcement"""
+    """Create a new announcement (optionally also sent as an in-app notification)"""
     db = get_database()
     admin = await verify_admin_token(request)
     
@@ -120,6 +94,11 @@ async def create_announcement(
     
     await db.announcements.insert_one(announcement)
     del announcement["_id"]
+    await get_announcement_cache().invalidate()
+    
+    if notify_users:
+        query = AUDIENCE_QUERIES.get(target, {"role": target})
+        get_notification_service().fan_out("announcement", title, message, link_url, query)
     
     return announcement
 
@@ -157,6 +136,7 @@ async def update_announcement(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
     
+    await get_announcement_cache().invalidate()
     return {"message": "Announcement updated"}
 
 @router.delete("/admin/{announcement_id}")
@@ -170,4 +150,5 @@ async def delete_announcement(announcement_id: str, request: Request = None):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
     
+    await get_announcement_cache().invalidate()
     return {"message": "Announcement deleted"}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+import re
+
+from services.assets import read_asset
+
+router = APIRouter(prefix="/assets", tags=["Assets"])
+
+ASSET_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+@router.get("/{asset_hash}")
+async def get_asset(asset_hash: str, request: Request):
+    """Serve a stored asset; content-addressed, so it can be cached forever"""
+    if not ASSET_HASH_RE.match(asset_hash):
+        raise HTTPException(status_code=404, detail="Asset not found")
+    
+    etag = f'"{asset_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    data, content_type = await read_asset(asset_hash)
+    if content_type == "image/svg+xml":
+        # Uploaded SVGs must not run scripts when opened directly
+        headers["Content-Security-Policy"] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+    headers["X-Content-Type-Options"] = "nosniff"
+    return Response(content=data, media_type=content_type, headers=headers)
@@ -3,19 +3,20 @@ from datetime import datetime, timezone
 from typing import List, Optional
 import uuid
 import json
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.colors import HexColor
-from reportlab.lib.utils import ImageReader
-import base64
 import httpx
 import logging
 
-from models import Audit, AuditRequest
+from models import Audit, AuditRequest, AuditSummary, response_projection
+from utils import trusted_response
 from database import get_database
 from dependencies import get_current_user, check_ai_usage, increment_ai_usage
 from services import generate_ai_content, AI_TIMEOUT_MEDIUM
+from routers.admin_websocket import notify_new_audit
+from services.counters import get_counters
+from services.reports import get_report_renderer, BRANDING_FIELDS
+from services.assets import load_team_logo
+from services.post_analytics import analyze_posts
+from services.posting_times import get_posting_time_engine
 
 logger = logging.getLogger(__name__)
 
@@ -47,74 +48,6 @@ async def fetch_instagram_media(access_token: str, limit: int = 25):
         logger.error(f"Error fetching Instagram media: {e}")
         return []
 
-def analyze_posts_data(posts: list, follower_count: int):
-    """Analyze real post data to calculate engagement metrics"""
-    if not posts:
-        return {
-            "total_posts": 0,
-            "avg_likes": 0,
-            "avg_comments": 0,
-            "engagement_rate": 0,
-            "post_types": {},
-            "posting_frequency": "Unknown",
-            "best_performing_post": None,
-            "worst_performing_post": None,
-            "captions_analysis": []
-        }
-    
-    total_likes = 0
-    total_comments = 0
-    post_types = {"IMAGE": 0, "VIDEO": 0, "CAROUSEL_ALBUM": 0}
-    posts_with_engagement = []
-    captions = []
-    
-    for post in posts:
-        likes = post.get("like_count", 0)
-        comments = post.get("comments_count", 0)
-        total_likes += likes
-        total_comments += comments
-        
-        media_type = post.get("media_type", "IMAGE")
-        post_types[media_type] = post_types.get(media_type, 0) + 1
-        
-        engagement = likes + comments
-        posts_with_engagement.append({
-            "id": post.get("id"),
-            "caption": post.get("caption", "")[:100],
-            "likes": likes,
-            "comments": comments,
-            "engagement": engagement,
-            "type": media_type,
-            "timestamp": post.get("timestamp")
-        })
-        
-        if post.get("caption"):
-            captions.append(post.get("caption", "")[:200])
-    
-    avg_likes = total_likes / len(posts) if posts else 0
-    avg_comments = total_comments / len(posts) if posts else 0
-    
-    # Calculate engagement rate
-    engagement_rate = 0
-    if follower_count and follower_count > 0:
-        engagement_rate = ((avg_likes + avg_comments) / follower_count) * 100
-    
-    # Sort by engagement
-    posts_with_engagement.sort(key=lambda x: x["engagement"], reverse=True)
-    
-    return {
-        "total_posts_analyzed": len(posts),
-        "total_likes": total_likes,
-        "total_comments": total_comments,
-        "avg_likes": round(avg_likes, 1),
-        "avg_comments": round(avg_comments, 1),
-        "engagement_rate": round(engagement_rate, 2),
-        "post_types": post_types,
-        "best_performing_post": posts_with_engagement[0] if posts_with_engagement else None,
-        "worst_performing_post": posts_with_engagement[-1] if posts_with_engagement else None,
-        "recent_captions": captions[:5]
-    }
-
 @router.post("", response_model=Audit)
 async def create_audit(data: AuditRequest, request: Request):
     db = get_database()
@@ -134,7 +67,11 @@ async def create_audit(data: AuditRequest, request: Request):
     if account.get("access_token"):
         logger.info(f"Fetching real Instagram data for @{account['username']}")
         posts_data = await fetch_instagram_media(account["access_token"], limit=25)
-        posts_analysis = analyze_posts_data(posts_data, account.get("follower_count", 0))
+        posts_analysis = analyze_posts(posts_data, account.get("follower_count", 0))
+        try:
+            await get_posting_time_engine().ingest(data.account_id, account.get("niche"), posts_data)
+        except Exception as e:
+            logger.warning(f"Posting time ingest failed: {e}")  # Don't fail the audit
         logger.info(f"Analyzed {posts_analysis.get('total_posts_analyzed', 0)} posts")
     
     system_message = """You are an Instagram growth expert analyzing REAL account data. 
@@ -167,6 +104,14 @@ REAL ENGAGEMENT METRICS (from last {posts_analysis.get('total_posts_analyzed', 0
 - Total Likes (recent posts): {posts_analysis.get('total_likes', 'N/A')}
 - Total Comments (recent posts): {posts_analysis.get('total_comments', 'N/A')}
 
+POSTING PATTERNS:
+- Frequency: {posts_analysis.get('posting_frequency', 'Unknown')} ({posts_analysis.get('posts_per_week', 'N/A')} posts/week)
+- Posts per week, last 8 weeks: {posts_analysis.get('weekly_post_counts', [])}
+- Engagement percentiles: {posts_analysis.get('engagement_percentiles', {})}
+- Engagement by content type: {posts_analysis.get('type_engagement', {})}
+- Best time slots (UTC): {posts_analysis.get('best_time_slots', [])}
+- Outlier posts: {len(posts_analysis.get('outlier_posts', []))}
+
 CONTENT MIX:
 - Images: {posts_analysis.get('post_types', {}).get('IMAGE', 0)}
 - Videos/Reels: {posts_analysis.get('post_types', {}).get('VIDEO', 0)}
@@ -252,14 +197,20 @@ Based on this REAL data, provide specific, actionable analysis."""
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.audits.insert_one(audit_doc)
+    await get_counters().record(user.user_id, "audits_count", 1)
     
     await db.instagram_accounts.update_one(
         {"account_id": data.account_id},
         {"$set": {"last_audit_date": datetime.now(timezone.utc).isoformat()}}
     )
+    
+    try:
+        await notify_new_audit(audit_doc)
+    except Exception:
+        pass  # Don't fail the audit if admin notification fails
     return Audit(**audit_doc)
 
-@router.get("", response_model=List[Audit])
+@router.get("", response_model=List[AuditSummary])
 async def get_audits(account_id: Optional[str] = None, request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
@@ -268,8 +219,8 @@ async def get_audits(account_id: Optional[str] = None, request: Request = None):
     if account_id:
         query["account_id"] = account_id
     
-    audits = await db.audits.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return [Audit(**a) for a in audits]
+    audits = await db.audits.find(query, response_projection(AuditSummary)).sort("created_at", -1).to_list(100)
+    return trusted_response(audits)
 
 @router.get("/{audit_id}", response_model=Audit)
 async def get_audit(audit_id: str, request: Request):
@@ -295,75 +246,14 @@ async def get_audit_pdf(audit_id: str, request: Request):
     
     team = None
     if user.team_id:
-        team = await db.teams.find_one({"team_id": user.team_id}, {"_id": 0})
-    
-    brand_color = team.get("brand_color", "#6366F1") if team else "#6366F1"
-    company_name = team.get("name", "InstaGrowth OS") if team else "InstaGrowth OS"
-    logo_url = team.get("logo_url") if team else None
-    
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    p.setFillColor(HexColor(brand_color))
-    p.rect(0, height - 100, width, 100, fill=True)
-    
-    if logo_url and logo_url.startswith("data:"):
-        try:
-            logo_data = logo_url.split(",")[1]
-            logo_bytes = base64.b64decode(logo_data)
-            logo_img = ImageReader(BytesIO(logo_bytes))
-            p.drawImage(logo_img, 30, height - 80, width=50, height=50, preserveAspectRatio=True)
-        except:
-            pass
+        team = await db.teams.find_one({"team_id": user.team_id}, BRANDING_FIELDS)
     
-    p.setFillColor(HexColor("#FFFFFF"))
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(100 if logo_url else 50, height - 55, f"{company_name} - Account Audit")
-    
-    y = height - 140
-    p.setFillColor(HexColor("#000000"))
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, y, f"@{audit['username']}")
-    y -= 30
-    
-    p.setFont("Helvetica", 12)
-    p.drawString(50, y, f"Engagement Score: {audit['engagement_score']}/100")
-    y -= 20
-    p.drawString(50, y, f"Shadowban Risk: {audit['shadowban_risk'].upper()}")
-    y -= 20
-    p.drawString(50, y, f"Content Consistency: {audit['content_consistency']}/100")
-    if audit.get('estimated_followers'):
-        y -= 20
-        p.drawString(50, y, f"Estimated Followers: {audit['estimated_followers']:,}")
-    y -= 40
-    
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y, "Growth Mistakes:")
-    y -= 20
-    p.setFont("Helvetica", 11)
-    for mistake in audit.get('growth_mistakes', [])[:5]:
-        p.drawString(60, y, f"• {mistake[:80]}")
-        y -= 18
-    y -= 20
-    
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y, "Recommendations:")
-    y -= 20
-    p.setFont("Helvetica", 11)
-    for rec in audit.get('recommendations', [])[:7]:
-        p.drawString(60, y, f"• {rec[:80]}")
-        y -= 18
-    
-    p.setFont("Helvetica", 9)
-    p.setFillColor(HexColor("#666666"))
-    p.drawString(50, 30, f"Generated by {company_name} | {datetime.now().strftime('%Y-%m-%d')}")
-    
-    p.save()
-    buffer.seek(0)
+    pdf = await get_report_renderer().render(
+        "audit", audit_id, audit, team, (lambda: load_team_logo(user.team_id)) if team else None
+    )
     
     return Response(
-        content=buffer.getvalue(),
+        content=pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=audit_{audit['username']}.pdf"}
     )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Request, Response
 from datetime import datetime, timezone, timedelta
+from typing import Optional
 import uuid
 import jwt
 import httpx
@@ -10,6 +11,8 @@ from services import send_email
 from database import get_database
 from dependencies import create_notification
 from routers.admin_websocket import notify_new_user
+from services.search import with_search_terms, refresh_search_terms
+from services.cascade import enqueue_user_deletion
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -46,7 +49,7 @@ async def register(data: UserCreate, request: Request):
         "created_at": datetime.now(timezone.utc).isoformat(),
         "updated_at": None
     }
-    await db.users.insert_one(user_doc)
+    await db.users.insert_one(with_search_terms("users", user_doc))
     
     origin = request.headers.get("origin", "https://email-send-fail.preview.emergentagent.com")
     verify_url = f"{origin}/verify-email?token={verification_token}"
@@ -231,20 +234,28 @@ async def create_session(request: Request, response: Response):
             "email_verified": True, "team_id": None, "extra_accounts": 0,
             "created_at": datetime.now(timezone.utc).isoformat(), "updated_at": None
         }
-        await db.users.insert_one(user_doc)
+        await db.users.insert_one(with_search_terms("users", user_doc))
         await create_notification(user_id, "system", "Welcome!", "Start by adding your Instagram account.", "/accounts", db)
     else:
-        if auth_data.get("picture") != user_doc.get("picture"):
+        profile = {"picture": auth_data.get("picture")}
+        if auth_data.get("name"):
+            profile["name"] = auth_data["name"]
+        changed = {k: v for k, v in profile.items() if v != user_doc.get(k)}
+        if changed:
             await db.users.update_one(
                 {"user_id": user_doc["user_id"]},
-                {"$set": {"picture": auth_data.get("picture"), "updated_at": datetime.now(timezone.utc).isoformat()}}
+                {"$set": {**changed, "updated_at": datetime.now(timezone.utc).isoformat()}}
             )
-            user_doc["picture"] = auth_data.get("picture")
+            user_doc.update(changed)
+            if "name" in changed:
+                await refresh_search_terms("users", {"user_id": user_doc["user_id"]}, user_doc)
     
     session_token = auth_data["session_token"]
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
     await db.user_sessions.insert_one({
         "user_id": user_doc["user_id"], "session_token": session_token,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(),
+        "expires_at": expires_at.isoformat(),
+        "expire_at": expires_at,  # TTL index removes the session once expired
         "created_at": datetime.now(timezone.utc).isoformat()
     })
     
@@ -298,22 +309,79 @@ from pydantic import BaseModel
 class DataDeletionRequest(BaseModel):
     email: str
 
+DELETION_CONFIRM_HOURS = 48
+
+def _deletion_confirm_token(deletion_id: str, email: str) -> str:
+    """Signed link token proving the requester controls the email address"""
+    return jwt.encode({
+        "purpose": "data_deletion",
+        "deletion_id": deletion_id,
+        "email": email,
+        "exp": datetime.now(timezone.utc) + timedelta(hours=DELETION_CONFIRM_HOURS)
+    }, JWT_SECRET, algorithm="HS256")
+
+async def _schedule_deletion(deletion_id: str, email: str) -> Optional[str]:
+    """Enqueue the cascade for a confirmed request (30-day grace period, support can cancel)
+
+    Returns None when the request was already confirmed.
+    """
+    db = get_database()
+    scheduled = datetime.now(timezone.utc) + timedelta(days=30)
+    claimed = await db.data_deletion_requests.update_one(
+        {"deletion_id": deletion_id, "status": "awaiting_confirmation"},
+        {"$set": {
+            "status": "pending",
+            "confirmed_at": datetime.now(timezone.utc).isoformat(),
+            "scheduled_deletion": scheduled.isoformat()
+        }}
+    )
+    if not claimed.modified_count:
+        return None
+    user = await db.users.find_one({"email": email}, {"_id": 0, "user_id": 1})
+    job_id = await enqueue_user_deletion(
+        user["user_id"] if user else None, email, "gdpr_request",
+        run_after=scheduled, deletion_id=deletion_id
+    )
+    await db.data_deletion_requests.update_one({"deletion_id": deletion_id}, {"$set": {"job_id": job_id}})
+    return job_id
+
 @router.post("/data-deletion-request")
-async def request_data_deletion(data: DataDeletionRequest):
-    """Request deletion of all user data"""
+async def request_data_deletion(data: DataDeletionRequest, request: Request):
+    """Request deletion of all user data
+
+    Nothing is scheduled until ownership of the email is proven: either the
+    request comes from the signed-in owner of the address, or the owner opens
+    the signed confirmation link sent to it.
+    """
+    from dependencies import get_current_user
     db = get_database()
     deletion_id = f"DEL-{uuid.uuid4().hex[:12].upper()}"
     
+    authenticated = False
+    try:
+        user = await get_current_user(request, db)
+        authenticated = user.email.lower() == data.email.strip().lower()
+    except HTTPException:
+        pass  # Anonymous requests are confirmed by email
+    
     # Create deletion request record
     deletion_doc = {
         "deletion_id": deletion_id,
         "email": data.email,
-        "status": "pending",
+        "status": "awaiting_confirmation",
+        "job_id": None,
         "requested_at": datetime.now(timezone.utc).isoformat(),
-        "scheduled_deletion": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+        "scheduled_deletion": None
     }
     await db.data_deletion_requests.insert_one(deletion_doc)
     
+    if authenticated:
+        await _schedule_deletion(deletion_id, data.email)
+        return {"deletion_id": deletion_id, "status": "pending", "message": "Data deletion scheduled"}
+    
+    origin = request.headers.get("origin", "https://email-send-fail.preview.emergentagent.com")
+    confirm_url = f"{origin}/data-deletion?token={_deletion_confirm_token(deletion_id, data.email)}"
+    
     # Send confirmation email
     try:
         email_html = f"""
@@ -327,17 +395,44 @@ async def request_data_deletion(data: DataDeletionRequest):
                     <p style="margin: 0; font-size: 14px; color: #666;">Confirmation ID:</p>
                     <p style="margin: 10px 0 0 0; font-size: 24px; font-weight: bold; color: #333;">{deletion_id}</p>
                 </div>
-                <p>Your data will be permanently deleted within 30 days.</p>
-                <p style="font-size: 14px; color: #666;">If you did not request this, please contact support immediately.</p>
+                <p>Nothing has been deleted yet. To confirm, open the link below within {DELETION_CONFIRM_HOURS} hours; your data will then be permanently deleted within 30 days.</p>
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="{confirm_url}" style="background: #EF4444; color: white; padding: 14px 28px; text-decoration: none; border-radius: 8px; font-weight: bold;">Confirm Data Deletion</a>
+                </div>
+                <p style="font-size: 14px; color: #666;">If you did not request this, ignore this email and nothing will be deleted.</p>
             </div>
         </div>
         """
         from services import send_email
-        await send_email(data.email, "Data Deletion Request Confirmed", email_html)
+        await send_email(data.email, "Confirm your data deletion request", email_html)
     except:
         pass  # Don't fail if email fails
     
-    return {"deletion_id": deletion_id, "message": "Data deletion request submitted"}
+    return {
+        "deletion_id": deletion_id,
+        "status": "awaiting_confirmation",
+        "message": "Check your email to confirm the data deletion request"
+    }
+
+@router.post("/data-deletion-confirm")
+async def confirm_data_deletion(token: str):
+    """Confirm a data deletion request from the signed email link"""
+    db = get_database()
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=400, detail="Invalid or expired confirmation link")
+    if payload.get("purpose") != "data_deletion":
+        raise HTTPException(status_code=400, detail="Invalid or expired confirmation link")
+    
+    deletion = await db.data_deletion_requests.find_one(
+        {"deletion_id": payload["deletion_id"], "email": payload["email"]}, {"_id": 0}
+    )
+    if not deletion:
+        raise HTTPException(status_code=404, detail="Deletion request not found")
+    if not await _schedule_deletion(deletion["deletion_id"], payload["email"]):
+        return {"deletion_id": deletion["deletion_id"], "status": deletion["status"], "message": "Already confirmed"}
+    return {"deletion_id": deletion["deletion_id"], "status": "pending", "message": "Data deletion scheduled"}
 
 @router.post("/data-deletion-callback")
 async def instagram_data_deletion_callback(request: Request):
@@ -6,10 +6,13 @@ import json
 import httpx
 import logging
 
-from models import ContentItem, ContentRequest
+from models import ContentItem, ContentRequest, response_projection
+from utils import trusted_response
 from database import get_database
 from dependencies import get_current_user, check_ai_usage, increment_ai_usage
 from services import generate_ai_content, AI_TIMEOUT_MEDIUM
+from services.counters import get_counters
+from services.post_analytics import analyze_posts
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/content", tags=["Content Engine"])
@@ -35,29 +38,6 @@ async def fetch_account_posts(access_token: str, limit: int = 10):
         logger.warning(f"Could not fetch posts for context: {e}")
     return []
 
-def analyze_content_style(posts: list):
-    """Analyze existing content style from real posts"""
-    if not posts:
-        return {}
-    
-    captions = [p.get("caption", "") for p in posts if p.get("caption")]
-    content_types = {}
-    for p in posts:
-        t = p.get("media_type", "IMAGE")
-        content_types[t] = content_types.get(t, 0) + 1
-    
-    avg_caption_length = sum(len(c) for c in captions) / len(captions) if captions else 0
-    uses_emojis = any("😀" in c or "🔥" in c or "❤" in c or "✨" in c for c in captions)
-    uses_hashtags = any("#" in c for c in captions)
-    
-    return {
-        "avg_caption_length": int(avg_caption_length),
-        "uses_emojis": uses_emojis,
-        "uses_hashtags": uses_hashtags,
-        "content_mix": content_types,
-        "sample_captions": captions[:3]
-    }
-
 @router.post("/generate", response_model=ContentItem)
 async def generate_content(data: ContentRequest, request: Request):
     db = get_database()
@@ -88,7 +68,7 @@ async def generate_content(data: ContentRequest, request: Request):
     if account.get("access_token"):
         logger.info(f"Fetching real posts for content context @{account['username']}")
         posts = await fetch_account_posts(account["access_token"], limit=10)
-        content_style = analyze_content_style(posts)
+        content_style = analyze_posts(posts)
     
     # Build context-aware prompt
     style_context = ""
@@ -98,8 +78,8 @@ REAL ACCOUNT ANALYSIS:
 - Average caption length: {content_style.get('avg_caption_length', 0)} characters
 - Uses emojis: {'Yes' if content_style.get('uses_emojis') else 'No'}
 - Uses hashtags: {'Yes' if content_style.get('uses_hashtags') else 'No'}
-- Content mix: {content_style.get('content_mix', {})}
-- Sample captions from their posts: {content_style.get('sample_captions', [])}
+- Content mix: {content_style.get('post_types', {})}
+- Sample captions from their posts: {content_style.get('recent_captions', [])[:3]}
 
 Match this style in generated content."""
     
@@ -168,6 +148,7 @@ Return JSON array of strings."""
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.content_items.insert_one(content_doc)
+    await get_counters().record(user.user_id, "content_items_count", 1)
     return ContentItem(**content_doc)
 
 @router.get("", response_model=List[ContentItem])
@@ -184,8 +165,8 @@ async def get_content(account_id: Optional[str] = None, content_type: Optional[s
     if favorites_only:
         query["is_favorite"] = True
     
-    items = await db.content_items.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return [ContentItem(**item) for item in items]
+    items = await db.content_items.find(query, response_projection(ContentItem)).sort("created_at", -1).to_list(100)
+    return trusted_response(items)
 
 @router.put("/{content_id}/favorite")
 async def toggle_favorite(content_id: str, request: Request):
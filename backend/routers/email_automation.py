@@ -9,6 +9,7 @@ import asyncio
 from database import get_database
 from services import send_email
 from routers.admin_panel_auth import verify_admin_token
+from services.retention import read_archive, list_archive_days, archived_stats
 
 router = APIRouter(prefix="/email-automation", tags=["Email Automation"])
 
@@ -775,9 +776,15 @@ async def get_email_logs(
     
     logs = await db.email_logs.find(query, {"_id": 0}).sort("sent_at", -1).limit(limit).to_list(limit)
     
-    # Get stats
-    total_sent = await db.email_logs.count_documents({"status": "sent"})
-    total_failed = await db.email_logs.count_documents({"status": "failed"})
+    # Get stats (hot collection in one pass, plus the per-chunk totals of archived logs)
+    by_status = await db.email_logs.aggregate([
+        {"$match": {"status": {"$in": ["sent", "failed"]}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]).to_list(2)
+    hot = {row["_id"]: row["count"] for row in by_status}
+    archived = await archived_stats("email_logs")
+    total_sent = hot.get("sent", 0) + archived.get("sent", 0)
+    total_failed = hot.get("failed", 0) + archived.get("failed", 0)
     
     return {
         "logs": logs,
@@ -788,6 +795,23 @@ async def get_email_logs(
         }
     }
 
+@router.get("/logs/archive")
+async def get_archived_email_logs(
+    day: str = None,
+    email_type: str = None,
+    status: str = None,
+    request: Request = None
+):
+    """Archived email logs: the list of archived days, or every log of one day (YYYY-MM-DD)"""
+    await verify_admin_token(request)
+    
+    if not day:
+        return {"days": await list_archive_days("email_logs")}
+    
+    filters = {k: v for k, v in {"type": email_type, "status": status}.items() if v}
+    logs = await read_archive("email_logs", day, filters)
+    return {"day": day, "logs": logs, "total": len(logs)}
+
 @router.get("/stats")
 async def get_email_stats(request: Request = None):
     """Get email automation statistics"""
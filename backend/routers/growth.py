@@ -5,15 +5,15 @@ import uuid
 import json
 import httpx
 import logging
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.colors import HexColor
 
-from models import GrowthPlan, GrowthPlanRequest
+from models import GrowthPlan, GrowthPlanRequest, GrowthPlanSummary, response_projection
+from utils import trusted_response
 from database import get_database
 from dependencies import get_current_user, check_ai_usage, increment_ai_usage
 from services import generate_ai_content, AI_TIMEOUT_LONG
+from services.counters import get_counters
+from services.post_analytics import analyze_posts
+from services.reports import get_report_renderer, BRANDING_FIELDS
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/growth-plans", tags=["Growth Planner"])
@@ -48,28 +48,22 @@ async def fetch_account_metrics(access_token: str):
             profile = profile_resp.json() if profile_resp.status_code == 200 else {}
             media = media_resp.json().get("data", []) if media_resp.status_code == 200 else []
             
-            # Calculate metrics
-            total_likes = sum(m.get("like_count", 0) for m in media)
-            total_comments = sum(m.get("comments_count", 0) for m in media)
-            avg_engagement = (total_likes + total_comments) / len(media) if media else 0
             followers = profile.get("followers_count", 0)
-            engagement_rate = (avg_engagement / followers * 100) if followers else 0
-            
-            # Analyze content types
-            content_types = {}
-            for m in media:
-                t = m.get("media_type", "IMAGE")
-                content_types[t] = content_types.get(t, 0) + 1
+            analysis = analyze_posts(media, followers)
             
             return {
                 "followers": followers,
                 "following": profile.get("follows_count", 0),
                 "media_count": profile.get("media_count", 0),
-                "avg_likes": total_likes / len(media) if media else 0,
-                "avg_comments": total_comments / len(media) if media else 0,
-                "engagement_rate": round(engagement_rate, 2),
-                "content_mix": content_types,
-                "posts_analyzed": len(media)
+                "avg_likes": analysis.get("avg_likes", 0),
+                "avg_comments": analysis.get("avg_comments", 0),
+                "engagement_rate": analysis.get("engagement_rate", 0),
+                "content_mix": analysis.get("post_types", {}),
+                "posts_analyzed": analysis.get("total_posts_analyzed", 0),
+                "posting_frequency": analysis.get("posting_frequency", "Unknown"),
+                "posts_per_week": analysis.get("posts_per_week"),
+                "type_engagement": analysis.get("type_engagement", {}),
+                "best_time_slots": analysis.get("best_time_slots", [])
             }
     except Exception as e:
         logger.warning(f"Could not fetch account metrics: {e}")
@@ -107,6 +101,9 @@ REAL ACCOUNT METRICS:
 - Average Comments/Post: {real_metrics.get('avg_comments', 0):.0f}
 - Engagement Rate: {real_metrics.get('engagement_rate', 0)}%
 - Content Mix: {real_metrics.get('content_mix', {})}
+- Posting Frequency: {real_metrics.get('posting_frequency', 'Unknown')} ({real_metrics.get('posts_per_week', 'N/A')} posts/week)
+- Avg Engagement by Type: {real_metrics.get('type_engagement', {})}
+- Best Time Slots (UTC): {real_metrics.get('best_time_slots', [])}
 
 Create a plan that addresses these specific metrics and helps improve engagement."""
     
@@ -173,9 +170,10 @@ Focus on realistic, achievable goals based on their current metrics."""
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     await db.growth_plans.insert_one(plan_doc)
+    await get_counters().record(user.user_id, "growth_plans_count", 1)
     return GrowthPlan(**plan_doc)
 
-@router.get("", response_model=List[GrowthPlan])
+@router.get("", response_model=List[GrowthPlanSummary])
 async def get_growth_plans(account_id: Optional[str] = None, request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
@@ -184,8 +182,16 @@ async def get_growth_plans(account_id: Optional[str] = None, request: Request =
     if account_id:
         query["account_id"] = account_id
     
-    plans = await db.growth_plans.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return [GrowthPlan(**p) for p in plans]
+    plans = await db.growth_plans.aggregate([
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        {"$limit": 100},
+        {"$project": {
+            **response_projection(GrowthPlanSummary, exclude=("task_count",)),
+            "task_count": {"$size": {"$ifNull": ["$daily_tasks", []]}}
+        }}
+    ]).to_list(100)
+    return trusted_response(plans)
 
 @router.get("/{plan_id}", response_model=GrowthPlan)
 async def get_growth_plan(plan_id: str, request: Request):
@@ -211,44 +217,12 @@ async def get_growth_plan_pdf(plan_id: str, request: Request):
     
     team = None
     if user.team_id:
-        team = await db.teams.find_one({"team_id": user.team_id}, {"_id": 0})
-    
-    brand_color = team.get("brand_color", "#6366F1") if team else "#6366F1"
-    company_name = team.get("name", "InstaGrowth OS") if team else "InstaGrowth OS"
-    
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    p.setFillColor(HexColor(brand_color))
-    p.rect(0, height - 100, width, 100, fill=True)
-    p.setFillColor(HexColor("#FFFFFF"))
-    p.setFont("Helvetica-Bold", 20)
-    p.drawString(50, height - 55, f"{company_name} - Growth Plan")
-    
-    y = height - 140
-    p.setFillColor(HexColor("#000000"))
-    p.setFont("Helvetica-Bold", 14)
-    p.drawString(50, y, f"{plan['duration']}-Day Growth Plan")
-    y -= 30
-    
-    p.setFont("Helvetica", 11)
-    for task in plan.get('daily_tasks', [])[:15]:
-        p.drawString(50, y, f"Day {task['day']}: {task['title'][:60]}")
-        y -= 16
-        if y < 50:
-            p.showPage()
-            y = height - 50
-    
-    p.setFont("Helvetica", 9)
-    p.setFillColor(HexColor("#666666"))
-    p.drawString(50, 30, f"Generated by {company_name} | {datetime.now().strftime('%Y-%m-%d')}")
-    
-    p.save()
-    buffer.seek(0)
+        team = await db.teams.find_one({"team_id": user.team_id}, BRANDING_FIELDS)
+    
+    pdf = await get_report_renderer().render("growth_plan", plan_id, plan, team)
     
     return Response(
-        content=buffer.getvalue(),
+        content=pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=growth_plan_{plan_id}.pdf"}
     )
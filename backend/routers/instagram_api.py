@@ -17,6 +17,7 @@ import logging
 
 from database import get_database
 from dependencies import get_current_user
+from services.posting_times import get_posting_time_engine
 
 router = APIRouter(prefix="/instagram-api", tags=["Instagram API"])
 
@@ -99,6 +100,13 @@ class InstagramAPIClient:
 
 # ==================== OAuth Flow ====================
 
+async def ingest_posting_times(account: dict, media: List[Dict[str, Any]]):
+    """Feed freshly synced media into the posting time engine"""
+    try:
+        await get_posting_time_engine().ingest(account["account_id"], account.get("niche"), media)
+    except Exception as e:
+        logger.warning(f"Posting time ingest failed for {account['account_id']}: {e}")
+
 @router.get("/auth/url")
 async def get_instagram_auth_url(request: Request):
     """Generate Instagram OAuth URL"""
@@ -243,6 +251,8 @@ async def get_real_instagram_profile(account_id: str, request: Request):
         profile = await ig_client.get_user_profile()
         media = await ig_client.get_user_media(limit=10)
         
+        await ingest_posting_times(account, media)
+        
         # Calculate engagement rate from recent posts
         if media:
             total_engagement = sum((m.get("like_count", 0) + m.get("comments_count", 0)) for m in media)
@@ -363,6 +373,8 @@ async def sync_instagram_data(account_id: str, request: Request):
         profile = await ig_client.get_user_profile()
         media = await ig_client.get_user_media(limit=25)
         
+        await ingest_posting_times(account, media)
+        
         # Calculate metrics
         if media:
             total_likes = sum(m.get("like_count", 0) for m in media)
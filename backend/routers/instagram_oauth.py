@@ -8,6 +8,10 @@ import logging
 
 from database import get_database
 from dependencies import get_current_user
+from services.settings_cache import get_system_settings
+from services.counters import get_counters
+from services.search import with_search_terms, refresh_search_terms
+from services.retention import expire_after, OAUTH_STATE_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +25,11 @@ INSTAGRAM_GRAPH_URL = "https://graph.instagram.com"
 META_GRAPH_URL = "https://graph.facebook.com/v18.0"
 
 async def get_meta_credentials():
-    """Get Meta API credentials from system settings or environment"""
-    db = get_database()
-    settings = await db.system_settings.find_one({"setting_id": "global"}, {"_id": 0})
+    """Get Meta API credentials from the cached system settings or environment"""
+    settings = await get_system_settings()
     
-    app_id = settings.get("meta_app_id") if settings else None
-    app_secret = settings.get("meta_app_secret") if settings else None
+    app_id = settings.meta_app_id
+    app_secret = settings.meta_app_secret
     
     if not app_id:
         app_id = os.environ.get("META_APP_ID")
@@ -73,6 +76,7 @@ async def get_instagram_auth_url(request: Request):
         {"$set": {
             "user_id": user.user_id,
             "created_at": datetime.now(timezone.utc).isoformat(),
+            "expire_at": expire_after(OAUTH_STATE_TTL),
             "type": "instagram"
         }},
         upsert=True
@@ -231,7 +235,8 @@ async def instagram_callback(request: Request, code: str = None, state: str = No
             else:
                 # Insert new account
                 logger.info(f"Creating new Instagram account for user {user_id}: @{username}")
-                await db.instagram_accounts.insert_one(account_doc)
+                await db.instagram_accounts.insert_one(with_search_terms("instagram_accounts", account_doc))
+                await get_counters().record(user_id, "accounts_count", 1)
                 logger.info(f"Successfully created account @{username} with id {account_id}")
             
             return RedirectResponse(f"{site_url}/accounts?success=true&connected=1")
@@ -327,6 +332,8 @@ async def refresh_instagram_data(account_id: str, request: Request):
                 {"account_id": account_id},
                 {"$set": update_data}
             )
+            if update_data.get("username", account.get("username")) != account.get("username"):
+                await refresh_search_terms("instagram_accounts", {"account_id": account_id})
             
             return {
                 "message": "Account refreshed",
@@ -4,6 +4,7 @@ from typing import List
 
 from database import get_database
 from dependencies import get_current_user
+from services.notifications import get_notification_service
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -22,7 +23,7 @@ async def get_unread_count(request: Request):
     db = get_database()
     user = await get_current_user(request, db)
     
-    count = await db.notifications.count_documents({"user_id": user.user_id, "read": False})
+    count = await get_notification_service().get_unread_count(user.user_id)
     return {"count": count}
 
 @router.put("/{notification_id}/read")
@@ -30,10 +31,7 @@ async def mark_notification_read(notification_id: str, request: Request):
     db = get_database()
     user = await get_current_user(request, db)
     
-    await db.notifications.update_one(
-        {"notification_id": notification_id, "user_id": user.user_id},
-        {"$set": {"read": True}}
-    )
+    await get_notification_service().mark_read(user.user_id, notification_id)
     return {"message": "Notification marked as read"}
 
 @router.put("/read-all")
@@ -41,8 +39,5 @@ async def mark_all_read(request: Request):
     db = get_database()
     user = await get_current_user(request, db)
     
-    await db.notifications.update_many(
-        {"user_id": user.user_id, "read": False},
-        {"$set": {"read": True}}
-    )
+    await get_notification_service().mark_all_read(user.user_id)
     return {"message": "All notifications marked as read"}
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Request
 from database import get_database
 from dependencies import get_current_user
 from routers.admin_panel_auth import verify_admin_token
+from services.search import SEARCH_TERMS_FIELD
 from security import (
     get_blocked_ips, block_ip, unblock_ip,
     get_suspicious_users, flag_suspicious_user, unflag_suspicious_user,
@@ -134,7 +135,7 @@ async def get_suspicious_users_list(request: Request):
     # Get user details
     users = []
     for user_id in flagged_ids:
-        user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0})
+        user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0, SEARCH_TERMS_FIELD: 0})
         if user:
             users.append(user)
     
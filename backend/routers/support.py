@@ -5,10 +5,17 @@ from fastapi import APIRouter, HTTPException, Request, UploadFile, File
 from datetime import datetime, timezone
 from typing import Optional, List
 import uuid
+from pymongo import ReturnDocument
 
 from database import get_database
 from dependencies import get_current_user
 from services import send_email
+from services.search import with_search_terms
+from services.ticket_stats import STATS_FIELDS, get_ticket_stats
+from services.tickets import (
+    HEADER_PROJECTION, build_message, add_message, message_preview,
+    get_messages, get_ticket_with_messages
+)
 
 router = APIRouter(prefix="/support", tags=["Support"])
 
@@ -37,22 +44,18 @@ async def create_ticket(
         "category": category,  # general, billing, technical, feature, bug
         "priority": priority,  # low, normal, high, urgent
         "status": "open",
-        "messages": [{
-            "message_id": f"MSG-{uuid.uuid4().hex[:8]}",
-            "sender_type": "user",
-            "sender_id": user.user_id,
-            "sender_name": user.name,
-            "message": message,
-            "attachments": [],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }],
+        "message_count": 0,
+        "last_message": None,
         "created_at": datetime.now(timezone.utc).isoformat(),
         "updated_at": datetime.now(timezone.utc).isoformat(),
         "resolved_at": None,
         "assigned_to": None
     }
     
-    await db.support_tickets.insert_one(ticket)
+    await db.support_tickets.insert_one(with_search_terms("support_tickets", ticket))
+    get_ticket_stats().record_change(None, ticket)
+    first_message = build_message("user", user.user_id, user.name, message)
+    await add_message(ticket_id, first_message)
     
     # Send confirmation email
     try:
@@ -78,6 +81,8 @@ async def create_ticket(
         pass
     
     del ticket["_id"]
+    ticket.pop("search_terms", None)
+    ticket.update({"message_count": 1, "last_message": message_preview(first_message), "messages": [first_message]})
     return ticket
 
 @router.get("/tickets")
@@ -93,7 +98,7 @@ async def get_user_tickets(
     if status:
         query["status"] = status
     
-    tickets = await db.support_tickets.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    tickets = await db.support_tickets.find(query, HEADER_PROJECTION).sort("created_at", -1).to_list(100)
     return {"tickets": tickets}
 
 @router.get("/tickets/{ticket_id}")
@@ -102,16 +107,25 @@ async def get_ticket(ticket_id: str, request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
     
-    ticket = await db.support_tickets.find_one(
-        {"ticket_id": ticket_id, "user_id": user.user_id},
-        {"_id": 0}
-    )
+    ticket = await get_ticket_with_messages({"ticket_id": ticket_id, "user_id": user.user_id})
     
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
     return ticket
 
+@router.get("/tickets/{ticket_id}/messages")
+async def get_ticket_messages(ticket_id: str, cursor: str = None, limit: int = 50, request: Request = None):
+    """Get older messages of a ticket (pass messages_cursor from the previous page)"""
+    db = get_database()
+    user = await get_current_user(request, db)
+    
+    ticket = await db.support_tickets.find_one({"ticket_id": ticket_id, "user_id": user.user_id}, {"_id": 1})
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    
+    return await get_messages(ticket_id, cursor, limit)
+
 @router.post("/tickets/{ticket_id}/reply")
 async def reply_to_ticket(
     ticket_id: str,
@@ -123,7 +137,8 @@ async def reply_to_ticket(
     user = await get_current_user(request, db)
     
     ticket = await db.support_tickets.find_one(
-        {"ticket_id": ticket_id, "user_id": user.user_id}
+        {"ticket_id": ticket_id, "user_id": user.user_id},
+        {"_id": 0, "status": 1}
     )
     
     if not ticket:
@@ -132,26 +147,8 @@ async def reply_to_ticket(
     if ticket["status"] == "closed":
         raise HTTPException(status_code=400, detail="Cannot reply to closed ticket")
     
-    new_message = {
-        "message_id": f"MSG-{uuid.uuid4().hex[:8]}",
-        "sender_type": "user",
-        "sender_id": user.user_id,
-        "sender_name": user.name,
-        "message": message,
-        "attachments": [],
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.support_tickets.update_one(
-        {"ticket_id": ticket_id},
-        {
-            "$push": {"messages": new_message},
-            "$set": {
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "status": "open" if ticket["status"] == "pending" else ticket["status"]
-            }
-        }
-    )
+    new_message = build_message("user", user.user_id, user.name, message)
+    await add_message(ticket_id, new_message, {"status": "open" if ticket["status"] == "pending" else ticket["status"]})
     
     return {"message": "Reply added", "message_id": new_message["message_id"]}
 
@@ -161,16 +158,20 @@ async def close_ticket(ticket_id: str, request: Request = None):
     db = get_database()
     user = await get_current_user(request, db)
     
-    result = await db.support_tickets.update_one(
+    before = await db.support_tickets.find_one_and_update(
         {"ticket_id": ticket_id, "user_id": user.user_id},
         {"$set": {
             "status": "closed",
             "resolved_at": datetime.now(timezone.utc).isoformat(),
             "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
+        }},
+        projection=STATS_FIELDS,
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if not before:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
+    get_ticket_stats().record_change(before, {**before, "status": "closed"})
+    
     return {"message": "Ticket closed"}
@@ -2,12 +2,12 @@ from fastapi import APIRouter, HTTPException, Request, UploadFile, File
 from datetime import datetime, timezone
 from typing import List
 import uuid
-import base64
 
 from models import Team, TeamCreate, TeamInvite, TeamMemberUpdate, WhiteLabelSettings
 from database import get_database
 from dependencies import get_current_user, create_notification
 from services import send_email
+from services.assets import store_image, decode_data_url, asset_url
 from utils import create_verification_token
 
 router = APIRouter(prefix="/teams", tags=["Team Management"])
@@ -221,14 +221,23 @@ async def update_team_settings(team_id: str, data: WhiteLabelSettings, request:
     
     update_data = {}
     if data.logo_url is not None:
-        update_data["logo_url"] = data.logo_url
+        if data.logo_url.startswith("data:"):
+            # Inline images are moved to the asset store; the team keeps a reference
+            contents, content_type = decode_data_url(data.logo_url)
+            logo_asset = await store_image(contents, content_type)
+            update_data["logo_asset"] = logo_asset
+            update_data["logo_url"] = asset_url(logo_asset["hash"])
+        else:
+            update_data["logo_asset"] = None
+            update_data["logo_url"] = data.logo_url or None
     if data.brand_color:
         update_data["brand_color"] = data.brand_color
     if data.company_name:
         update_data["name"] = data.company_name
     
     if update_data:
-        await db.teams.update_one({"team_id": team_id}, {"$set": update_data})
+        # Bumping branding_version invalidates cached branded PDF reports
+        await db.teams.update_one({"team_id": team_id}, {"$set": update_data, "$inc": {"branding_version": 1}})
     
     team = await db.teams.find_one({"team_id": team_id}, {"_id": 0})
     return team
@@ -245,8 +254,11 @@ async def upload_team_logo(team_id: str, file: UploadFile = File(...), request:
         raise HTTPException(status_code=403, detail="Only team owner can upload logo")
     
     contents = await file.read()
-    logo_b64 = base64.b64encode(contents).decode()
-    logo_url = f"data:{file.content_type};base64,{logo_b64}"
+    logo_asset = await store_image(contents, file.content_type)
+    logo_url = asset_url(logo_asset["hash"])
     
-    await db.teams.update_one({"team_id": team_id}, {"$set": {"logo_url": logo_url}})
-    return {"logo_url": logo_url}
+    await db.teams.update_one(
+        {"team_id": team_id},
+        {"$set": {"logo_url": logo_url, "logo_asset": logo_asset}, "$inc": {"branding_version": 1}}
+    )
+    return {"logo_url": logo_url, "logo_asset": logo_asset}
@@ -1,67 +1,102 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 import logging
 
+from services.realtime import QueuedWebSocket, encode_message, get_broker
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["WebSocket"])
 
+USER_EVENTS_CHANNEL = "user_events"
+
 # Store active WebSocket connections
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    """Per-worker registry of user sockets; cross-worker delivery goes through the broker"""
+    
+    def __init__(self, broker=None):
+        self.active_connections: Dict[str, List[QueuedWebSocket]] = {}
+        self.broker = broker or get_broker()
     
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(self, websocket: WebSocket, user_id: str) -> QueuedWebSocket:
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        connection = QueuedWebSocket(websocket)
+        connection.start()
+        self.active_connections.setdefault(user_id, []).append(connection)
         logger.info(f"WebSocket connected for user {user_id}")
+        return connection
     
-    def disconnect(self, websocket: WebSocket, user_id: str):
+    def disconnect(self, connection: QueuedWebSocket, user_id: str):
+        connection.close()
         if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
+            if connection in self.active_connections[user_id]:
+                self.active_connections[user_id].remove(connection)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
         logger.info(f"WebSocket disconnected for user {user_id}")
     
+    def deliver_local(self, text: str, user_id: Optional[str] = None):
+        """Enqueue a serialized frame on this worker's sockets (all users if user_id is None)"""
+        if user_id is not None:
+            targets = self.active_connections.get(user_id, [])
+        else:
+            targets = [c for conns in self.active_connections.values() for c in conns]
+        for connection in list(targets):
+            connection.enqueue(text)
+    
     async def send_personal_message(self, message: dict, user_id: str):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to {user_id}: {e}")
+        text = encode_message(message)
+        self.deliver_local(text, user_id)
+        await self.broker.publish(USER_EVENTS_CHANNEL, {"user_id": user_id, "payload": text})
+    
+    async def send_to_users(self, message: dict, user_ids: List[str]):
+        """One frame to many users, published to other workers as a single event"""
+        text = encode_message(message)
+        for user_id in user_ids:
+            self.deliver_local(text, user_id)
+        await self.broker.publish(USER_EVENTS_CHANNEL, {"user_ids": user_ids, "payload": text})
     
     async def broadcast(self, message: dict):
-        for user_id, connections in self.active_connections.items():
+        text = encode_message(message)
+        self.deliver_local(text)
+        await self.broker.publish(USER_EVENTS_CHANNEL, {"user_id": None, "payload": text})
+    
+    async def _on_remote_event(self, event: dict):
+        if "user_ids" in event:
+            for user_id in event["user_ids"]:
+                self.deliver_local(event["payload"], user_id)
+            return
+        self.deliver_local(event["payload"], event.get("user_id"))
+    
+    def start(self):
+        self.broker.start(USER_EVENTS_CHANNEL, self._on_remote_event)
+    
+    async def stop(self):
+        for connections in list(self.active_connections.values()):
             for connection in connections:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to {user_id}: {e}")
+                connection.close(1001)
+        self.active_connections.clear()
 
 manager = ConnectionManager()
 
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
             
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                connection.send_json({"type": "pong"})
             elif message.get("type") == "subscribe":
-                await websocket.send_json({"type": "subscribed", "channel": message.get("channel")})
+                connection.send_json({"type": "subscribed", "channel": message.get("channel")})
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(connection, user_id)
     except Exception as e:
         logger.error(f"WebSocket error for user {user_id}: {e}")
-        manager.disconnect(websocket, user_id)
+        manager.disconnect(connection, user_id)
 
 async def notify_user(user_id: str, notification_type: str, title: str, message: str, action_url: str = None):
     """Send real-time notification to user"""
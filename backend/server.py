@@ -5,14 +5,13 @@ Version: 2.0.0
 Modular FastAPI application with separate routers for each feature domain.
 """
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+import asyncio
 import os
 import logging
 from pathlib import Path
-from io import StringIO
-import csv
 from datetime import datetime, timezone
 
 # Load environment variables
@@ -27,7 +26,24 @@ from routers import (
 )
 from routers import admin_panel_auth, admin_panel_users, admin_panel_subscriptions, admin_panel_dashboard
 from routers import instagram_api, admin_websocket, user_2fa, instagram_oauth
-from database import get_database
+from database import get_database, ensure_indexes
+from services.settings_cache import get_settings_cache
+from services.realtime import get_broker
+from services.counters import get_counters
+from services.exports import export_projection, export_response
+from services.search import backfill_search_terms
+from services.tickets import migrate_embedded_messages
+from services.cascade import get_cascade_worker
+from services.reports import get_report_renderer
+from services.revenue import get_revenue_engine
+from services.assets import migrate_team_logos
+from services.announcements import get_announcement_cache, migrate_dismissals
+from services.notifications import get_notification_service
+from services.retention import get_retention_worker
+from services.audit_log import get_audit_log_sink
+from services.admin_principals import get_admin_principal_cache
+from services.posting_times import get_posting_time_engine
+from services.benchmarks import get_niche_benchmarks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -37,7 +53,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="InstaGrowth OS API",
     description="AI-powered Instagram Growth & Management Platform",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -78,7 +95,7 @@ app.include_router(user_2fa.router, prefix="/api")
 app.include_router(instagram_oauth.router, prefix="/api")
 
 # Support & Announcements routers
-from routers import support, admin_tickets, announcements, credits, security_router, referrals, email_automation
+from routers import support, admin_tickets, announcements, credits, security_router, referrals, email_automation, assets
 app.include_router(support.router, prefix="/api")
 app.include_router(admin_tickets.router, prefix="/api")
 app.include_router(announcements.router, prefix="/api")
@@ -86,6 +103,65 @@ app.include_router(credits.router, prefix="/api")
 app.include_router(security_router.router, prefix="/api")
 app.include_router(referrals.router, prefix="/api")
 app.include_router(email_automation.router, prefix="/api")
+app.include_router(assets.router, prefix="/api")
+
+# Background services
+
+# One-off data migrations run after startup; held here so they are not
+# garbage-collected, their failures are logged and shutdown cancels them
+migration_tasks: set = set()
+
+def _migration_done(task: asyncio.Task):
+    migration_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Migration {task.get_name()} failed: {task.exception()}")
+
+def run_migration(coro):
+    task = asyncio.create_task(coro, name=coro.__name__)
+    migration_tasks.add(task)
+    task.add_done_callback(_migration_done)
+
+@app.on_event("startup")
+async def start_background_services():
+    await ensure_indexes()
+    run_migration(backfill_search_terms())
+    run_migration(migrate_embedded_messages())
+    run_migration(migrate_team_logos())
+    run_migration(migrate_dismissals())
+    get_settings_cache().start()
+    websocket.get_manager().start()
+    admin_websocket.get_admin_manager().start()
+    get_counters().start()
+    get_cascade_worker().start()
+    get_announcement_cache().start()
+    get_notification_service().start()
+    get_retention_worker().start()
+    get_audit_log_sink().start()
+    get_admin_principal_cache().start()
+    get_posting_time_engine().start()
+    get_niche_benchmarks().start()
+    get_report_renderer().start()
+    get_revenue_engine().start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    # Migrations are resumable; the next start picks up where these stop
+    for task in list(migration_tasks):
+        task.cancel()
+    await asyncio.gather(*migration_tasks, return_exceptions=True)
+    await get_settings_cache().stop()
+    await websocket.get_manager().stop()
+    await admin_websocket.get_admin_manager().stop()
+    await get_counters().stop()
+    await get_cascade_worker().stop()
+    await get_announcement_cache().stop()
+    await get_notification_service().stop()
+    await get_retention_worker().stop()
+    await get_audit_log_sink().stop()
+    await get_niche_benchmarks().stop()
+    await get_report_renderer().stop()
+    await get_revenue_engine().stop()
+    await get_broker().stop()
 
 # Root endpoint
 @app.get("/api/")
@@ -178,58 +254,51 @@ async def get_dashboard_stats(request: Request):
     db = get_database()
     user = await get_current_user(request, db)
     
-    accounts = await db.instagram_accounts.count_documents({"user_id": user.user_id})
-    audits = await db.audits.count_documents({"user_id": user.user_id})
-    content_items = await db.content_items.count_documents({"user_id": user.user_id})
-    growth_plans = await db.growth_plans.count_documents({"user_id": user.user_id})
+    # Served from in-memory counters; live changes arrive as stats_delta frames on /ws/{user_id}
+    counters = await get_counters().get_user_counters(user.user_id)
     
     recent_audits = await db.audits.find(
         {"user_id": user.user_id}, {"_id": 0}
     ).sort("created_at", -1).limit(5).to_list(5)
     
     return {
-        "accounts_count": accounts,
+        "accounts_count": counters["accounts_count"],
         "account_limit": user.account_limit,
-        "audits_count": audits,
-        "content_items_count": content_items,
-        "growth_plans_count": growth_plans,
+        "audits_count": counters["audits_count"],
+        "content_items_count": counters["content_items_count"],
+        "growth_plans_count": counters["growth_plans_count"],
         "ai_usage_current": user.ai_usage_current,
         "ai_usage_limit": user.ai_usage_limit,
         "recent_audits": recent_audits
     }
 
 # CSV Export endpoint
+EXPORT_DATASETS = {
+    "accounts": ("instagram_accounts", ["username", "niche", "follower_count", "engagement_rate", "status", "created_at"]),
+    "audits": ("audits", ["username", "engagement_score", "shadowban_risk", "content_consistency", "created_at"]),
+    "content": ("content_items", ["content_type", "content", "is_favorite", "created_at"]),
+}
+
+def _flatten_content(item: dict) -> dict:
+    if "content" in item and isinstance(item["content"], list):
+        item["content"] = "; ".join(str(c) for c in item["content"])
+    return item
+
 @app.get("/api/export/csv")
-async def export_data_csv(data_type: str, request: Request):
+async def export_data_csv(data_type: str, request: Request, format: str = "csv", gzip: bool = False):
     from dependencies import get_current_user
     db = get_database()
     user = await get_current_user(request, db)
     
-    if data_type == "accounts":
-        data = await db.instagram_accounts.find({"user_id": user.user_id}, {"_id": 0}).to_list(1000)
-        fields = ["username", "niche", "follower_count", "engagement_rate", "status", "created_at"]
-    elif data_type == "audits":
-        data = await db.audits.find({"user_id": user.user_id}, {"_id": 0}).to_list(1000)
-        fields = ["username", "engagement_score", "shadowban_risk", "content_consistency", "created_at"]
-    elif data_type == "content":
-        data = await db.content_items.find({"user_id": user.user_id}, {"_id": 0}).to_list(1000)
-        fields = ["content_type", "content", "is_favorite", "created_at"]
-    else:
+    if data_type not in EXPORT_DATASETS:
         return {"error": "Invalid data type. Use: accounts, audits, or content"}
     
-    output = StringIO()
-    writer = csv.DictWriter(output, fieldnames=fields, extrasaction='ignore')
-    writer.writeheader()
-    for item in data:
-        if "content" in item and isinstance(item["content"], list):
-            item["content"] = "; ".join(str(c) for c in item["content"])
-        writer.writerow(item)
+    collection, fields = EXPORT_DATASETS[data_type]
+    cursor = db[collection].find({"user_id": user.user_id}, export_projection(fields))
     
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={data_type}_export.csv"}
+    return export_response(
+        cursor, fields, f"{data_type}_export", fmt=format, compress=gzip,
+        transform=_flatten_content if data_type == "content" else None
     )
 
 # One-time products
@@ -6,6 +6,8 @@ import resend
 from typing import Dict, Any, Optional
 from fastapi import HTTPException
 
+from services.settings_cache import get_system_settings
+
 logger = logging.getLogger(__name__)
 
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY')
@@ -17,37 +19,35 @@ AI_TIMEOUT_SHORT = 30   # For simple operations (metrics, DM replies)
 AI_TIMEOUT_MEDIUM = 60  # For standard operations (content, audits)
 AI_TIMEOUT_LONG = 120   # For complex operations (growth plans)
 
+# Model used by generate_ai_content (recorded on credit events for cost attribution)
+AI_PROVIDER = "openai"
+AI_MODEL = "gpt-5.2"
+
 async def get_resend_api_key():
-    """Get Resend API key from env or database settings"""
+    """Get Resend API key from env or the cached system settings"""
     global RESEND_API_KEY
     if RESEND_API_KEY and RESEND_API_KEY != "re_placeholder_key":
         return RESEND_API_KEY
     
-    # Try to get from database
     try:
-        from database import get_database
-        db = get_database()
-        settings = await db.system_settings.find_one({"setting_id": "global"}, {"_id": 0})
-        if settings and settings.get("resend_api_key"):
-            return settings.get("resend_api_key")
+        settings = await get_system_settings()
+        if settings.resend_api_key:
+            return settings.resend_api_key
     except Exception as e:
-        logger.warning(f"Could not get Resend API key from database: {e}")
+        logger.warning(f"Could not get Resend API key from system settings: {e}")
     
     return RESEND_API_KEY
 
 async def get_sender_email():
-    """Get sender email from env or database settings"""
+    """Get sender email from the cached system settings or env"""
     global SENDER_EMAIL
     
-    # Try to get from database first
     try:
-        from database import get_database
-        db = get_database()
-        settings = await db.system_settings.find_one({"setting_id": "global"}, {"_id": 0})
-        if settings and settings.get("sender_email"):
-            return settings.get("sender_email")
+        settings = await get_system_settings()
+        if settings.sender_email:
+            return settings.sender_email
     except Exception as e:
-        logger.warning(f"Could not get sender email from database: {e}")
+        logger.warning(f"Could not get sender email from system settings: {e}")
     
     return SENDER_EMAIL
 
@@ -83,7 +83,7 @@ async def generate_ai_content(prompt: str, system_message: str, timeout_seconds:
         api_key=EMERGENT_LLM_KEY,
         session_id=f"instagrowth_{uuid.uuid4().hex[:8]}",
         system_message=system_message
-    ).with_model("openai", "gpt-5.2")
+    ).with_model(AI_PROVIDER, AI_MODEL)
     
     user_message = UserMessage(text=prompt)
     
@@ -100,7 +100,8 @@ async def generate_ai_content(prompt: str, system_message: str, timeout_seconds:
             detail=f"AI generation timed out. Please try again or simplify your request."
         )
 
-async def estimate_instagram_metrics(username: str, niche: str) -> Dict[str, Any]:
+async def estimate_instagram_metrics(username: str, niche: str) -> Optional[Dict[str, Any]]:
+    """AI estimates for an account, or None when the model call or its JSON fails"""
     system_message = """You are an Instagram analytics expert. Based on the username and niche, 
     provide realistic estimates for Instagram account metrics. Return JSON with:
     - estimated_followers (int)
@@ -123,59 +124,34 @@ async def estimate_instagram_metrics(username: str, niche: str) -> Dict[str, Any
             cleaned = cleaned[3:]
         if cleaned.endswith("```"):
             cleaned = cleaned[:-3]
-        return json.loads(cleaned.strip())
+        metrics = json.loads(cleaned.strip())
+        return metrics if isinstance(metrics, dict) else None
     except Exception as e:
         logger.error(f"AI metrics estimation error: {e}")
-        return {
-            "estimated_followers": 5000,
-            "estimated_engagement_rate": 3.5,
-            "estimated_reach": 2000,
-            "posting_frequency": "3x per week",
-            "best_posting_time": "9 AM - 12 PM EST",
-            "growth_potential": "medium"
-        }
+        return None
 
-async def generate_posting_recommendations(username: str, niche: str, current_metrics: Dict) -> Dict[str, Any]:
-    system_message = """You are an Instagram growth strategist. Analyze the account and provide 
-    optimal posting time recommendations. Return JSON with:
-    - best_times (array of {day: string, times: array of strings})
-    - frequency (string, e.g., "5-7 posts per week")
-    - content_mix (object with percentages for reels, posts, stories)
-    - peak_engagement_windows (array of time ranges)
-    - avoid_times (array of times to avoid posting)
-    - reasoning (string explaining the recommendations)"""
-    
-    prompt = f"""Provide posting recommendations for:
-    Username: @{username}
-    Niche: {niche}
-    Current followers: {current_metrics.get('estimated_followers', 'Unknown')}
-    Current engagement: {current_metrics.get('estimated_engagement_rate', 'Unknown')}%"""
+async def generate_posting_narrative(username: str, niche: str, schedule: Dict) -> str:
+    """Plain-language explanation of a computed posting schedule (the times themselves are not LLM output)"""
+    system_message = """You are an Instagram growth strategist. You are given posting slots ranked
+    from the account's measured engagement. Explain the schedule in 3-4 sentences: why these
+    windows work, how to use the content mix, and what to avoid. Do not change or invent times.
+    Return ONLY the explanation text."""
+    
+    slots = ", ".join(f"{s['day']} {s['time']} (score {s['score']})" for s in schedule.get("ranked_slots", [])[:5])
+    prompt = f"""Explain this posting schedule for @{username} ({niche} niche):
+    Top slots (UTC, score 1.0 = average post): {slots or 'not enough data'}
+    Peak windows: {', '.join(schedule.get('peak_engagement_windows', []))}
+    Avoid: {', '.join(schedule.get('avoid_times', []))}
+    Frequency: {schedule.get('frequency')}
+    Content mix: {schedule.get('content_mix')}
+    Based on: {schedule.get('posts_analyzed', 0)} posts ({schedule.get('data_source')})"""
     
     try:
-        response = await generate_ai_content(prompt, system_message, timeout_seconds=45)
-        import json
-        cleaned = response.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]
-        if cleaned.startswith("```"):
-            cleaned = cleaned[3:]
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]
-        return json.loads(cleaned.strip())
+        response = await generate_ai_content(prompt, system_message, timeout_seconds=AI_TIMEOUT_SHORT)
+        return response.strip()
     except Exception as e:
-        logger.error(f"Posting recommendations error: {e}")
-        return {
-            "best_times": [
-                {"day": "Monday", "times": ["9:00 AM", "12:00 PM", "6:00 PM"]},
-                {"day": "Wednesday", "times": ["9:00 AM", "12:00 PM", "7:00 PM"]},
-                {"day": "Friday", "times": ["10:00 AM", "2:00 PM", "8:00 PM"]}
-            ],
-            "frequency": "5-7 posts per week",
-            "content_mix": {"reels": 60, "posts": 25, "stories": 15},
-            "peak_engagement_windows": ["9-11 AM", "7-9 PM"],
-            "avoid_times": ["2-5 AM", "During major events"],
-            "reasoning": "Based on typical engagement patterns in your niche"
-        }
+        logger.error(f"Posting narrative error: {e}")
+        return schedule.get("reasoning", "")
 
 async def generate_dm_reply(message: str, context: str, tone: str = "friendly") -> str:
     system_message = f"""You are an Instagram account manager. Generate a {tone}, professional 
@@ -0,0 +1,49 @@
+"""
+Admin List Enrichment - $lookup stages for admin list pages
+
+Admin list endpoints used to fetch a page and then enrich every row with its
+own queries (owner lookups, per-user counts). These helpers build $lookup
+sub-pipelines that run inside the page aggregation (see services.pagination),
+after $limit, so only the returned rows are enriched and a page takes one
+round trip. With count="facet" the total is counted in that same aggregation.
+"""
+from typing import List
+
+def count_lookup(collection: str, local_field: str, foreign_field: str, as_field: str) -> List[dict]:
+    """Stages that set `as_field` to the number of matching documents in `collection`"""
+    return [
+        {"$lookup": {
+            "from": collection,
+            "let": {"key": f"${local_field}"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": [f"${foreign_field}", "$$key"]}}},
+                {"$count": "n"}
+            ],
+            "as": as_field
+        }},
+        {"$set": {as_field: {"$ifNull": [{"$arrayElemAt": [f"${as_field}.n", 0]}, 0]}}},
+    ]
+
+def one_lookup(
+    collection: str,
+    local_field: str,
+    foreign_field: str,
+    as_field: str,
+    fields: List[str],
+) -> List[dict]:
+    """Stages that set `as_field` to the projected first matching document (or null)"""
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in fields})
+    return [
+        {"$lookup": {
+            "from": collection,
+            "let": {"key": f"${local_field}"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": [f"${foreign_field}", "$$key"]}}},
+                {"$limit": 1},
+                {"$project": projection}
+            ],
+            "as": as_field
+        }},
+        {"$set": {as_field: {"$ifNull": [{"$arrayElemAt": [f"${as_field}", 0]}, None]}}},
+    ]
@@ -0,0 +1,94 @@
+"""
+Admin Principal Cache - Short-lived cache of admin accounts behind verify_admin_token
+
+The admin dashboard fires many requests per page view, each of which used to
+load the same admins document. Admin documents (without password, TOTP and
+backup-code fields) are cached per admin_id for ADMIN_PRINCIPAL_TTL seconds,
+and concurrent misses for the same admin share one query. Role, status, 2FA
+and IP whitelist changes invalidate the entry immediately, on this worker and
+on the others through the realtime broker.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from database import get_database
+from services.realtime import get_broker
+
+logger = logging.getLogger(__name__)
+
+ADMIN_PRINCIPAL_TTL = float(os.environ.get('ADMIN_PRINCIPAL_TTL', 30))
+ADMIN_PRINCIPALS_CHANNEL = "admin_principal_invalidated"
+
+PRINCIPAL_PROJECTION = {
+    "_id": 0, "password_hash": 0, "totp_secret": 0, "backup_codes": 0,
+    "pending_2fa_secret": 0, "pending_backup_codes": 0
+}
+
+class AdminPrincipalCache:
+    """admin_id -> admin document, with a TTL and single-flight loads"""
+
+    def __init__(self, broker=None, ttl: float = ADMIN_PRINCIPAL_TTL):
+        self.broker = broker or get_broker()
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[Optional[dict], float]] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+
+    async def get(self, admin_id: str) -> Optional[dict]:
+        entry = self._entries.get(admin_id)
+        if entry and time.monotonic() < entry[1]:
+            return dict(entry[0]) if entry[0] else None
+
+        pending = self._loading.get(admin_id)
+        if pending:
+            try:
+                doc = await asyncio.shield(pending)
+                return dict(doc) if doc else None
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this request was cancelled
+            # The request loading it was cancelled; load it here instead
+            return await self.get(admin_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[admin_id] = future
+        try:
+            db = get_database()
+            doc = await db.admins.find_one({"admin_id": admin_id}, PRINCIPAL_PROJECTION)
+            # An invalidation that raced the load wins: don't cache a stale read
+            if self._loading.get(admin_id) is future:
+                self._entries[admin_id] = (doc, time.monotonic() + self.ttl)
+            future.set_result(doc)
+            return dict(doc) if doc else None
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if self._loading.get(admin_id) is future:
+                del self._loading[admin_id]
+            if not future.done():
+                future.cancel()  # cancelled mid-load; waiters take over
+            elif not future.cancelled():
+                future.exception()  # mark retrieved when no one else awaited it
+
+    def _forget(self, admin_id: str):
+        self._entries.pop(admin_id, None)
+        self._loading.pop(admin_id, None)
+
+    async def invalidate(self, admin_id: str):
+        """Drop an admin's cached principal everywhere (call after changing the admins document)"""
+        self._forget(admin_id)
+        await self.broker.publish(ADMIN_PRINCIPALS_CHANNEL, {"admin_id": admin_id})
+
+    async def _on_remote_invalidate(self, event: dict):
+        self._forget(event["admin_id"])
+
+    def start(self):
+        self.broker.start(ADMIN_PRINCIPALS_CHANNEL, self._on_remote_invalidate)
+
+admin_principal_cache = AdminPrincipalCache()
+
+def get_admin_principal_cache() -> AdminPrincipalCache:
+    return admin_principal_cache
@@ -0,0 +1,124 @@
+"""
+AI Usage Analytics - Aggregated usage stats backed by the credit event stream
+
+Every credit deduction is appended to `credit_events` (user, feature, model,
+cost), which gives exact per-feature and per-model attribution without reading
+the unbounded usage_history arrays on ai_credits. The admin stats are computed
+server-side: totals with $group, top users with an indexed $sort + $limit, and
+all per-feature counts issued as one concurrent batch.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+CREDIT_EVENTS_COLLECTION = "credit_events"
+COST_PER_REQUEST = 0.01  # Estimated USD per AI request
+COST_PER_CREDIT = float(os.environ.get('AI_COST_PER_CREDIT', 0.01))  # Estimated USD per credit
+
+# Feature label -> collection whose documents each represent one AI request
+FEATURE_COLLECTIONS = {
+    "content_generation": "content_items",
+    "audits": "audits",
+    "growth_plans": "growth_plans",
+}
+
+async def record_credit_event(user_id: str, feature: str, cost: int, model: Optional[str] = None):
+    """Append a credit deduction to the event stream"""
+    if model is None:
+        from services import AI_MODEL
+        model = AI_MODEL
+    db = get_database()
+    await db[CREDIT_EVENTS_COLLECTION].insert_one({
+        "event_id": f"ce_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "feature": feature,
+        "model": model,
+        "cost": cost,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+
+async def _total_usage(db) -> int:
+    result = await db.users.aggregate([
+        {"$group": {"_id": None, "total": {"$sum": "$ai_usage_current"}}}
+    ]).to_list(1)
+    return result[0]["total"] if result else 0
+
+async def _top_users(db, limit: int) -> list:
+    return await db.users.find(
+        {"ai_usage_current": {"$gt": 0}},
+        {"_id": 0, "user_id": 1, "name": 1, "email": 1, "ai_usage_current": 1, "ai_usage_limit": 1, "role": 1}
+    ).sort("ai_usage_current", -1).limit(limit).to_list(limit)
+
+async def _credit_breakdown(db, today_start: str, month_start: str) -> dict:
+    """Credits and request counts for the month by feature and model, plus today's totals"""
+    result = await db[CREDIT_EVENTS_COLLECTION].aggregate([
+        {"$match": {"created_at": {"$gte": month_start}}},
+        {"$facet": {
+            "by_feature": [{"$group": {"_id": "$feature", "credits": {"$sum": "$cost"}, "requests": {"$sum": 1}}}],
+            "by_model": [{"$group": {"_id": "$model", "credits": {"$sum": "$cost"}, "requests": {"$sum": 1}}}],
+            "today": [
+                {"$match": {"created_at": {"$gte": today_start}}},
+                {"$group": {"_id": None, "credits": {"$sum": "$cost"}, "requests": {"$sum": 1}}}
+            ]
+        }}
+    ]).to_list(1)
+    return result[0] if result else {"by_feature": [], "by_model": [], "today": []}
+
+def _attribution(rows: list) -> dict:
+    return {
+        (row["_id"] or "unknown"): {
+            "credits": row["credits"],
+            "requests": row["requests"],
+            "estimated_cost": round(row["credits"] * COST_PER_CREDIT, 2)
+        }
+        for row in rows
+    }
+
+async def get_ai_usage_stats(top_n: int = 10) -> dict:
+    """Admin AI usage overview"""
+    db = get_database()
+    now = datetime.now(timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+    features = list(FEATURE_COLLECTIONS.items())
+    count_calls = [
+        db[collection].count_documents({"created_at": {"$gte": since}})
+        for since in (today_start, month_start)
+        for _, collection in features
+    ]
+    total_usage, top_users, breakdown, *counts = await asyncio.gather(
+        _total_usage(db),
+        _top_users(db, top_n),
+        _credit_breakdown(db, today_start, month_start),
+        *count_calls
+    )
+    today_counts, month_counts = counts[:len(features)], counts[len(features):]
+
+    requests_today = sum(today_counts)
+    requests_month = sum(month_counts)
+    credits_today = breakdown["today"][0] if breakdown["today"] else {"credits": 0, "requests": 0}
+    by_feature = _attribution(breakdown["by_feature"])
+
+    return {
+        "total_usage": total_usage,
+        "total_requests_today": requests_today,
+        "total_requests_month": requests_month,
+        "estimated_cost_month": round(requests_month * COST_PER_REQUEST, 2),
+        "usage_by_feature": {name: count for (name, _), count in zip(features, month_counts)},
+        "credits_used_today": credits_today["credits"],
+        "credits_used_month": sum(item["credits"] for item in by_feature.values()),
+        "credits_by_feature": by_feature,
+        "credits_by_model": _attribution(breakdown["by_model"]),
+        "top_users": [
+            {"user_id": u["user_id"], "name": u.get("name", ""), "email": u.get("email", ""), "usage": u.get("ai_usage_current", 0), "limit": u.get("ai_usage_limit", 0), "plan": u.get("role", "starter")}
+            for u in top_users
+        ]
+    }
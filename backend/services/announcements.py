@@ -0,0 +1,195 @@
+"""
+Announcement Cache - Active announcements held in memory, dismissals per user in one document
+
+Announcements are a tiny, rarely changing set, so every live or scheduled
+announcement (status "active", not yet ended) is loaded into memory. The
+active subset is precomputed and recomputed at the next start/end boundary by
+a timer, so reads never touch Mongo. Admin create/update/delete reload the
+set and notify the other workers through the realtime broker; a periodic
+reload (ANNOUNCEMENT_REFRESH_INTERVAL) absorbs anything else.
+
+Dismissals are stored as one user_dismissed_announcements document per user
+holding an `announcement_ids` array, so an unread lookup is a single small
+read filtered in memory. Legacy one-document-per-dismissal rows are folded in
+on startup by migrate_dismissals.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from database import get_database
+from services.realtime import get_broker
+
+logger = logging.getLogger(__name__)
+
+ANNOUNCEMENT_REFRESH_INTERVAL = float(os.environ.get('ANNOUNCEMENT_REFRESH_INTERVAL', 300))
+ANNOUNCEMENTS_CHANNEL = "announcements_changed"
+MAX_ACTIVE_ANNOUNCEMENTS = 10
+DISMISSALS_COLLECTION = "user_dismissed_announcements"
+
+# Compact per-user dismissal document (legacy rows carry a single announcement_id instead)
+COMPACT_DISMISSALS = {"announcement_id": {"$exists": False}}
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class AnnouncementCache:
+    """In-memory set of live and scheduled announcements"""
+
+    def __init__(self, broker=None, refresh_interval: float = ANNOUNCEMENT_REFRESH_INTERVAL):
+        self.broker = broker or get_broker()
+        self.refresh_interval = refresh_interval
+        self._scheduled: Optional[List[dict]] = None
+        self._active: Tuple[dict, ...] = ()
+        self._next_boundary: Optional[str] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def reload(self):
+        async with self._lock:
+            db = get_database()
+            now = _now()
+            self._scheduled = await db.announcements.find({
+                "status": "active",
+                "$or": [
+                    {"end_date": None},
+                    {"end_date": {"$gte": now}}
+                ]
+            }, {"_id": 0}).sort("created_at", -1).to_list(100)
+            self._loaded_at = time.monotonic()
+            self._recompute(now)
+
+    def _recompute(self, now: str):
+        """Rebuild the active subset and find when it next changes"""
+        active = []
+        boundaries = []
+        for announcement in self._scheduled or []:
+            start, end = announcement.get("start_date") or "", announcement.get("end_date")
+            if start > now:
+                boundaries.append(start)
+            elif end is None or end >= now:
+                active.append(announcement)
+                if end:
+                    boundaries.append(end)
+        self._active = tuple(active)
+        self._next_boundary = min(boundaries) if boundaries else None
+
+    async def active(self) -> Tuple[dict, ...]:
+        """Announcements currently live, newest first"""
+        if self._scheduled is None or (self._task is None and time.monotonic() - self._loaded_at > self.refresh_interval):
+            await self.reload()
+        if self._next_boundary:
+            now = _now()
+            if now >= self._next_boundary:
+                self._recompute(now)
+        return self._active
+
+    async def invalidate(self):
+        """Reload after an admin change and tell the other workers"""
+        await self.reload()
+        self._wake.set()
+        await self.broker.publish(ANNOUNCEMENTS_CHANNEL, {})
+
+    async def _on_remote_change(self, event: dict):
+        await self.reload()
+        self._wake.set()
+
+    def _seconds_until_boundary(self) -> float:
+        if not self._next_boundary:
+            return self.refresh_interval
+        try:
+            boundary = datetime.fromisoformat(self._next_boundary.replace("Z", "+00:00"))
+            if boundary.tzinfo is None:
+                boundary = boundary.replace(tzinfo=timezone.utc)
+        except ValueError:
+            return self.refresh_interval
+        delay = (boundary - datetime.now(timezone.utc)).total_seconds()
+        return max(0.0, min(delay, self.refresh_interval))
+
+    async def _timer(self):
+        while True:
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._seconds_until_boundary())
+                continue
+            except asyncio.TimeoutError:
+                pass
+            try:
+                if time.monotonic() - self._loaded_at >= self.refresh_interval:
+                    await self.reload()
+                else:
+                    self._recompute(_now())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Announcement refresh failed: {e}")
+
+    def start(self):
+        self.broker.start(ANNOUNCEMENTS_CHANNEL, self._on_remote_change)
+        if self._task is None:
+            self._task = asyncio.create_task(self._timer())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+announcement_cache = AnnouncementCache()
+
+def get_announcement_cache() -> AnnouncementCache:
+    return announcement_cache
+
+# ==================== DISMISSALS ====================
+
+async def get_dismissed_ids(user_id: str) -> set:
+    db = get_database()
+    doc = await db[DISMISSALS_COLLECTION].find_one(
+        {"user_id": user_id, **COMPACT_DISMISSALS}, {"_id": 0, "announcement_ids": 1}
+    )
+    return set((doc or {}).get("announcement_ids", []))
+
+async def dismiss(user_id: str, announcement_id: str):
+    db = get_database()
+    await db[DISMISSALS_COLLECTION].update_one(
+        {"user_id": user_id, **COMPACT_DISMISSALS},
+        {
+            "$addToSet": {"announcement_ids": announcement_id},
+            "$set": {"updated_at": _now()}
+        },
+        upsert=True
+    )
+
+async def migrate_dismissals():
+    """Fold legacy one-row-per-dismissal documents into the per-user array"""
+    db = get_database()
+    coll = db[DISMISSALS_COLLECTION]
+    migrated = 0
+    try:
+        async for group in coll.aggregate([
+            {"$match": {"announcement_id": {"$exists": True}}},
+            {"$group": {"_id": "$user_id", "ids": {"$addToSet": "$announcement_id"}}}
+        ]):
+            await coll.update_one(
+                {"user_id": group["_id"], **COMPACT_DISMISSALS},
+                {
+                    "$addToSet": {"announcement_ids": {"$each": group["ids"]}},
+                    "$set": {"updated_at": _now()}
+                },
+                upsert=True
+            )
+            await coll.delete_many({"user_id": group["_id"], "announcement_id": {"$exists": True}})
+            migrated += 1
+    except Exception as e:
+        logger.error(f"Dismissal migration stopped after {migrated} users: {e}")
+        return
+    if migrated:
+        logger.info(f"Compacted announcement dismissals of {migrated} users")
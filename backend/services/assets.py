@@ -0,0 +1,175 @@
+"""
+Asset Store - Content-addressed binary assets (team logos) on the local filesystem
+
+Uploaded files are stored once under ASSET_STORE_DIR keyed by the SHA-256 of
+their bytes, with resized PNG thumbnails generated at upload time. Metadata
+lives in the `assets` collection; documents that use an asset (teams) keep
+only a small reference, and GET /api/assets/{hash} serves the bytes with a
+strong ETag and an immutable Cache-Control, since a hash never changes content.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+ASSET_STORE_DIR = os.environ.get('ASSET_STORE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads', 'assets'))
+ASSET_MAX_BYTES = int(os.environ.get('ASSET_MAX_BYTES', 2 * 1024 * 1024))
+THUMBNAIL_SIZES = (64, 128, 256)
+ALLOWED_IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "image/svg+xml"}
+ASSET_URL_PREFIX = "/api/assets/"
+
+def asset_url(asset_hash: str) -> str:
+    return f"{ASSET_URL_PREFIX}{asset_hash}"
+
+def _path(asset_hash: str) -> str:
+    return os.path.join(ASSET_STORE_DIR, asset_hash[:2], asset_hash)
+
+def _write_file(asset_hash: str, data: bytes):
+    path = _path(asset_hash)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _read_file(asset_hash: str) -> Optional[bytes]:
+    try:
+        with open(_path(asset_hash), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _make_thumbnails(data: bytes) -> Dict[int, bytes]:
+    """PNG thumbnails that fit within each size (raster images only)"""
+    from PIL import Image
+
+    thumbnails = {}
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for size in THUMBNAIL_SIZES:
+            if max(image.size) <= size:
+                continue
+            thumb = image.copy()
+            thumb.thumbnail((size, size))
+            out = BytesIO()
+            thumb.save(out, format="PNG", optimize=True)
+            thumbnails[size] = out.getvalue()
+    return thumbnails
+
+async def _store_blob(data: bytes, content_type: str, parent: Optional[str] = None) -> str:
+    db = get_database()
+    asset_hash = hashlib.sha256(data).hexdigest()
+    await asyncio.to_thread(_write_file, asset_hash, data)
+    await db.assets.update_one(
+        {"hash": asset_hash},
+        {"$setOnInsert": {
+            "hash": asset_hash,
+            "content_type": content_type,
+            "size": len(data),
+            "parent": parent,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }},
+        upsert=True
+    )
+    return asset_hash
+
+async def store_image(data: bytes, content_type: str) -> dict:
+    """Store an image and its thumbnails; returns the reference to embed in documents"""
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+    if len(data) > ASSET_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"File too large (max {ASSET_MAX_BYTES // 1024} KB)")
+
+    asset_hash = await _store_blob(data, content_type)
+
+    thumbnails = {}
+    if content_type != "image/svg+xml":
+        try:
+            rendered = await asyncio.to_thread(_make_thumbnails, data)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+        for size, thumb in rendered.items():
+            thumbnails[str(size)] = await _store_blob(thumb, "image/png", parent=asset_hash)
+
+    return {"hash": asset_hash, "content_type": content_type, "thumbnails": thumbnails}
+
+def best_variant(ref: dict, size: int) -> str:
+    """Hash of the smallest thumbnail at least `size` px, or the original"""
+    for candidate in sorted(int(s) for s in ref.get("thumbnails", {})):
+        if candidate >= size:
+            return ref["thumbnails"][str(candidate)]
+    return ref["hash"]
+
+async def read_asset(asset_hash: str) -> Tuple[bytes, str]:
+    """Bytes and content type of a stored asset"""
+    db = get_database()
+    meta = await db.assets.find_one({"hash": asset_hash}, {"_id": 0, "content_type": 1})
+    if not meta:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    data = await asyncio.to_thread(_read_file, asset_hash)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return data, meta["content_type"]
+
+def decode_data_url(data_url: str) -> Tuple[bytes, str]:
+    try:
+        header, encoded = data_url.split(",", 1)
+        data = base64.b64decode(encoded)
+    except ValueError:  # no comma, or bad base64 (binascii.Error)
+        raise HTTPException(status_code=400, detail="Invalid image data URL")
+    content_type = header[5:].split(";")[0] or "application/octet-stream"
+    return data, content_type
+
+async def load_team_logo(team_id: str, size: int = 128) -> Optional[bytes]:
+    """Logo bytes for PDF branding (asset thumbnail, or a legacy data URL)"""
+    db = get_database()
+    team = await db.teams.find_one({"team_id": team_id}, {"_id": 0, "logo_asset": 1, "logo_url": 1})
+    if not team:
+        return None
+    if team.get("logo_asset"):
+        return await asyncio.to_thread(_read_file, best_variant(team["logo_asset"], size))
+    logo_url = team.get("logo_url") or ""
+    if logo_url.startswith("data:"):
+        try:
+            return decode_data_url(logo_url)[0]
+        except Exception:
+            return None
+    return None
+
+async def migrate_team_logos():
+    """Move legacy base64 data-URL logos out of team documents into the asset store"""
+    db = get_database()
+    migrated = 0
+    try:
+        async for team in db.teams.find({"logo_url": {"$regex": "^data:"}}, {"_id": 0, "team_id": 1, "logo_url": 1}):
+            try:
+                data, content_type = decode_data_url(team["logo_url"])
+                ref = await store_image(data, content_type)
+            except Exception as e:
+                logger.warning(f"Could not migrate logo of team {team['team_id']}: {e}")
+                continue
+            # Same bytes, so cached branded reports stay valid (no branding_version bump)
+            await db.teams.update_one(
+                {"team_id": team["team_id"]},
+                {"$set": {"logo_asset": ref, "logo_url": asset_url(ref["hash"])}}
+            )
+            migrated += 1
+    except Exception as e:
+        logger.error(f"Team logo migration stopped after {migrated} teams: {e}")
+        return
+    if migrated:
+        logger.info(f"Moved {migrated} team logos to the asset store")
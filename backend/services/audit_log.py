@@ -0,0 +1,159 @@
+"""
+Admin Audit Log Sink - Queued, batched admin_logs writes
+
+log_admin_action enqueues the log document and returns; a background flusher
+writes queued logs with one insert_many once AUDIT_LOG_BATCH_SIZE are waiting
+or every AUDIT_LOG_FLUSH_INTERVAL seconds. The queue is bounded
+(AUDIT_LOG_QUEUE_SIZE); logs that do not fit, and batches that cannot be
+written because Mongo is unavailable, are appended to a JSONL spool file in
+AUDIT_LOG_SPOOL_DIR. Spool files (including those left by other or crashed
+processes) are replayed once writes succeed again, and the queue is flushed
+on shutdown. log_id is unique in admin_logs, so a replayed batch that was
+partially written before does not produce duplicates.
+"""
+import asyncio
+import glob
+import json
+import logging
+import os
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 100))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1))
+AUDIT_LOG_SPOOL_DIR = os.environ.get('AUDIT_LOG_SPOOL_DIR', '/tmp/instagrowth_audit_spool')
+
+DUPLICATE_KEY = 11000
+
+def _append_spool(path: str, docs: List[dict]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for doc in docs:
+            f.write(json.dumps(doc, default=str) + "\n")
+
+def _read_spool(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class AuditLogSink:
+    """Bounded queue of admin log documents drained by a background flusher"""
+
+    def __init__(self, maxsize: int = AUDIT_LOG_QUEUE_SIZE):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self.spool_path = os.path.join(AUDIT_LOG_SPOOL_DIR, f"admin_logs_{os.getpid()}.jsonl")
+
+    async def submit(self, log_doc: dict):
+        if self._task is None:
+            # No flusher running (scripts, tests): write through
+            await self._write([log_doc])
+            return
+        try:
+            self._queue.put_nowait(log_doc)
+        except asyncio.QueueFull:
+            await self._spool([log_doc])
+
+    async def _spool(self, docs: List[dict]):
+        if not docs:
+            return
+        try:
+            await asyncio.to_thread(_append_spool, self.spool_path, docs)
+            logger.warning(f"Spooled {len(docs)} admin logs to {self.spool_path}")
+        except OSError as e:
+            logger.error(f"Lost {len(docs)} admin logs, spool write failed: {e}")
+
+    async def _insert(self, docs: List[dict]):
+        db = get_database()
+        try:
+            await db.admin_logs.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                raise
+
+    async def _write(self, docs: List[dict]) -> bool:
+        """Insert docs, spooling them on failure; returns whether Mongo took them"""
+        try:
+            await self._insert([{k: v for k, v in doc.items() if k != "_id"} for doc in docs])
+            return True
+        except Exception as e:
+            logger.error(f"Admin log write failed: {e}")
+            await self._spool(docs)
+            return False
+
+    async def _replay_spool(self):
+        for path in glob.glob(os.path.join(AUDIT_LOG_SPOOL_DIR, "admin_logs_*.jsonl")):
+            claimed = f"{path}.replaying"
+            try:
+                os.rename(path, claimed)  # atomic claim against other workers
+            except OSError:
+                continue
+            docs = await asyncio.to_thread(_read_spool, claimed)
+            try:
+                for start in range(0, len(docs), AUDIT_LOG_BATCH_SIZE):
+                    await self._insert(docs[start:start + AUDIT_LOG_BATCH_SIZE])
+            except Exception as e:
+                logger.warning(f"Admin log spool replay deferred: {e}")
+                os.rename(claimed, path)
+                return
+            os.remove(claimed)
+            logger.info(f"Replayed {len(docs)} spooled admin logs")
+
+    def _drain(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=AUDIT_LOG_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                first = None
+            batch = [first] if first is not None else []
+            try:
+                if batch:
+                    # Give a burst a moment to fill the batch
+                    await asyncio.sleep(min(0.05, AUDIT_LOG_FLUSH_INTERVAL))
+                batch.extend(self._drain(AUDIT_LOG_BATCH_SIZE - len(batch)))
+                healthy = await self._write(batch) if batch else True
+                if healthy:
+                    await self._replay_spool()
+            except asyncio.CancelledError:
+                await self._spool(batch)
+                raise
+            except Exception as e:
+                logger.error(f"Admin log flusher error: {e}")
+
+    async def flush(self):
+        """Write everything queued (spooling on failure)"""
+        while not self._queue.empty():
+            await self._write(self._drain(AUDIT_LOG_BATCH_SIZE))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+audit_log_sink = AuditLogSink()
+
+def get_audit_log_sink() -> AuditLogSink:
+    return audit_log_sink
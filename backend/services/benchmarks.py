@@ -0,0 +1,235 @@
+"""
+Niche Benchmarks - Per-niche aggregates behind instant account estimates
+
+New accounts used to wait on an LLM call for placeholder follower and
+engagement numbers. Instead, every BENCHMARK_REFRESH_INTERVAL one worker
+aggregates the accounts whose metrics came from Instagram (median and
+quantiles of followers and engagement rate per niche), the posting cadence of
+those accounts (posting_time_stats) and the niche's strongest posting slot
+(posting_time_niches), and stores one document per niche in niche_benchmarks.
+Each worker keeps the benchmarks in memory and reloads them on the same
+interval, so estimate() never touches the database.
+
+Niches with fewer than BENCHMARK_MIN_ACCOUNTS synced accounts fall back to the
+aggregate over all niches, then to fixed defaults. AI enrichment of a new
+account (ACCOUNT_AI_ENRICHMENT) runs in the background and only replaces
+values that are still benchmark estimates, with the keys the model actually
+returned; a failed estimate leaves the benchmark values in place.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from services.posting_times import NICHE_COLLECTION, STATS_COLLECTION, build_schedule
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_REFRESH_INTERVAL = float(os.environ.get('BENCHMARK_REFRESH_INTERVAL', 3600))
+BENCHMARK_MIN_ACCOUNTS = int(os.environ.get('BENCHMARK_MIN_ACCOUNTS', 5))
+ACCOUNT_AI_ENRICHMENT = os.environ.get('ACCOUNT_AI_ENRICHMENT', 'true').lower() == 'true'
+BENCHMARKS_COLLECTION = "niche_benchmarks"
+ALL_NICHES = "__all__"
+QUANTILES = (10, 25, 50, 75, 90)
+REACH_RATIO = 0.4  # typical reach as a share of followers
+# Accounts whose metrics came from Instagram rather than an estimate
+SYNCED_ACCOUNTS = {"$or": [{"data_source": "instagram_api"}, {"connection_status": "connected"}]}
+
+DEFAULT_ESTIMATE = {
+    "estimated_followers": 5000,
+    "estimated_engagement_rate": 3.5,
+    "estimated_reach": 2000,
+    "posting_frequency": "3x per week",
+    "best_posting_time": "9 AM - 12 PM EST",
+}
+
+# Account field -> key of the AI estimate it is filled from
+AI_METRIC_FIELDS = {
+    "follower_count": "estimated_followers",
+    "engagement_rate": "estimated_engagement_rate",
+    "estimated_reach": "estimated_reach",
+    "posting_frequency": "posting_frequency",
+    "best_posting_time": "best_posting_time",
+}
+
+def ai_estimate_fields(metrics: dict) -> dict:
+    """Account fields to $set from an AI estimate (keys the model left out are skipped)"""
+    fields = {field: metrics[key] for field, key in AI_METRIC_FIELDS.items() if metrics.get(key) is not None}
+    return {**fields, "data_source": "ai_estimated"} if fields else {}
+
+def _quantiles(values: List[float]) -> Dict[str, float]:
+    points = np.percentile(np.asarray(values, dtype=np.float64), QUANTILES)
+    return {f"p{q}": round(float(v), 2) for q, v in zip(QUANTILES, points)}
+
+def _summarize(niche: str, followers: List[float], rates: List[float], cadence: List[float],
+               slot_stats: Optional[dict]) -> dict:
+    summary = {
+        "niche": niche,
+        "accounts": len(followers),
+        "followers": _quantiles(followers) if followers else {},
+        "engagement_rate": _quantiles(rates) if rates else {},
+        "posts_per_week": round(float(np.median(cadence)), 1) if cadence else None,
+        "best_posting_time": None,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+    if slot_stats and slot_stats.get("posts"):
+        top = build_schedule(None, slot_stats)["ranked_slots"][0]
+        summary["best_posting_time"] = f"{top['day']} {top['time']} UTC"
+    return summary
+
+async def compute_benchmarks() -> List[dict]:
+    """Aggregate synced accounts into one benchmark document per niche (plus ALL_NICHES)"""
+    db = get_database()
+    followers: Dict[str, List[float]] = defaultdict(list)
+    rates: Dict[str, List[float]] = defaultdict(list)
+    account_niche: Dict[str, str] = {}
+    async for account in db.instagram_accounts.find(
+        {**SYNCED_ACCOUNTS, "follower_count": {"$gt": 0}},
+        {"_id": 0, "account_id": 1, "niche": 1, "follower_count": 1, "engagement_rate": 1}
+    ):
+        niche = account.get("niche") or "Other"
+        account_niche[account["account_id"]] = niche
+        for key in (niche, ALL_NICHES):
+            followers[key].append(account["follower_count"])
+            if account.get("engagement_rate") is not None:
+                rates[key].append(account["engagement_rate"])
+
+    cadence: Dict[str, List[float]] = defaultdict(list)
+    async for stats in db[STATS_COLLECTION].find(
+        {"posts_per_week": {"$ne": None}}, {"_id": 0, "account_id": 1, "posts_per_week": 1}
+    ):
+        niche = account_niche.get(stats["account_id"])
+        if niche:
+            cadence[niche].append(stats["posts_per_week"])
+            cadence[ALL_NICHES].append(stats["posts_per_week"])
+
+    slot_stats = {doc["niche"]: doc async for doc in db[NICHE_COLLECTION].find({}, {"_id": 0})}
+    return [
+        _summarize(niche, followers[niche], rates[niche], cadence[niche], slot_stats.get(niche))
+        for niche in followers
+    ]
+
+class NicheBenchmarks:
+    """In-memory niche benchmarks, recomputed by one worker and reloaded by all"""
+
+    def __init__(self, interval: float = BENCHMARK_REFRESH_INTERVAL):
+        self.interval = interval
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._benchmarks: Dict[str, dict] = {}
+        self._loaded_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _claim(self) -> bool:
+        db = get_database()
+        now = datetime.now(timezone.utc)
+        try:
+            await db.benchmark_state.find_one_and_update(
+                {"_id": "benchmarks", "next_run_at": {"$lt": now.isoformat()}},
+                {"$set": {
+                    "worker": self.origin,
+                    "next_run_at": (now + timedelta(seconds=self.interval)).isoformat()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # recomputed recently or by another worker
+        return True
+
+    async def recompute(self):
+        benchmarks = await compute_benchmarks()
+        db = get_database()
+        for benchmark in benchmarks:
+            await db[BENCHMARKS_COLLECTION].replace_one({"niche": benchmark["niche"]}, benchmark, upsert=True)
+        logger.info(f"Recomputed benchmarks for {len(benchmarks)} niches")
+
+    async def load(self):
+        db = get_database()
+        docs = await db[BENCHMARKS_COLLECTION].find({}, {"_id": 0}).to_list(None)
+        self._benchmarks = {doc["niche"]: doc for doc in docs}
+        self._loaded_at = time.monotonic()
+
+    def benchmark(self, niche: Optional[str]) -> Optional[dict]:
+        """The niche's benchmark, or the all-niche one when the niche has too few accounts"""
+        for key in (niche, ALL_NICHES):
+            doc = self._benchmarks.get(key)
+            if doc and doc["accounts"] >= BENCHMARK_MIN_ACCOUNTS:
+                return doc
+        return None
+
+    def estimate(self, niche: Optional[str]) -> dict:
+        """Median-based metrics for a new account in the niche (same keys as estimate_instagram_metrics)"""
+        doc = self.benchmark(niche)
+        if not doc:
+            return {**DEFAULT_ESTIMATE, "source": "default"}
+        followers = int(doc["followers"]["p50"])
+        per_week = doc.get("posts_per_week")
+        return {
+            "estimated_followers": followers,
+            "estimated_engagement_rate": doc["engagement_rate"].get("p50", DEFAULT_ESTIMATE["estimated_engagement_rate"]),
+            "estimated_reach": int(followers * REACH_RATIO),
+            "posting_frequency": f"{per_week} posts per week" if per_week else DEFAULT_ESTIMATE["posting_frequency"],
+            "best_posting_time": doc.get("best_posting_time") or DEFAULT_ESTIMATE["best_posting_time"],
+            "engagement_rate_quantiles": doc["engagement_rate"],
+            "sample_size": doc["accounts"],
+            "source": "niche_benchmark" if doc["niche"] == niche else "all_niches"
+        }
+
+    async def _loop(self):
+        while True:
+            try:
+                if await self._claim():
+                    await self.recompute()
+                await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Benchmark refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+niche_benchmarks = NicheBenchmarks()
+
+def get_niche_benchmarks() -> NicheBenchmarks:
+    return niche_benchmarks
+
+async def enrich_account(account_id: str, user_id: str, username: str, niche: str):
+    """Replace a new account's benchmark estimates with AI estimates (runs in the background)"""
+    from services import estimate_instagram_metrics
+    from routers.websocket import get_manager
+
+    try:
+        metrics = await estimate_instagram_metrics(username, niche)
+        fields = ai_estimate_fields(metrics) if metrics else {}
+        if not fields:
+            return  # keep the benchmark estimate
+        db = get_database()
+        # Real data synced in the meantime wins over the estimate
+        result = await db.instagram_accounts.update_one(
+            {"account_id": account_id, "data_source": "niche_benchmark"}, {"$set": fields}
+        )
+        if result.modified_count:
+            await get_manager().send_personal_message(
+                {"type": "account_updated", "account_id": account_id, "data": fields}, user_id
+            )
+    except Exception as e:
+        logger.warning(f"AI enrichment failed for {account_id}: {e}")
@@ -0,0 +1,236 @@
+"""
+Bulk Accounts - Import and refresh many Instagram accounts in one request
+
+An import is validated as a whole: usernames are normalized and de-duplicated,
+accounts the user already tracks are skipped, and the plan limit is checked
+with a single count. New accounts are written with one insert_many using
+niche-benchmark estimates, so the request returns immediately.
+
+Follow-up work (AI enrichment of imported accounts, Graph API sync of
+connected accounts on refresh) runs in the background with at most
+BULK_CONCURRENCY accounts in flight. Every finished account is reported to
+the user's WebSocket as a "bulk_progress" event, followed by "bulk_complete".
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Set
+
+from fastapi import HTTPException
+
+from database import get_database
+from services.benchmarks import get_niche_benchmarks, enrich_account
+from services.counters import get_counters
+from services.posting_times import get_posting_time_engine
+from services.search import with_search_terms
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_ACCOUNTS = int(os.environ.get('BULK_MAX_ACCOUNTS', 100))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', 5))
+CSV_FIELDS = ("username", "niche", "notes", "client_name", "client_email")
+
+# Running background work; the event loop only keeps weak references to tasks
+_background: Set[asyncio.Task] = set()
+
+def normalize_username(username: str) -> str:
+    return (username or "").strip().lstrip("@").lower()
+
+def parse_csv(contents: bytes) -> List[dict]:
+    """Rows of a CSV with a header line (username required, other CSV_FIELDS optional)"""
+    try:
+        text = contents.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "username" not in [f.strip().lower() for f in reader.fieldnames]:
+        raise HTTPException(status_code=400, detail="CSV needs a header row with a 'username' column")
+    rows = []
+    for row in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        rows.append({field: row.get(field) or None for field in CSV_FIELDS})
+    return rows
+
+def _account_doc(user, row: dict, now: str) -> dict:
+    niche = row.get("niche") or "Other"
+    metrics = get_niche_benchmarks().estimate(niche)
+    return {
+        "account_id": f"acc_{uuid.uuid4().hex[:12]}",
+        "user_id": user.user_id,
+        "team_id": user.team_id,
+        "username": normalize_username(row["username"]),
+        "niche": niche,
+        "notes": row.get("notes"),
+        "client_name": row.get("client_name"),
+        "client_email": row.get("client_email"),
+        "follower_count": metrics.get("estimated_followers"),
+        "engagement_rate": metrics.get("estimated_engagement_rate"),
+        "estimated_reach": metrics.get("estimated_reach"),
+        "posting_frequency": metrics.get("posting_frequency"),
+        "best_posting_time": metrics.get("best_posting_time"),
+        "data_source": "niche_benchmark",
+        "last_audit_date": None,
+        "status": "active",
+        "created_at": now
+    }
+
+async def import_accounts(user, rows: List[dict], enrich: bool = False) -> dict:
+    """Validate and insert a batch of accounts; enrichment continues in the background"""
+    if len(rows) > BULK_MAX_ACCOUNTS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ACCOUNTS} accounts per import")
+
+    skipped, unique = [], {}
+    for row in rows:
+        username = normalize_username(row.get("username"))
+        if not username:
+            skipped.append({"username": row.get("username"), "reason": "missing username"})
+        elif username in unique:
+            skipped.append({"username": username, "reason": "duplicate in import"})
+        else:
+            unique[username] = row
+
+    db = get_database()
+    # Accounts added before usernames were normalized may differ in case or "@"
+    existing = await db.instagram_accounts.distinct("username", {"user_id": user.user_id})
+    for username in {normalize_username(u) for u in existing} & set(unique):
+        unique.pop(username)
+        skipped.append({"username": username, "reason": "already added"})
+
+    count = await db.instagram_accounts.count_documents({"user_id": user.user_id})
+    total_limit = user.account_limit + user.extra_accounts
+    if count + len(unique) > total_limit:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Account limit reached ({total_limit}). You can add {max(total_limit - count, 0)} more accounts; this import has {len(unique)}."
+        )
+    if not unique:
+        return {"job_id": None, "created": [], "skipped": skipped}
+
+    now = datetime.now(timezone.utc).isoformat()
+    docs = [_account_doc(user, row, now) for row in unique.values()]
+    await db.instagram_accounts.insert_many([with_search_terms("instagram_accounts", dict(doc)) for doc in docs])
+    await get_counters().record(user.user_id, "accounts_count", len(docs))
+
+    try:
+        from routers.admin_websocket import notify_new_account
+        for doc in docs:
+            await notify_new_account(doc)
+    except Exception:
+        pass  # Don't fail the import if admin notification fails
+
+    job_id = None
+    if enrich:
+        job_id = f"bulk_{uuid.uuid4().hex[:12]}"
+        start_pipeline(
+            job_id, user.user_id, docs,
+            lambda doc: enrich_account(doc["account_id"], user.user_id, doc["username"], doc["niche"])
+        )
+    return {"job_id": job_id, "created": docs, "skipped": skipped}
+
+async def sync_account(account: dict):
+    """Refresh one account: Graph API data when connected, niche benchmark otherwise"""
+    from routers.growth import fetch_account_metrics
+    from routers.audits import fetch_instagram_media
+
+    db = get_database()
+    if account.get("access_token"):
+        metrics, media = await asyncio.gather(
+            fetch_account_metrics(account["access_token"]),
+            fetch_instagram_media(account["access_token"], limit=25)
+        )
+        if not metrics:
+            raise RuntimeError("Instagram API unavailable")
+        await db.instagram_accounts.update_one(
+            {"account_id": account["account_id"]},
+            {"$set": {
+                "follower_count": metrics.get("followers"),
+                "media_count": metrics.get("media_count"),
+                "engagement_rate": metrics.get("engagement_rate"),
+                "last_sync": datetime.now(timezone.utc).isoformat(),
+                "data_source": "instagram_api"
+            }}
+        )
+        await get_posting_time_engine().ingest(account["account_id"], account.get("niche"), media)
+    elif account.get("data_source") in (None, "niche_benchmark"):
+        # Estimates only: move to the current benchmark without spending AI credits
+        metrics = get_niche_benchmarks().estimate(account.get("niche"))
+        await db.instagram_accounts.update_one(
+            {"account_id": account["account_id"]},
+            {"$set": {
+                "follower_count": metrics.get("estimated_followers"),
+                "engagement_rate": metrics.get("estimated_engagement_rate"),
+                "estimated_reach": metrics.get("estimated_reach"),
+                "posting_frequency": metrics.get("posting_frequency"),
+                "best_posting_time": metrics.get("best_posting_time"),
+                "data_source": "niche_benchmark"
+            }}
+        )
+
+async def refresh_accounts(user, account_ids: Optional[List[str]] = None) -> dict:
+    """Start a background refresh of the user's accounts (all of them when no ids are given)"""
+    db = get_database()
+    query = {"user_id": user.user_id}
+    if account_ids:
+        query["account_id"] = {"$in": account_ids}
+    accounts = await db.instagram_accounts.find(
+        query, {"_id": 0, "account_id": 1, "username": 1, "niche": 1, "access_token": 1, "data_source": 1}
+    ).to_list(BULK_MAX_ACCOUNTS)
+    if not accounts:
+        raise HTTPException(status_code=404, detail="No accounts to refresh")
+
+    job_id = f"bulk_{uuid.uuid4().hex[:12]}"
+    start_pipeline(job_id, user.user_id, accounts, sync_account)
+    return {"job_id": job_id, "total": len(accounts)}
+
+def run_in_background(coro: Awaitable) -> asyncio.Task:
+    """Schedule account work after the response, holding a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+def start_pipeline(job_id: str, user_id: str, accounts: List[dict], step: Callable[[dict], Awaitable]) -> asyncio.Task:
+    return run_in_background(run_pipeline(job_id, user_id, accounts, step))
+
+async def run_pipeline(job_id: str, user_id: str, accounts: List[dict], step: Callable[[dict], Awaitable]):
+    """Run step for every account, BULK_CONCURRENCY at a time, reporting progress over the WebSocket"""
+    from routers.websocket import get_manager
+
+    manager = get_manager()
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+    progress = {"done": 0, "failed": 0}
+
+    async def run(account: dict):
+        async with semaphore:
+            status = "ok"
+            try:
+                await step(account)
+            except Exception as e:
+                logger.warning(f"Bulk job {job_id} failed for {account['account_id']}: {e}")
+                status = "failed"
+                progress["failed"] += 1
+            progress["done"] += 1
+            try:
+                await manager.send_personal_message({
+                    "type": "bulk_progress",
+                    "job_id": job_id,
+                    "account_id": account["account_id"],
+                    "username": account.get("username"),
+                    "status": status,
+                    "done": progress["done"],
+                    "total": len(accounts)
+                }, user_id)
+            except Exception:
+                pass  # Progress events are best effort
+
+    await asyncio.gather(*(run(account) for account in accounts))
+    try:
+        await manager.send_personal_message({
+            "type": "bulk_complete", "job_id": job_id, "total": len(accounts), "failed": progress["failed"]
+        }, user_id)
+    except Exception:
+        pass
@@ -0,0 +1,280 @@
+"""
+Cascade Deletion - Background removal of everything a user owns
+
+Deleting a user enqueues a job in `deletion_jobs` and returns immediately. A
+background worker claims due jobs (one worker per job via a lease, so any
+uvicorn worker can pick it up and a crashed run is resumed), then walks the
+registry of user-owned collections: each collection is emptied in _id batches
+of CASCADE_BATCH_SIZE with a pause between batches, at most
+CASCADE_CONCURRENCY collections at a time. Per-collection progress is written
+to the job document. Deletes are idempotent, so resuming a job is safe.
+Cached PDF renders of deleted audits and growth plans are purged with them,
+the user's records are cut out of archived email logs, and members of teams
+the user owned have their users.team_id unset.
+
+Financial records (payment_transactions, one_time_purchases, referral_payouts)
+and the data_deletion_requests audit trail are intentionally retained.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+CASCADE_BATCH_SIZE = int(os.environ.get('CASCADE_BATCH_SIZE', 500))
+CASCADE_BATCH_PAUSE = float(os.environ.get('CASCADE_BATCH_PAUSE', 0.05))
+CASCADE_CONCURRENCY = int(os.environ.get('CASCADE_CONCURRENCY', 3))
+CASCADE_POLL_INTERVAL = float(os.environ.get('CASCADE_POLL_INTERVAL', 30))
+CASCADE_LEASE_SECONDS = 600
+DELETION_JOBS_COLLECTION = "deletion_jobs"
+
+class CascadeTarget(NamedTuple):
+    """A collection holding user-owned documents
+
+    `key` names the user attribute matched against `field` ("user_id" or "email").
+    `children` are (collection, child_field, parent_field) pairs deleted first,
+    for documents that reference the owned documents rather than the user.
+    `report` is a (report kind, id field) pair whose cached PDF renders are
+    purged along with the documents. `archived` also removes the user's records
+    from the collection's retention archive (services/retention.py).
+    """
+    collection: str
+    field: str = "user_id"
+    key: str = "user_id"
+    children: Tuple[Tuple[str, str, str], ...] = ()
+    report: Optional[Tuple[str, str]] = None
+    archived: bool = False
+
+USER_OWNED_COLLECTIONS: List[CascadeTarget] = [
+    CascadeTarget("instagram_accounts", children=(("posting_time_stats", "account_id", "account_id"),)),
+    CascadeTarget("audits", report=("audit", "audit_id")),
+    CascadeTarget("content_items"),
+    CascadeTarget("growth_plans", report=("growth_plan", "plan_id")),
+    CascadeTarget("notifications"),
+    CascadeTarget("notification_counters"),
+    CascadeTarget("dm_templates"),
+    CascadeTarget("subscriptions"),
+    CascadeTarget("ai_credits"),
+    CascadeTarget("credit_events"),
+    CascadeTarget("ab_tests"),
+    CascadeTarget("competitor_analyses"),
+    CascadeTarget("support_tickets", children=(("ticket_messages", "ticket_id", "ticket_id"),)),
+    CascadeTarget("referral_codes"),
+    CascadeTarget("referrals", field="referrer_id"),
+    CascadeTarget("referrals", field="referee_id"),
+    CascadeTarget("teams", field="owner_id", children=(("team_members", "team_id", "team_id"),)),
+    CascadeTarget("team_members"),
+    CascadeTarget("user_sessions"),
+    CascadeTarget("instagram_connections"),
+    CascadeTarget("oauth_states"),
+    CascadeTarget("password_resets"),
+    CascadeTarget("user_dismissed_announcements"),
+    CascadeTarget("email_logs", field="recipient", key="email", archived=True),
+    CascadeTarget("email_preferences", field="email", key="email"),
+]
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+async def enqueue_user_deletion(
+    user_id: Optional[str],
+    email: Optional[str],
+    source: str,
+    requested_by: Optional[str] = None,
+    run_after: Optional[datetime] = None,
+    deletion_id: Optional[str] = None,
+) -> str:
+    """Create a deletion job and return its id"""
+    db = get_database()
+    job_id = f"deljob_{uuid.uuid4().hex[:12]}"
+    await db[DELETION_JOBS_COLLECTION].insert_one({
+        "job_id": job_id,
+        "user_id": user_id,
+        "email": email,
+        "source": source,
+        "requested_by": requested_by,
+        "deletion_id": deletion_id,
+        "status": "queued",
+        "progress": {},
+        "run_after": (run_after or _now()).isoformat(),
+        "lease_until": None,
+        "created_at": _now().isoformat(),
+        "started_at": None,
+        "completed_at": None,
+        "error": None
+    })
+    get_cascade_worker().wake()
+    return job_id
+
+async def get_deletion_job(job_id: str) -> Optional[dict]:
+    db = get_database()
+    return await db[DELETION_JOBS_COLLECTION].find_one({"job_id": job_id}, {"_id": 0})
+
+async def cancel_deletion_job(job_id: str) -> bool:
+    """Cancel a job that has not started yet"""
+    db = get_database()
+    result = await db[DELETION_JOBS_COLLECTION].update_one(
+        {"job_id": job_id, "status": "queued"},
+        {"$set": {"status": "cancelled", "completed_at": _now().isoformat()}}
+    )
+    return result.modified_count > 0
+
+class CascadeWorker:
+    """Claims due deletion jobs and runs them"""
+
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    async def _claim(self) -> Optional[dict]:
+        db = get_database()
+        now = _now()
+        return await db[DELETION_JOBS_COLLECTION].find_one_and_update(
+            {
+                "run_after": {"$lte": now.isoformat()},
+                "$or": [
+                    {"status": "queued"},
+                    # A worker died mid-job; resume it
+                    {"status": "running", "lease_until": {"$lt": now.isoformat()}}
+                ]
+            },
+            {"$set": {
+                "status": "running",
+                "worker": self.origin,
+                "lease_until": (now + timedelta(seconds=CASCADE_LEASE_SECONDS)).isoformat(),
+                "started_at": now.isoformat()
+            }},
+            sort=[("run_after", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _delete_batched(self, collection: str, query: dict) -> int:
+        db = get_database()
+        deleted = 0
+        while True:
+            batch = await db[collection].find(query, {"_id": 1}).limit(CASCADE_BATCH_SIZE).to_list(CASCADE_BATCH_SIZE)
+            if not batch:
+                return deleted
+            result = await db[collection].delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            deleted += result.deleted_count
+            await asyncio.sleep(CASCADE_BATCH_PAUSE)
+
+    async def _delete_target(self, job: dict, target: CascadeTarget, semaphore: asyncio.Semaphore) -> int:
+        value = job.get(target.key)
+        if not value:
+            return 0
+        async with semaphore:
+            db = get_database()
+            query = {target.field: value}
+            deleted = 0
+            for child, child_field, parent_field in target.children:
+                parents = await db[target.collection].distinct(parent_field, query)
+                for start in range(0, len(parents), CASCADE_BATCH_SIZE):
+                    chunk = parents[start:start + CASCADE_BATCH_SIZE]
+                    deleted += await self._delete_batched(child, {child_field: {"$in": chunk}})
+            if target.report:
+                kind, id_field = target.report
+                doc_ids = await db[target.collection].distinct(id_field, query)
+                if doc_ids:
+                    from services.reports import get_report_renderer
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, get_report_renderer().invalidate, kind, *doc_ids
+                    )
+            deleted += await self._delete_batched(target.collection, query)
+            if target.archived:
+                from services.retention import purge_archived_subject
+                deleted += await purge_archived_subject(target.collection, value)
+
+            await db[DELETION_JOBS_COLLECTION].update_one(
+                {"job_id": job["job_id"]},
+                {
+                    "$inc": {f"progress.{target.collection}": deleted},
+                    "$set": {"lease_until": (_now() + timedelta(seconds=CASCADE_LEASE_SECONDS)).isoformat()}
+                }
+            )
+            return deleted
+
+    async def run_job(self, job: dict):
+        db = get_database()
+        user_id = job.get("user_id")
+        try:
+            if user_id:
+                await db.users.delete_one({"user_id": user_id})
+                from services.counters import get_counters
+                get_counters().forget_user(user_id)
+                # Members of the user's teams keep their accounts but lose the team
+                owned_teams = await db.teams.distinct("team_id", {"owner_id": user_id})
+                if owned_teams:
+                    await db.users.update_many(
+                        {"team_id": {"$in": owned_teams}}, {"$unset": {"team_id": ""}}
+                    )
+
+            semaphore = asyncio.Semaphore(CASCADE_CONCURRENCY)
+            results = await asyncio.gather(*(
+                self._delete_target(job, target, semaphore) for target in USER_OWNED_COLLECTIONS
+            ))
+
+            await db[DELETION_JOBS_COLLECTION].update_one(
+                {"job_id": job["job_id"]},
+                {"$set": {"status": "completed", "completed_at": _now().isoformat(), "lease_until": None}}
+            )
+            if job.get("deletion_id"):
+                await db.data_deletion_requests.update_one(
+                    {"deletion_id": job["deletion_id"]},
+                    {"$set": {"status": "completed", "completed_at": _now().isoformat()}}
+                )
+            logger.info(f"Deletion job {job['job_id']} completed ({sum(results)} documents removed)")
+        except Exception as e:
+            logger.error(f"Deletion job {job['job_id']} failed: {e}")
+            await db[DELETION_JOBS_COLLECTION].update_one(
+                {"job_id": job["job_id"]},
+                {"$set": {"status": "failed", "error": str(e), "lease_until": None}}
+            )
+
+    async def _loop(self):
+        while True:
+            try:
+                job = await self._claim()
+                while job:
+                    await self.run_job(job)
+                    job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cascade worker error: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=CASCADE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+cascade_worker = CascadeWorker()
+
+def get_cascade_worker() -> CascadeWorker:
+    return cascade_worker
@@ -0,0 +1,175 @@
+"""
+Dashboard Counters - Incremental per-user and global counters
+
+Dashboard stats used to re-count four collections on every poll. Counters are
+now seeded from Mongo once (per user on first access, globally on first use),
+kept in memory and adjusted by the routers that write those collections.
+
+Each change is pushed as a compact "stats_delta" frame over /ws/{user_id}, and
+global deltas are summed and sent to the admin "dashboard" channel once per
+COUNTERS_FLUSH_INTERVAL. Deltas are replicated to the other workers through the
+realtime broker, and entries are re-seeded after COUNTERS_TTL seconds so writes
+made outside the hooks (cascade deletes, scripts) are absorbed.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from database import get_database
+from services.realtime import get_broker
+
+logger = logging.getLogger(__name__)
+
+# Per-user counter name -> collection it counts
+USER_COUNTER_COLLECTIONS = {
+    "accounts_count": "instagram_accounts",
+    "audits_count": "audits",
+    "content_items_count": "content_items",
+    "growth_plans_count": "growth_plans",
+}
+
+# Per-user counter name -> global (admin dashboard) counter name
+GLOBAL_COUNTER_NAMES = {
+    "accounts_count": "total_accounts",
+    "audits_count": "total_audits",
+    "content_items_count": "total_content",
+    "growth_plans_count": "total_growth_plans",
+}
+
+COUNTERS_TTL = int(os.environ.get('COUNTERS_TTL', 600))
+COUNTERS_MAX_USERS = int(os.environ.get('COUNTERS_MAX_USERS', 50000))
+COUNTERS_FLUSH_INTERVAL = float(os.environ.get('COUNTERS_FLUSH_INTERVAL', 2))
+COUNTER_DELTAS_CHANNEL = "counter_deltas"
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+class DashboardCounters:
+    """In-memory counters backing /api/dashboard/stats and the admin dashboard"""
+
+    def __init__(self, broker=None):
+        self.broker = broker or get_broker()
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()
+        self._global: Optional[Dict[str, int]] = None
+        self._global_loaded_at = 0.0
+        self._global_day: Optional[str] = None
+        self._pending_admin: Dict[str, int] = defaultdict(int)
+        self._flusher: Optional[asyncio.Task] = None
+
+    # ---------- reads ----------
+
+    async def get_user_counters(self, user_id: str) -> Dict[str, int]:
+        entry = self._users.get(user_id)
+        if entry and time.monotonic() - entry[1] < COUNTERS_TTL:
+            self._users.move_to_end(user_id)
+            return dict(entry[0])
+        return dict(await self._seed_user(user_id))
+
+    async def get_global_counters(self) -> Dict[str, int]:
+        if (
+            self._global is None
+            or self._global_day != _today()
+            or time.monotonic() - self._global_loaded_at > COUNTERS_TTL
+        ):
+            await self._seed_global()
+        return dict(self._global)
+
+    async def _seed_user(self, user_id: str) -> Dict[str, int]:
+        db = get_database()
+        counts = await asyncio.gather(*(
+            db[collection].count_documents({"user_id": user_id})
+            for collection in USER_COUNTER_COLLECTIONS.values()
+        ))
+        counters = dict(zip(USER_COUNTER_COLLECTIONS.keys(), counts))
+        self._users[user_id] = (counters, time.monotonic())
+        self._users.move_to_end(user_id)
+        while len(self._users) > COUNTERS_MAX_USERS:
+            self._users.popitem(last=False)
+        return counters
+
+    async def _seed_global(self):
+        db = get_database()
+        today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        names = list(GLOBAL_COUNTER_NAMES.values())
+        counts = await asyncio.gather(
+            *(db[USER_COUNTER_COLLECTIONS[key]].count_documents({}) for key in GLOBAL_COUNTER_NAMES),
+            db.audits.count_documents({"created_at": {"$gte": today_start}})
+        )
+        self._global = dict(zip(names, counts[:-1]))
+        self._global["audits_today"] = counts[-1]
+        self._global_day = _today()
+        self._global_loaded_at = time.monotonic()
+
+    # ---------- writes ----------
+
+    def _apply(self, user_id: str, delta: Dict[str, int]):
+        entry = self._users.get(user_id)
+        if entry:
+            for key, amount in delta.items():
+                entry[0][key] = max(0, entry[0].get(key, 0) + amount)
+        if self._global is not None:
+            if self._global_day != _today():
+                self._global["audits_today"] = 0
+                self._global_day = _today()
+            for key, amount in delta.items():
+                name = GLOBAL_COUNTER_NAMES[key]
+                self._global[name] = max(0, self._global.get(name, 0) + amount)
+            if delta.get("audits_count", 0) > 0:
+                self._global["audits_today"] += delta["audits_count"]
+
+    async def record(self, user_id: str, counter: str, amount: int = 1):
+        """Apply a counter change after a write and push the delta to dashboards"""
+        delta = {counter: amount}
+        try:
+            self._apply(user_id, delta)
+            await self.broker.publish(COUNTER_DELTAS_CHANNEL, {"user_id": user_id, "delta": delta})
+
+            from routers.websocket import get_manager
+            await get_manager().send_personal_message({"type": "stats_delta", "delta": delta}, user_id)
+
+            self._pending_admin[GLOBAL_COUNTER_NAMES[counter]] += amount
+            if counter == "audits_count" and amount > 0:
+                self._pending_admin["audits_today"] += amount
+        except Exception as e:
+            logger.error(f"Failed to record {counter} change for {user_id}: {e}")
+
+    def forget_user(self, user_id: str):
+        self._users.pop(user_id, None)
+
+    async def _on_remote_delta(self, event: dict):
+        self._apply(event["user_id"], event["delta"])
+
+    async def _flush_admin_deltas(self):
+        pending, self._pending_admin = self._pending_admin, defaultdict(int)
+        delta = {name: amount for name, amount in pending.items() if amount}
+        if not delta:
+            return
+        from routers.admin_websocket import get_admin_manager, AdminChannel
+        await get_admin_manager().publish(AdminChannel.DASHBOARD, {"type": "stats_delta", "delta": delta})
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(COUNTERS_FLUSH_INTERVAL)
+            try:
+                await self._flush_admin_deltas()
+            except Exception as e:
+                logger.error(f"Failed to flush admin dashboard deltas: {e}")
+
+    def start(self):
+        self.broker.start(COUNTER_DELTAS_CHANNEL, self._on_remote_delta)
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+
+counters = DashboardCounters()
+
+def get_counters() -> DashboardCounters:
+    return counters
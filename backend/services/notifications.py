@@ -0,0 +1,327 @@
+"""
+Notification Service - Batched notification writes with a denormalized unread counter
+
+create() queues the notification and returns immediately; a background writer
+coalesces queued notifications into one insert_many every
+NOTIFICATION_FLUSH_INTERVAL seconds (or as soon as NOTIFICATION_BATCH_SIZE are
+waiting), bumps the per-user unread counters in one bulk_write and pushes each
+notification over /ws/{user_id}.
+
+Unread counts live in notification_counters ({user_id, unread}) and are
+adjusted atomically on create, read and read-all, so badge polls are a single
+indexed find_one. A user's counter is seeded on first read with one upsert;
+until then increments are skipped, so the seed is settled with a recount that
+only applies if nothing adjusted the counter in between.
+
+A batch whose insert fails is put back at the front of the queue (up to
+NOTIFICATION_MAX_PENDING queued notifications) and retried on the next flush;
+the documents keep their _id, so a retry never writes a notification twice.
+
+notify_users fans one notification out to every matching user in batches of
+bulk inserts and counter updates, pushing each batch to its recipients only.
+A batch that fails to insert is retried NOTIFICATION_FANOUT_RETRIES times
+before its notifications are dropped (and logged); counters and pushes cover
+only what was written. fan_out runs it in the background, holding the task
+until it finishes; stop() gives running fan-outs NOTIFICATION_STOP_TIMEOUT
+seconds to complete.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 200))
+NOTIFICATION_FLUSH_INTERVAL = float(os.environ.get('NOTIFICATION_FLUSH_INTERVAL', 0.5))
+NOTIFICATION_FANOUT_BATCH = int(os.environ.get('NOTIFICATION_FANOUT_BATCH', 1000))
+NOTIFICATION_MAX_PENDING = int(os.environ.get('NOTIFICATION_MAX_PENDING', 50000))
+NOTIFICATION_FANOUT_RETRIES = 3
+NOTIFICATION_STOP_TIMEOUT = 10
+DUPLICATE_KEY = 11000
+COUNTERS_COLLECTION = "notification_counters"
+
+# Announcement target -> users it reaches
+AUDIENCE_QUERIES = {
+    "all": {},
+    "free": {"role": "starter"},
+    "paid": {"role": {"$in": ["pro", "agency", "enterprise"]}},
+}
+
+def build_notification(user_id: str, type: str, title: str, message: str, action_url: Optional[str] = None) -> dict:
+    return {
+        "notification_id": f"notif_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "type": type,
+        "title": title,
+        "message": message,
+        "read": False,
+        "action_url": action_url,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+def _failed_indexes(error: BulkWriteError) -> Set[int]:
+    """Indexes of an insert_many batch that were not written (a duplicate _id was written by an earlier try)"""
+    return {err["index"] for err in error.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY}
+
+def _frame(notification: dict) -> dict:
+    return {
+        "type": "notification",
+        "notification_id": notification["notification_id"],
+        "notification_type": notification["type"],
+        "title": notification["title"],
+        "message": notification["message"],
+        "action_url": notification.get("action_url"),
+        "created_at": notification["created_at"],
+        "unread_delta": 1
+    }
+
+class NotificationService:
+    """Queues notifications and writes them in batches"""
+
+    def __init__(self):
+        self._pending: List[dict] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._fanouts: Set[asyncio.Task] = set()
+
+    # ---------- writes ----------
+
+    async def create(self, user_id: str, type: str, title: str, message: str, action_url: Optional[str] = None) -> dict:
+        notification = build_notification(user_id, type, title, message, action_url)
+        self._pending.append(notification)
+        if self._task is None:
+            # No writer running (scripts, tests): write through
+            await self.flush()
+        elif len(self._pending) >= NOTIFICATION_BATCH_SIZE:
+            self._wake.set()
+        return notification
+
+    def _requeue(self, batch: List[dict]):
+        """Put an unwritten batch back ahead of newer notifications"""
+        self._pending[:0] = batch
+        overflow = len(self._pending) - NOTIFICATION_MAX_PENDING
+        if overflow > 0:
+            del self._pending[:overflow]
+            logger.error(f"Notification queue full, dropped {overflow} oldest notifications")
+
+    async def flush(self):
+        """Write every queued notification"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        db = get_database()
+        try:
+            await db.notifications.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_indexes(e)
+            if failed:
+                logger.error(f"Failed to write {len(failed)} notifications, retrying: {e}")
+                self._requeue([n for i, n in enumerate(batch) if i in failed])
+                batch = [n for i, n in enumerate(batch) if i not in failed]
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} notifications, retrying: {e}")
+            self._requeue(batch)
+            return
+        if not batch:
+            return
+        for notification in batch:
+            notification.pop("_id", None)
+
+        per_user = Counter(n["user_id"] for n in batch)
+        try:
+            await db[COUNTERS_COLLECTION].bulk_write([
+                UpdateOne({"user_id": user_id}, {"$inc": {"unread": amount}})
+                for user_id, amount in per_user.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update unread counters: {e}")
+
+        try:
+            from routers.websocket import get_manager
+            manager = get_manager()
+            for notification in batch:
+                await manager.send_personal_message(_frame(notification), notification["user_id"])
+        except Exception as e:
+            logger.error(f"Failed to push notifications: {e}")
+
+    async def notify_users(self, type: str, title: str, message: str, action_url: Optional[str] = None, query: Optional[dict] = None) -> int:
+        """Fan one notification out to every user matching query; returns how many were written"""
+        db = get_database()
+        sent = 0
+        cursor = db.users.find(query or {}, {"_id": 0, "user_id": 1}).batch_size(NOTIFICATION_FANOUT_BATCH)
+        batch: List[str] = []
+
+        async def insert(docs: List[dict]) -> List[dict]:
+            """Insert with retries; returns the documents that could not be written"""
+            pending = docs
+            for attempt in range(NOTIFICATION_FANOUT_RETRIES):
+                try:
+                    await db.notifications.insert_many(pending, ordered=False)
+                    return []
+                except BulkWriteError as e:
+                    failed = _failed_indexes(e)
+                    pending = [doc for i, doc in enumerate(pending) if i in failed]
+                    if not pending:
+                        return []
+                    logger.warning(f"Failed to write {len(pending)} '{title}' notifications (attempt {attempt + 1}): {e}")
+                except Exception as e:
+                    logger.warning(f"Failed to write {len(pending)} '{title}' notifications (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+            return pending
+
+        async def write(user_ids: List[str]) -> int:
+            docs = [build_notification(user_id, type, title, message, action_url) for user_id in user_ids]
+            unwritten = await insert(docs)
+            if unwritten:
+                logger.error(f"Dropped {len(unwritten)} '{title}' notifications after {NOTIFICATION_FANOUT_RETRIES} attempts")
+                dropped = {doc["notification_id"] for doc in unwritten}
+                user_ids = [doc["user_id"] for doc in docs if doc["notification_id"] not in dropped]
+                if not user_ids:
+                    return 0
+            try:
+                await db[COUNTERS_COLLECTION].update_many({"user_id": {"$in": user_ids}}, {"$inc": {"unread": 1}})
+            except Exception as e:
+                logger.error(f"Failed to update unread counters: {e}")
+            try:
+                from routers.websocket import get_manager
+                await get_manager().send_to_users({
+                    "type": "notification",
+                    "notification_type": type,
+                    "title": title,
+                    "message": message,
+                    "action_url": action_url,
+                    "unread_delta": 1
+                }, user_ids)
+            except Exception as e:
+                logger.error(f"Failed to push notification: {e}")
+            return len(user_ids)
+
+        async for user in cursor:
+            batch.append(user["user_id"])
+            if len(batch) >= NOTIFICATION_FANOUT_BATCH:
+                sent += await write(batch)
+                batch = []
+        if batch:
+            sent += await write(batch)
+        logger.info(f"Sent '{title}' notification to {sent} users")
+        return sent
+
+    def fan_out(self, type: str, title: str, message: str, action_url: Optional[str] = None, query: Optional[dict] = None) -> asyncio.Task:
+        """Run notify_users in the background (e.g. after an announcement is created)"""
+        async def run():
+            try:
+                await self.notify_users(type, title, message, action_url, query)
+            except Exception as e:
+                logger.error(f"Fan-out of '{title}' notification failed: {e}")
+
+        task = asyncio.create_task(run())
+        self._fanouts.add(task)
+        task.add_done_callback(self._fanouts.discard)
+        return task
+
+    # ---------- unread counter ----------
+
+    async def get_unread_count(self, user_id: str) -> int:
+        db = get_database()
+        counter = await db[COUNTERS_COLLECTION].find_one({"user_id": user_id}, {"_id": 0, "unread": 1})
+        if counter:
+            return max(0, counter["unread"])
+        unread_query = {"user_id": user_id, "read": False}
+        seed = await db.notifications.count_documents(unread_query)
+        counter = await db[COUNTERS_COLLECTION].find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": {"unread": seed}},
+            upsert=True,
+            projection={"_id": 0, "unread": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        # Notifications written while seeding skipped the missing counter; settle
+        # with a recount unless the counter was already adjusted in the meantime
+        unread = await db.notifications.count_documents(unread_query)
+        if unread != counter["unread"]:
+            settled = await db[COUNTERS_COLLECTION].update_one(
+                {"user_id": user_id, "unread": counter["unread"]}, {"$set": {"unread": unread}}
+            )
+            if not settled.modified_count:
+                return await self.get_unread_count(user_id)
+        return unread
+
+    async def _adjust_unread(self, user_id: str, amount: int):
+        db = get_database()
+        counter = await db[COUNTERS_COLLECTION].find_one_and_update(
+            {"user_id": user_id},
+            [{"$set": {"unread": {"$max": [0, {"$add": ["$unread", amount]}]}}}],
+            projection={"_id": 0, "unread": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if counter is None:
+            return
+        try:
+            from routers.websocket import get_manager
+            await get_manager().send_personal_message({"type": "notifications_unread", "count": counter["unread"]}, user_id)
+        except Exception:
+            pass  # Don't fail the read on a push error
+
+    async def mark_read(self, user_id: str, notification_id: str):
+        db = get_database()
+        result = await db.notifications.update_one(
+            {"notification_id": notification_id, "user_id": user_id, "read": False},
+            {"$set": {"read": True}}
+        )
+        if result.modified_count:
+            await self._adjust_unread(user_id, -1)
+
+    async def mark_all_read(self, user_id: str):
+        db = get_database()
+        result = await db.notifications.update_many(
+            {"user_id": user_id, "read": False},
+            {"$set": {"read": True}}
+        )
+        if result.modified_count:
+            await self._adjust_unread(user_id, -result.modified_count)
+
+    # ---------- writer ----------
+
+    async def _writer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=NOTIFICATION_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Notification writer error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._writer())
+
+    async def stop(self):
+        if self._fanouts:
+            _, unfinished = await asyncio.wait(set(self._fanouts), timeout=NOTIFICATION_STOP_TIMEOUT)
+            for task in unfinished:
+                task.cancel()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+notification_service = NotificationService()
+
+def get_notification_service() -> NotificationService:
+    return notification_service
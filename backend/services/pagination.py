@@ -0,0 +1,170 @@
+"""
+Keyset Pagination - Opaque cursors for admin list endpoints
+
+Pages are addressed by the (sort_key, id) of the last row instead of an offset,
+so the next page is an index seek on the compound (sort_key, id) index and page
+N costs the same as page 1. Cursors are opaque URL-safe tokens; clients pass
+back the `next_cursor` of the previous page.
+
+Totals are optional and cheap:
+- "estimated"  collection metadata (estimated_document_count) for unfiltered lists,
+               falling back to a cached count when a filter is applied
+- "cached"     exact count_documents, cached per (collection, filter) for
+               PAGINATION_COUNT_TTL seconds
+- "exact"      count_documents on every request
+- "facet"      exact total counted in the page aggregation itself ($facet), so
+               a fresh total costs no extra round trip
+- "none"       no total
+"""
+import base64
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+PAGINATION_COUNT_TTL = int(os.environ.get('PAGINATION_COUNT_TTL', 60))
+PAGINATION_MAX_LIMIT = int(os.environ.get('PAGINATION_MAX_LIMIT', 200))
+COUNT_MODES = ("estimated", "cached", "exact", "facet", "none")
+
+# (collection name, serialized filter) -> (count, loaded_at)
+_count_cache: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+def encode_cursor(sort_field: str, sort_value: Any, id_value: Any) -> str:
+    payload = json.dumps({"k": sort_field, "v": sort_value, "id": id_value}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, Any]:
+    """Return (sort_value, id_value) from a cursor issued for `sort_field`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["k"] != sort_field:
+            raise ValueError("cursor was issued for a different sort")
+        return payload["v"], payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def keyset_filter(sort_field: str, id_field: str, direction: int, sort_value: Any, id_value: Any) -> dict:
+    """Filter selecting rows strictly after (sort_value, id_value) in the given direction
+
+    Null and missing sort values order before every other value, so they are
+    the last block of a descending page and the first of an ascending one;
+    range operators never match them, so that block is bracketed explicitly.
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    if sort_value is None:
+        tie = {sort_field: None, id_field: {op: id_value}}
+        return tie if direction < 0 else {"$or": [tie, {sort_field: {"$ne": None}}]}
+    branches = [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, id_field: {op: id_value}}
+    ]
+    if direction < 0:
+        branches.append({sort_field: None})
+    return {"$or": branches}
+
+def _cache_key(collection, query: dict) -> Tuple[str, str]:
+    return collection.name, json.dumps(query, sort_keys=True, default=str)
+
+async def count_total(collection, query: dict, mode: str = "cached") -> Optional[int]:
+    """Total matching rows according to the count mode"""
+    if mode == "none":
+        return None
+    if mode == "estimated" and not query:
+        return await collection.estimated_document_count()
+    if mode == "exact":
+        return await collection.count_documents(query)
+
+    key = _cache_key(collection, query)
+    cached = _count_cache.get(key)
+    if cached and time.monotonic() - cached[1] < PAGINATION_COUNT_TTL:
+        return cached[0]
+    total = await collection.count_documents(query)
+    _count_cache[key] = (total, time.monotonic())
+    if len(_count_cache) > 1000:
+        # Drop the oldest half rather than tracking per-entry expiry
+        for stale in sorted(_count_cache, key=lambda k: _count_cache[k][1])[:500]:
+            _count_cache.pop(stale, None)
+    return total
+
+def invalidate_counts(collection_name: str):
+    """Forget cached totals for a collection (call after bulk writes)"""
+    for key in [k for k in _count_cache if k[0] == collection_name]:
+        _count_cache.pop(key, None)
+
+async def keyset_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    id_field: str,
+    direction: int = -1,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    projection: Optional[Dict[str, Any]] = None,
+    lookups: Optional[List[dict]] = None,
+    count: str = "cached",
+    computed: Optional[List[dict]] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one page ordered by (sort_field, id_field).
+
+    `skip` is honoured only without a cursor, for clients still paging by offset.
+    `computed` stages run after the filter and before sorting, so the sort key
+    may be a computed field (e.g. a search rank).
+    Returns {"items", "next_cursor", "has_more", "total"}.
+    """
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid count mode. Use: {', '.join(COUNT_MODES)}")
+    limit = min(max(limit, 1), PAGINATION_MAX_LIMIT)
+
+    after = None
+    if cursor:
+        sort_value, id_value = decode_cursor(cursor, sort_field)
+        after = keyset_filter(sort_field, id_field, direction, sort_value, id_value)
+
+    pipeline: List[dict] = []
+    if computed or count == "facet":
+        # Filter first; the cursor applies to the page branch only
+        pipeline.append({"$match": query})
+        pipeline.extend(computed or [])
+        page: List[dict] = [{"$match": after}] if after else []
+    else:
+        pipeline.append({"$match": {"$and": [query, after]} if after and query else (after or query)})
+        page = []
+    page.append({"$sort": {sort_field: direction, id_field: direction}})
+    if skip > 0 and not cursor:
+        page.append({"$skip": skip})
+    page.append({"$limit": limit + 1})
+    page.extend(lookups or [])
+    if projection:
+        page.append({"$project": projection})
+
+    if count == "facet":
+        pipeline.append({"$facet": {"items": page, "total": [{"$count": "n"}]}})
+        result = await collection.aggregate(pipeline).to_list(1)
+        facet = result[0] if result else {}
+        items = facet.get("items", [])
+        total = (facet.get("total") or [{"n": 0}])[0]["n"]
+    else:
+        pipeline.extend(page)
+        items = await collection.aggregate(pipeline).to_list(limit + 1)
+        total = await count_total(collection, query, count)
+    has_more = len(items) > limit
+    items = items[:limit]
+    for item in items:
+        item.pop("_id", None)
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_field, last.get(sort_field), last.get(id_field))
+
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total": total,
+    }
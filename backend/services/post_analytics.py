@@ -0,0 +1,207 @@
+"""
+Post Analytics - Vectorized statistics over an account's Instagram media
+
+Media lists from the Graph API are converted once into columnar NumPy arrays
+(likes, comments, engagement, timestamps, media-type codes) and every metric
+the audit, content and growth features need is computed from those columns:
+totals and averages, engagement percentiles, the media-type mix and per-type
+engagement, best/worst posts, posting cadence (gaps and rolling weekly
+counts), an hour-of-week engagement heatmap and outlier posts (robust z-score
+on the median absolute deviation). Cost is a handful of array operations, so
+thousands of posts per account analyze in milliseconds.
+"""
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+MEDIA_TYPES = ("IMAGE", "VIDEO", "CAROUSEL_ALBUM")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+HOURS_PER_WEEK = 7 * 24
+SECONDS_PER_DAY = 86400
+CADENCE_WEEKS = 8
+OUTLIER_Z = 3.5
+PERCENTILES = (25, 50, 75, 90)
+EMOJI_MARKERS = ("😀", "🔥", "❤", "✨")
+
+class PostColumns(NamedTuple):
+    """Columnar view of a media list (row i of every array is post i)"""
+    ids: List[Optional[str]]
+    captions: List[str]
+    likes: np.ndarray
+    comments: np.ndarray
+    engagement: np.ndarray
+    timestamps: np.ndarray  # epoch seconds (UTC), NaN when unknown
+    type_codes: np.ndarray  # index into MEDIA_TYPES, len(MEDIA_TYPES) for other types
+
+    def __len__(self):
+        return len(self.ids)
+
+def parse_timestamp(value: Optional[str]) -> float:
+    """Graph API timestamp ("2024-05-01T18:30:00+0000") to epoch seconds"""
+    if not value:
+        return np.nan
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z").timestamp()
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return np.nan
+
+def to_columns(posts: list) -> PostColumns:
+    type_index = {media_type: i for i, media_type in enumerate(MEDIA_TYPES)}
+    likes = np.fromiter((p.get("like_count") or 0 for p in posts), dtype=np.int64, count=len(posts))
+    comments = np.fromiter((p.get("comments_count") or 0 for p in posts), dtype=np.int64, count=len(posts))
+    return PostColumns(
+        ids=[p.get("id") for p in posts],
+        captions=[p.get("caption") or "" for p in posts],
+        likes=likes,
+        comments=comments,
+        engagement=likes + comments,
+        timestamps=np.fromiter((parse_timestamp(p.get("timestamp")) for p in posts), dtype=np.float64, count=len(posts)),
+        type_codes=np.fromiter(
+            (type_index.get(p.get("media_type", "IMAGE"), len(MEDIA_TYPES)) for p in posts),
+            dtype=np.int8, count=len(posts)
+        ),
+    )
+
+def _media_type(cols: PostColumns, i: int, posts: list) -> str:
+    code = int(cols.type_codes[i])
+    return MEDIA_TYPES[code] if code < len(MEDIA_TYPES) else posts[i].get("media_type", "OTHER")
+
+def _post_summary(cols: PostColumns, i: int, posts: list) -> dict:
+    return {
+        "id": cols.ids[i],
+        "caption": cols.captions[i][:100],
+        "likes": int(cols.likes[i]),
+        "comments": int(cols.comments[i]),
+        "engagement": int(cols.engagement[i]),
+        "type": _media_type(cols, i, posts),
+        "timestamp": posts[i].get("timestamp")
+    }
+
+def hour_of_week(timestamps: np.ndarray) -> np.ndarray:
+    """UTC hour-of-week slot (0 = Monday 00:00) per timestamp; -1 where unknown"""
+    known = ~np.isnan(timestamps)
+    slots = np.full(timestamps.shape, -1, dtype=np.int64)
+    hours = timestamps[known].astype(np.int64) // 3600
+    # 1970-01-01 was a Thursday: shift so slot 0 is Monday 00:00
+    slots[known] = (hours + 3 * 24) % HOURS_PER_WEEK
+    return slots
+
+def hour_of_week_matrix(cols: PostColumns) -> tuple:
+    """(post counts, engagement sums), each shaped (7, 24) by weekday and UTC hour"""
+    slots = hour_of_week(cols.timestamps)
+    known = slots >= 0
+    counts = np.bincount(slots[known], minlength=HOURS_PER_WEEK)
+    sums = np.bincount(slots[known], weights=cols.engagement[known], minlength=HOURS_PER_WEEK)
+    return counts.reshape(7, 24), sums.reshape(7, 24)
+
+def posting_cadence(timestamps: np.ndarray) -> dict:
+    known = np.sort(timestamps[~np.isnan(timestamps)])
+    if len(known) < 2:
+        return {"posting_frequency": "Unknown", "avg_days_between_posts": None, "posts_per_week": None, "weekly_post_counts": []}
+    gaps = np.diff(known) / SECONDS_PER_DAY
+    span_weeks = max((known[-1] - known[0]) / (7 * SECONDS_PER_DAY), 1 / 7)
+    # Posts in each of the last CADENCE_WEEKS weeks, oldest first
+    weeks_ago = ((known[-1] - known) // (7 * SECONDS_PER_DAY)).astype(np.int64)
+    weekly = np.bincount(weeks_ago[weeks_ago < CADENCE_WEEKS], minlength=CADENCE_WEEKS)[::-1]
+    # n posts span n - 1 gaps
+    posts_per_week = (len(known) - 1) / span_weeks
+    if posts_per_week >= 5:
+        label = "Daily"
+    elif posts_per_week >= 2:
+        label = "Several times a week"
+    elif posts_per_week >= 0.75:
+        label = "Weekly"
+    else:
+        label = "Less than weekly"
+    return {
+        "posting_frequency": label,
+        "avg_days_between_posts": round(float(gaps.mean()), 1),
+        "median_days_between_posts": round(float(np.median(gaps)), 1),
+        "posts_per_week": round(float(posts_per_week), 1),
+        "weekly_post_counts": weekly.tolist()
+    }
+
+def _best_slots(counts: np.ndarray, sums: np.ndarray, top: int = 3) -> List[dict]:
+    flat_counts, flat_sums = counts.ravel(), sums.ravel()
+    occupied = np.flatnonzero(flat_counts)
+    if not len(occupied):
+        return []
+    averages = flat_sums[occupied] / flat_counts[occupied]
+    order = occupied[np.argsort(averages)[::-1][:top]]
+    return [
+        {
+            "day": WEEKDAYS[slot // 24],
+            "hour": int(slot % 24),
+            "avg_engagement": round(float(flat_sums[slot] / flat_counts[slot]), 1),
+            "posts": int(flat_counts[slot])
+        }
+        for slot in order
+    ]
+
+def _outliers(cols: PostColumns, posts: list) -> List[dict]:
+    engagement = cols.engagement.astype(np.float64)
+    median = np.median(engagement)
+    mad = np.median(np.abs(engagement - median))
+    if mad == 0:
+        return []
+    z = 0.6745 * (engagement - median) / mad
+    flagged = np.flatnonzero(np.abs(z) > OUTLIER_Z)
+    flagged = flagged[np.argsort(-np.abs(z[flagged]))]
+    return [
+        {**_post_summary(cols, int(i), posts), "direction": "high" if z[i] > 0 else "low", "z_score": round(float(z[i]), 1)}
+        for i in flagged[:5]
+    ]
+
+def analyze_posts(posts: list, follower_count: int = 0) -> dict:
+    """All post metrics in one pass over the columnar arrays ({} when there are no posts)"""
+    if not posts:
+        return {}
+    cols = to_columns(posts)
+    n = len(cols)
+
+    avg_likes = float(cols.likes.mean())
+    avg_comments = float(cols.comments.mean())
+    engagement_rate = (avg_likes + avg_comments) / follower_count * 100 if follower_count else 0
+
+    type_counts = np.bincount(cols.type_codes, minlength=len(MEDIA_TYPES) + 1)
+    type_sums = np.bincount(cols.type_codes, weights=cols.engagement, minlength=len(MEDIA_TYPES) + 1)
+    post_types = {media_type: int(type_counts[i]) for i, media_type in enumerate(MEDIA_TYPES)}
+    type_engagement = {
+        media_type: round(float(type_sums[i] / type_counts[i]), 1)
+        for i, media_type in enumerate(MEDIA_TYPES) if type_counts[i]
+    }
+    for i, post in enumerate(posts):
+        if cols.type_codes[i] == len(MEDIA_TYPES):
+            post_types[post.get("media_type")] = post_types.get(post.get("media_type"), 0) + 1
+
+    counts, sums = hour_of_week_matrix(cols)
+    captions = [c for c in cols.captions if c]
+    caption_lengths = np.fromiter((len(c) for c in captions), dtype=np.int64, count=len(captions))
+
+    return {
+        "total_posts_analyzed": n,
+        "total_likes": int(cols.likes.sum()),
+        "total_comments": int(cols.comments.sum()),
+        "avg_likes": round(avg_likes, 1),
+        "avg_comments": round(avg_comments, 1),
+        "avg_engagement": round(float(cols.engagement.mean()), 1),
+        "engagement_rate": round(engagement_rate, 2),
+        "engagement_percentiles": {
+            f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, np.percentile(cols.engagement, PERCENTILES))
+        },
+        "post_types": post_types,
+        "type_engagement": type_engagement,
+        "best_performing_post": _post_summary(cols, int(np.argmax(cols.engagement)), posts),
+        "worst_performing_post": _post_summary(cols, int(np.argmin(cols.engagement)), posts),
+        **posting_cadence(cols.timestamps),
+        "best_time_slots": _best_slots(counts, sums),
+        "outlier_posts": _outliers(cols, posts),
+        "avg_caption_length": int(caption_lengths.mean()) if len(captions) else 0,
+        "uses_emojis": any(marker in c for c in captions for marker in EMOJI_MARKERS),
+        "uses_hashtags": any("#" in c for c in captions),
+        "recent_captions": [c[:200] for c in captions[:5]]
+    }
@@ -0,0 +1,303 @@
+"""
+Posting Time Engine - Ranked posting slots from real engagement history
+
+Synced media are folded into an hour-of-week engagement matrix per account
+(posting_time_stats) and per niche (posting_time_niches). Each post
+contributes its engagement relative to the account's mean, so accounts of any
+size feed the same niche matrix. Ingestion is incremental: only media newer
+than the account's watermark are added, using $inc on sparse slot counters.
+A post is only ingested once it is POSTING_TIMES_MATURITY_DAYS old, when its
+engagement has mostly settled; younger posts wait for a later sync, so a
+half-grown like count is never frozen into the matrices.
+
+Slot scores are shrunk towards priors, then smoothed over neighbouring hours
+and ranked. A sparse slot leans on the account's hour-of-day average, and
+that in turn on the niche's slot average. Results are cached per account for
+POSTING_TIMES_TTL seconds and dropped when new posts are ingested. Times are
+UTC; the LLM is only used, on request, to write the narrative.
+
+Accounts without ranked history are backfilled from the Graph API on demand,
+at most once per POSTING_TIMES_COLD_START_RETRY seconds (claim_cold_start), so
+an account with only young posts or a failing token doesn't cost a Graph API
+round trip on every page view.
+"""
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+from services.realtime import get_broker
+from services.post_analytics import (
+    HOURS_PER_WEEK, MEDIA_TYPES, WEEKDAYS, hour_of_week, posting_cadence, to_columns
+)
+
+logger = logging.getLogger(__name__)
+
+POSTING_TIMES_TTL = int(os.environ.get('POSTING_TIMES_TTL', 600))
+POSTING_TIMES_MAX_ACCOUNTS = 10000
+POSTING_TIMES_MATURITY_DAYS = float(os.environ.get('POSTING_TIMES_MATURITY_DAYS', 7))
+POSTING_TIMES_COLD_START_RETRY = float(os.environ.get('POSTING_TIMES_COLD_START_RETRY', 6 * 3600))
+STATS_COLLECTION = "posting_time_stats"
+NICHE_COLLECTION = "posting_time_niches"
+POSTING_TIMES_CHANNEL = "posting_times_invalidated"
+
+# Pseudo-post weights of each prior level
+SLOT_PRIOR_WEIGHT = 3.0
+HOUR_PRIOR_WEIGHT = 5.0
+NICHE_PRIOR_WEIGHT = 10.0
+SMOOTHING_KERNEL = np.array([0.2, 0.6, 0.2])
+TOP_SLOTS = 10
+
+DEFAULT_SCHEDULE = {
+    "best_times": [
+        {"day": "Monday", "times": ["9:00 AM", "12:00 PM", "6:00 PM"]},
+        {"day": "Wednesday", "times": ["9:00 AM", "12:00 PM", "7:00 PM"]},
+        {"day": "Friday", "times": ["10:00 AM", "2:00 PM", "8:00 PM"]}
+    ],
+    "frequency": "5-7 posts per week",
+    "content_mix": {"reels": 60, "posts": 25, "stories": 15},
+    "peak_engagement_windows": ["9-11 AM", "7-9 PM"],
+    "avoid_times": ["2-5 AM", "During major events"],
+}
+
+def _hour_label(hour: int) -> str:
+    suffix = "AM" if hour < 12 else "PM"
+    return f"{(hour % 12) or 12}:00 {suffix}"
+
+def _dense(sparse: Optional[dict]) -> np.ndarray:
+    """Sparse {"<slot>": value} sub-document to a length-168 array"""
+    dense = np.zeros(HOURS_PER_WEEK)
+    for slot, value in (sparse or {}).items():
+        dense[int(slot)] = value
+    return dense
+
+def _slot_sums(stats: Optional[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """(post counts, summed relative-engagement scores) per slot"""
+    stats = stats or {}
+    return _dense(stats.get("counts")), _dense(stats.get("scores"))
+
+def score_slots(account_stats: Optional[dict], niche_stats: Optional[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Smoothed relative-engagement score and post count for every hour-of-week slot"""
+    counts, scores = _slot_sums(account_stats)
+    niche_counts, niche_scores = _slot_sums(niche_stats)
+
+    # Niche slot mean, shrunk towards neutral (1.0 = the account's average post)
+    niche_prior = (niche_scores + NICHE_PRIOR_WEIGHT) / (niche_counts + NICHE_PRIOR_WEIGHT)
+
+    # Account hour-of-day mean (pooled over weekdays), shrunk towards the niche
+    hour_counts = counts.reshape(7, 24).sum(axis=0)
+    hour_scores = scores.reshape(7, 24).sum(axis=0)
+    niche_by_hour = niche_prior.reshape(7, 24)
+    hour_prior = (hour_scores + HOUR_PRIOR_WEIGHT * niche_by_hour) / (hour_counts + HOUR_PRIOR_WEIGHT)
+
+    posterior = (scores + SLOT_PRIOR_WEIGHT * hour_prior.ravel()) / (counts + SLOT_PRIOR_WEIGHT)
+
+    # Adjacent hours behave alike; smooth circularly across the week
+    padded = np.concatenate([posterior[-1:], posterior, posterior[:1]])
+    smoothed = np.convolve(padded, SMOOTHING_KERNEL, mode="valid")
+    return smoothed, counts
+
+def _windows(hours: np.ndarray) -> List[str]:
+    """Contiguous hour ranges ("7:00 PM - 9:00 PM UTC") from a sorted array of hours"""
+    ranges = []
+    start = prev = None
+    for hour in list(hours) + [None]:
+        if start is None:
+            start = prev = hour
+        elif hour is not None and hour == prev + 1:
+            prev = hour
+        else:
+            end = prev + 1
+            ranges.append(f"{_hour_label(start)} - {_hour_label(end % 24)} UTC")
+            start = prev = hour
+    return ranges[:3]
+
+def build_schedule(account_stats: Optional[dict], niche_stats: Optional[dict]) -> dict:
+    """Ranked slots and the recommendation payload"""
+    if not (account_stats or {}).get("posts") and not (niche_stats or {}).get("posts"):
+        return {**DEFAULT_SCHEDULE, "ranked_slots": [], "data_source": "default", "posts_analyzed": 0,
+                "timezone": "UTC", "reasoning": "General Instagram patterns; sync your account to rank your own hours"}
+
+    smoothed, counts = score_slots(account_stats, niche_stats)
+    order = np.argsort(smoothed)[::-1]
+    ranked = [
+        {
+            "day": WEEKDAYS[slot // 24],
+            "hour": int(slot % 24),
+            "time": _hour_label(int(slot % 24)),
+            "score": round(float(smoothed[slot]), 3),
+            "posts": int(counts[slot])
+        }
+        for slot in order[:TOP_SLOTS]
+    ]
+
+    best_times: Dict[str, List[str]] = OrderedDict()
+    for slot in ranked:
+        times = best_times.setdefault(slot["day"], [])
+        if len(times) < 3:
+            times.append(slot["time"])
+        if len(best_times) >= 4:
+            break
+
+    by_hour = smoothed.reshape(7, 24).mean(axis=0)
+    peak_hours = np.sort(np.argsort(by_hour)[::-1][:4])
+    avoid_hours = np.sort(np.argsort(by_hour)[:4])
+
+    account_stats = account_stats or {}
+    types = account_stats.get("types") or {}
+    typed = sum(types.values())
+    content_mix = DEFAULT_SCHEDULE["content_mix"]
+    if typed:
+        content_mix = {
+            "reels": round(100 * types.get("VIDEO", 0) / typed),
+            "carousels": round(100 * types.get("CAROUSEL_ALBUM", 0) / typed),
+            "posts": round(100 * types.get("IMAGE", 0) / typed),
+        }
+    per_week = account_stats.get("posts_per_week")
+
+    data_source = "account_history" if account_stats.get("posts") else "niche_benchmark"
+    top = ranked[0]
+    if data_source == "account_history":
+        reasoning = (
+            f"Ranked from {account_stats['posts']} of your posts (niche averages fill in sparse hours). "
+            f"{top['day']} at {top['time']} UTC scores {top['score']}x your average post."
+        )
+    else:
+        reasoning = f"Based on engagement across {niche_stats['posts']} posts from accounts in your niche."
+
+    return {
+        "best_times": [{"day": day, "times": times} for day, times in best_times.items()],
+        "frequency": f"{per_week} posts per week currently" if per_week else DEFAULT_SCHEDULE["frequency"],
+        "content_mix": content_mix,
+        "peak_engagement_windows": _windows(peak_hours),
+        "avoid_times": _windows(avoid_hours),
+        "ranked_slots": ranked,
+        "data_source": data_source,
+        "posts_analyzed": int(account_stats.get("posts", 0)),
+        "timezone": "UTC",
+        "reasoning": reasoning
+    }
+
+class PostingTimeEngine:
+    """Incremental hour-of-week stats and a per-account schedule cache"""
+
+    def __init__(self, broker=None, ttl: int = POSTING_TIMES_TTL):
+        self.broker = broker or get_broker()
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+    async def ingest(self, account_id: str, niche: Optional[str], media: list) -> int:
+        """Fold mature media newer than the account's watermark into the account and niche matrices"""
+        if not media:
+            return 0
+        db = get_database()
+        stats = await db[STATS_COLLECTION].find_one(
+            {"account_id": account_id}, {"_id": 0, "watermark": 1, "posts": 1, "engagement": 1}
+        ) or {}
+        watermark = stats.get("watermark", 0.0)
+
+        cols = to_columns(media)
+        timestamps = np.nan_to_num(cols.timestamps, nan=-1.0)
+        mature_before = time.time() - POSTING_TIMES_MATURITY_DAYS * 86400
+        fresh = (timestamps > watermark) & (timestamps <= mature_before)
+        if not fresh.any():
+            return 0
+
+        engagement = cols.engagement[fresh]
+        posts = stats.get("posts", 0) + int(fresh.sum())
+        mean = (stats.get("engagement", 0) + int(engagement.sum())) / posts
+        relative = engagement / mean if mean > 0 else np.ones(len(engagement))
+
+        slots = hour_of_week(cols.timestamps[fresh])
+        slot_counts = np.bincount(slots, minlength=HOURS_PER_WEEK)
+        slot_scores = np.bincount(slots, weights=relative, minlength=HOURS_PER_WEEK)
+        increments = {}
+        for slot in np.flatnonzero(slot_counts):
+            increments[f"counts.{slot}"] = int(slot_counts[slot])
+            increments[f"scores.{slot}"] = float(slot_scores[slot])
+        niche_increments = {**increments, "posts": int(fresh.sum())}
+
+        type_counts = np.bincount(cols.type_codes[fresh], minlength=len(MEDIA_TYPES) + 1)
+        for i, media_type in enumerate(MEDIA_TYPES):
+            if type_counts[i]:
+                increments[f"types.{media_type}"] = int(type_counts[i])
+
+        try:
+            result = await db[STATS_COLLECTION].update_one(
+                {"account_id": account_id, "watermark": watermark},
+                {
+                    "$inc": {**increments, "posts": int(fresh.sum()), "engagement": int(engagement.sum())},
+                    "$set": {
+                        "niche": niche,
+                        "watermark": float(cols.timestamps[fresh].max()),
+                        "posts_per_week": posting_cadence(cols.timestamps).get("posts_per_week"),
+                        "updated_at": datetime.now(timezone.utc).isoformat()
+                    }
+                },
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return 0  # a concurrent sync already ingested these posts
+        if not (result.matched_count or result.upserted_id):
+            return 0
+
+        if niche:
+            await db[NICHE_COLLECTION].update_one({"niche": niche}, {"$inc": niche_increments}, upsert=True)
+        await self.invalidate(account_id)
+        return int(fresh.sum())
+
+    async def claim_cold_start(self, account_id: str) -> bool:
+        """True if this request should fetch the account's media (one attempt per retry window)"""
+        db = get_database()
+        now = datetime.now(timezone.utc)
+        retry_before = (now - timedelta(seconds=POSTING_TIMES_COLD_START_RETRY)).isoformat()
+        try:
+            await db[STATS_COLLECTION].update_one(
+                {"account_id": account_id, "$or": [
+                    {"cold_start_at": {"$exists": False}}, {"cold_start_at": {"$lt": retry_before}}
+                ]},
+                # ingest() matches on the watermark, so a new document starts with one
+                {"$set": {"cold_start_at": now.isoformat()}, "$setOnInsert": {"watermark": 0.0}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # attempted recently
+        return True
+
+    async def get_schedule(self, account_id: str, niche: Optional[str]) -> dict:
+        entry = self._cache.get(account_id)
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            self._cache.move_to_end(account_id)
+            return entry[0]
+
+        db = get_database()
+        account_stats = await db[STATS_COLLECTION].find_one({"account_id": account_id}, {"_id": 0})
+        niche_stats = await db[NICHE_COLLECTION].find_one({"niche": niche}, {"_id": 0}) if niche else None
+        schedule = build_schedule(account_stats, niche_stats)
+
+        self._cache[account_id] = (schedule, time.monotonic())
+        while len(self._cache) > POSTING_TIMES_MAX_ACCOUNTS:
+            self._cache.popitem(last=False)
+        return schedule
+
+    async def invalidate(self, account_id: str):
+        """Drop an account's cached schedule on every worker"""
+        self._cache.pop(account_id, None)
+        await self.broker.publish(POSTING_TIMES_CHANNEL, {"account_id": account_id})
+
+    async def _on_remote_invalidate(self, event: dict):
+        self._cache.pop(event["account_id"], None)
+
+    def start(self):
+        self.broker.start(POSTING_TIMES_CHANNEL, self._on_remote_invalidate)
+
+posting_time_engine = PostingTimeEngine()
+
+def get_posting_time_engine() -> PostingTimeEngine:
+    return posting_time_engine
@@ -0,0 +1,222 @@
+"""
+Realtime delivery primitives shared by the user and admin WebSocket routers
+
+- QueuedWebSocket gives every socket a bounded send queue drained by its own
+  writer task, so one slow client never stalls a broadcast. A client whose
+  queue fills up is disconnected instead of buffering without limit.
+- Messages are serialized once (encode_message) and the same text frame is
+  enqueued on every target socket.
+- Brokers carry pre-serialized frames between uvicorn workers. MongoBroker
+  tails a capped collection (works on standalone Mongo, unlike change streams);
+  LocalBroker is the single-process stand-in. ObjectIds from different workers
+  are not ordered within a second, so a tail resumes by re-reading the last
+  WS_EVENTS_RESUME_WINDOW seconds and skipping events it has already seen.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Optional
+
+from fastapi import WebSocket
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE', 100))
+WS_SEND_TIMEOUT = float(os.environ.get('WS_SEND_TIMEOUT', 10))
+WS_PUBSUB_BACKEND = os.environ.get('WS_PUBSUB_BACKEND', 'mongo')
+WS_EVENTS_COLLECTION = "ws_events"
+WS_EVENTS_CAPPED_SIZE = 16 * 1024 * 1024  # bytes
+WS_EVENTS_RESUME_WINDOW = 5  # seconds re-read when a tail (re)opens (covers clock skew)
+WS_EVENTS_SEEN_IDS = 10000
+
+# Close code sent to clients that cannot keep up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+def encode_message(message: dict) -> str:
+    """Serialize a message once for delivery to any number of sockets"""
+    return json.dumps(message, default=str)
+
+class QueuedWebSocket:
+    """A WebSocket with a bounded outbound queue and a dedicated writer task"""
+
+    def __init__(self, websocket: WebSocket, maxsize: int = WS_SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, text: str) -> bool:
+        """Queue a pre-serialized frame. Disconnects the client if its queue is full."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"WebSocket send queue full ({self.queue.maxsize}), disconnecting slow consumer")
+            self.close(SLOW_CONSUMER_CLOSE_CODE)
+            return False
+
+    def send_json(self, message: dict) -> bool:
+        return self.enqueue(encode_message(message))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"WebSocket writer stopped: {e}")
+            self.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+class LocalBroker:
+    """Single-worker stand-in: every subscriber lives in this process"""
+
+    async def publish(self, channel: str, event: dict):
+        pass
+
+    def start(self, channel: str, handler: EventHandler):
+        pass
+
+    async def stop(self):
+        pass
+
+class MongoBroker:
+    """Cross-worker pub/sub over a tailable cursor on a capped collection"""
+
+    def __init__(self, collection: str = WS_EVENTS_COLLECTION, size: int = WS_EVENTS_CAPPED_SIZE):
+        self.collection = collection
+        self.size = size
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: list = []
+        self._ready: Optional[asyncio.Task] = None
+
+    async def _ensure_collection(self):
+        db = get_database()
+        existing = await db.list_collection_names(filter={"name": self.collection})
+        if not existing:
+            try:
+                await db.create_collection(self.collection, capped=True, size=self.size)
+            except Exception as e:
+                # Another worker created it first
+                logger.debug(f"create_collection({self.collection}): {e}")
+
+    async def publish(self, channel: str, event: dict):
+        db = get_database()
+        try:
+            await db[self.collection].insert_one({
+                **event,
+                "channel": channel,
+                "origin": self.origin,
+                "created_at": datetime.now(timezone.utc).isoformat()
+            })
+        except Exception as e:
+            logger.error(f"Failed to publish {channel} event: {e}")
+
+    def start(self, channel: str, handler: EventHandler):
+        self._tasks.append(asyncio.create_task(self._tail(channel, handler)))
+
+    async def _tail(self, channel: str, handler: EventHandler):
+        from bson import ObjectId
+        from pymongo import CursorType
+
+        db = get_database()
+        await self._ensure_collection()
+        coll = db[self.collection]
+
+        seen_order: deque = deque(maxlen=WS_EVENTS_SEEN_IDS)
+        seen = set()
+
+        def remember(event_id) -> bool:
+            """False if the event was already delivered (or skipped)"""
+            if event_id in seen:
+                return False
+            if len(seen_order) == seen_order.maxlen:
+                seen.discard(seen_order[0])
+            seen_order.append(event_id)
+            seen.add(event_id)
+            return True
+
+        def window(since: datetime) -> dict:
+            floor = ObjectId.from_datetime(since - timedelta(seconds=WS_EVENTS_RESUME_WINDOW))
+            return {"channel": channel, "_id": {"$gte": floor}}
+
+        # Only deliver events published after this worker started
+        resume_from = datetime.now(timezone.utc)
+        async for doc in coll.find(window(resume_from), {"_id": 1}):
+            remember(doc["_id"])
+
+        while True:
+            cursor = coll.find(window(resume_from), cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for doc in cursor:
+                        if not remember(doc["_id"]):
+                            continue
+                        # Later events (natural order) carry ids from at most the skew earlier
+                        resume_from = doc["_id"].generation_time
+                        if doc.get("origin") == self.origin:
+                            continue
+                        try:
+                            await handler(doc)
+                        except Exception as e:
+                            logger.error(f"Error handling {channel} event: {e}")
+                    await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"{channel} event tail interrupted: {e}")
+            # Cursor died (empty collection or network error); reopen shortly
+            await asyncio.sleep(1)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+def create_broker():
+    """Build the configured pub/sub backbone (WS_PUBSUB_BACKEND=mongo|local)"""
+    if WS_PUBSUB_BACKEND == "local":
+        return LocalBroker()
+    return MongoBroker()
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = create_broker()
+    return _broker
@@ -0,0 +1,314 @@
+"""
+Report Rendering - Audit and growth-plan PDFs rendered off the event loop and cached
+
+ReportLab rendering is CPU-bound, so PDFs are rendered in a process pool
+(REPORT_RENDER_WORKERS processes) and the bytes are cached on disk under
+REPORT_CACHE_DIR, one directory per document. The cache key covers the
+document id and its last change (updated_at/created_at) plus the team's
+branding_version, so editing the document or the team branding produces a new
+key; the superseded file in the document's directory is removed when the new
+one is written, without listing the whole cache. Concurrent requests for
+the same report share one render. The footer carries the document's date
+rather than the render date, so a cached PDF never goes stale. Renders of
+deleted documents are purged by the cascade, and files untouched for
+REPORT_CACHE_MAX_AGE_DAYS are pruned every REPORT_PRUNE_INTERVAL seconds.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REPORT_RENDER_WORKERS = int(os.environ.get('REPORT_RENDER_WORKERS', 2))
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', '/tmp/instagrowth_reports')
+REPORT_CACHE_MAX_AGE_DAYS = int(os.environ.get('REPORT_CACHE_MAX_AGE_DAYS', 30))
+REPORT_PRUNE_INTERVAL = float(os.environ.get('REPORT_PRUNE_INTERVAL', 6 * 3600))
+
+DEFAULT_BRAND_COLOR = "#6366F1"
+DEFAULT_COMPANY_NAME = "InstaGrowth OS"
+
+# Team fields needed to build the cache key (the logo is only loaded on a miss)
+BRANDING_FIELDS = {"_id": 0, "team_id": 1, "name": 1, "brand_color": 1, "branding_version": 1}
+
+# ==================== RENDERERS (run in worker processes) ====================
+
+def _branding(team: Optional[dict]) -> tuple:
+    brand_color = team.get("brand_color", DEFAULT_BRAND_COLOR) if team else DEFAULT_BRAND_COLOR
+    company_name = team.get("name", DEFAULT_COMPANY_NAME) if team else DEFAULT_COMPANY_NAME
+    return brand_color, company_name
+
+def _document_date(doc: dict) -> str:
+    """The document's own date (part of the cache key), for the footer"""
+    stamp = doc.get("updated_at") or doc.get("created_at")
+    if isinstance(stamp, datetime):
+        return stamp.strftime('%Y-%m-%d')
+    return str(stamp)[:10] if stamp else ""
+
+def render_audit_pdf(audit: dict, team: Optional[dict], logo: Optional[bytes]) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.utils import ImageReader
+
+    brand_color, company_name = _branding(team)
+
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    p.setFillColor(HexColor(brand_color))
+    p.rect(0, height - 100, width, 100, fill=True)
+
+    if logo:
+        try:
+            p.drawImage(ImageReader(BytesIO(logo)), 30, height - 80, width=50, height=50, preserveAspectRatio=True)
+        except Exception:
+            pass
+
+    p.setFillColor(HexColor("#FFFFFF"))
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(100 if logo else 50, height - 55, f"{company_name} - Account Audit")
+
+    y = height - 140
+    p.setFillColor(HexColor("#000000"))
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(50, y, f"@{audit['username']}")
+    y -= 30
+
+    p.setFont("Helvetica", 12)
+    p.drawString(50, y, f"Engagement Score: {audit['engagement_score']}/100")
+    y -= 20
+    p.drawString(50, y, f"Shadowban Risk: {audit['shadowban_risk'].upper()}")
+    y -= 20
+    p.drawString(50, y, f"Content Consistency: {audit['content_consistency']}/100")
+    if audit.get('estimated_followers'):
+        y -= 20
+        p.drawString(50, y, f"Estimated Followers: {audit['estimated_followers']:,}")
+    y -= 40
+
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Growth Mistakes:")
+    y -= 20
+    p.setFont("Helvetica", 11)
+    for mistake in audit.get('growth_mistakes', [])[:5]:
+        p.drawString(60, y, f"• {mistake[:80]}")
+        y -= 18
+    y -= 20
+
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, "Recommendations:")
+    y -= 20
+    p.setFont("Helvetica", 11)
+    for rec in audit.get('recommendations', [])[:7]:
+        p.drawString(60, y, f"• {rec[:80]}")
+        y -= 18
+
+    p.setFont("Helvetica", 9)
+    p.setFillColor(HexColor("#666666"))
+    p.drawString(50, 30, f"Generated by {company_name} | {_document_date(audit)}")
+
+    p.save()
+    return buffer.getvalue()
+
+def render_growth_plan_pdf(plan: dict, team: Optional[dict], logo: Optional[bytes] = None) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.colors import HexColor
+
+    brand_color, company_name = _branding(team)
+
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    p.setFillColor(HexColor(brand_color))
+    p.rect(0, height - 100, width, 100, fill=True)
+    p.setFillColor(HexColor("#FFFFFF"))
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(50, height - 55, f"{company_name} - Growth Plan")
+
+    y = height - 140
+    p.setFillColor(HexColor("#000000"))
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(50, y, f"{plan['duration']}-Day Growth Plan")
+    y -= 30
+
+    p.setFont("Helvetica", 11)
+    for task in plan.get('daily_tasks', [])[:15]:
+        p.drawString(50, y, f"Day {task['day']}: {task['title'][:60]}")
+        y -= 16
+        if y < 50:
+            p.showPage()
+            y = height - 50
+
+    p.setFont("Helvetica", 9)
+    p.setFillColor(HexColor("#666666"))
+    p.drawString(50, 30, f"Generated by {company_name} | {_document_date(plan)}")
+
+    p.save()
+    return buffer.getvalue()
+
+RENDERERS = {
+    "audit": render_audit_pdf,
+    "growth_plan": render_growth_plan_pdf,
+}
+
+# ==================== CACHE + POOL ====================
+
+LogoLoader = Callable[[], Awaitable[Optional[bytes]]]
+
+class ReportRenderer:
+    """Process-pool PDF rendering with an on-disk cache"""
+
+    def __init__(self, cache_dir: str = REPORT_CACHE_DIR, workers: int = REPORT_RENDER_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._prune_task: Optional[asyncio.Task] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @staticmethod
+    def cache_key(kind: str, doc_id: str, doc: dict, team: Optional[dict]) -> str:
+        stamp = doc.get("updated_at") or doc.get("created_at") or ""
+        branding = f"{team.get('team_id')}:{team.get('branding_version', 0)}" if team else "default"
+        digest = hashlib.sha1(f"{stamp}|{branding}".encode("utf-8")).hexdigest()[:16]
+        return f"{kind}_{doc_id}_{digest}"
+
+    def _doc_dir(self, kind: str, doc_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{kind}_{doc_id}")
+
+    def _path(self, kind: str, doc_id: str, key: str) -> str:
+        return os.path.join(self._doc_dir(kind, doc_id), f"{key}.pdf")
+
+    def _read(self, kind: str, doc_id: str, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(kind, doc_id, key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, kind: str, doc_id: str, key: str, data: bytes):
+        doc_dir = self._doc_dir(kind, doc_id)
+        os.makedirs(doc_dir, exist_ok=True)
+        path = self._path(kind, doc_id, key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        # Drop superseded renders of the same document
+        for name in os.listdir(doc_dir):
+            if name != f"{key}.pdf":
+                try:
+                    os.remove(os.path.join(doc_dir, name))
+                except OSError:
+                    pass
+
+    def invalidate(self, kind: str, *doc_ids: str):
+        """Remove every cached render of the given documents"""
+        for doc_id in doc_ids:
+            shutil.rmtree(self._doc_dir(kind, doc_id), ignore_errors=True)
+
+    def prune(self, max_age_days: int = REPORT_CACHE_MAX_AGE_DAYS):
+        """Delete cached renders not touched for max_age_days (e.g. of deleted documents)"""
+        cutoff = time.time() - max_age_days * 86400
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    for render in os.scandir(entry.path):
+                        if render.stat().st_mtime < cutoff:
+                            os.remove(render.path)
+                    if not os.listdir(entry.path):
+                        os.rmdir(entry.path)
+                elif entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)  # flat file from the previous layout
+            except OSError:
+                pass
+
+    async def render(self, kind: str, doc_id: str, doc: dict, team: Optional[dict], load_logo: Optional[LogoLoader] = None) -> bytes:
+        """Return cached PDF bytes or render them in the process pool"""
+        key = self.cache_key(kind, doc_id, doc, team)
+        loop = asyncio.get_running_loop()
+
+        cached = await loop.run_in_executor(None, self._read, kind, doc_id, key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this request was cancelled
+            # The request rendering it was cancelled; render it here instead
+            return await self.render(kind, doc_id, doc, team, load_logo)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            logo = await load_logo() if load_logo else None
+            data = await loop.run_in_executor(self._get_pool(), RENDERERS[kind], doc, team, logo)
+            try:
+                await loop.run_in_executor(None, self._write, kind, doc_id, key, data)
+            except OSError as e:
+                logger.warning(f"Could not cache {kind} report {doc_id}: {e}")
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()  # cancelled mid-render; waiters take over
+            elif not future.cancelled():
+                future.exception()  # mark retrieved when no one else awaited it
+
+    async def _prune_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.prune)
+            except Exception as e:
+                logger.error(f"Report cache prune failed: {e}")
+            await asyncio.sleep(REPORT_PRUNE_INTERVAL)
+
+    def start(self):
+        if self._prune_task is None:
+            self._prune_task = asyncio.create_task(self._prune_loop())
+
+    async def stop(self):
+        if self._prune_task:
+            self._prune_task.cancel()
+            try:
+                await self._prune_task
+            except asyncio.CancelledError:
+                pass
+            self._prune_task = None
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+report_renderer = ReportRenderer()
+
+def get_report_renderer() -> ReportRenderer:
+    return report_renderer
@@ -0,0 +1,315 @@
+"""
+Data Retention - TTL expiry for ephemeral data, rolling archival for cold logs
+
+Per-collection policies:
+- oauth_states and user_sessions carry an `expire_at` date and are removed by
+  MongoDB TTL indexes (registered in database.INDEXES). Documents written
+  before the field existed are backfilled by the retention job.
+- admin_logs and email_logs keep ADMIN_LOG_HOT_DAYS / EMAIL_LOG_HOT_DAYS of
+  history. Older records are moved into `<collection>_archive`: gzip-compressed
+  JSON lines in chunks of ARCHIVE_CHUNK_SIZE, partitioned by day, with per-chunk
+  counts so totals stay available. A day of history is read back on demand with
+  read_archive. Archive chunks are dropped after ARCHIVE_RETENTION_DAYS. Email
+  chunks list their recipients, so the user deletion cascade can rewrite the
+  chunks holding a deleted user's records (purge_archived_subject).
+- notifications older than NOTIFICATION_RETENTION_DAYS are deleted by the job
+  rather than a TTL index, so the unread counters of affected users can be
+  reset (they re-seed on the next read).
+
+Cold records are selected by _id, whose ObjectId timestamp is the insertion
+time, so the job only needs the default _id index. A chunk is written (replacing
+any chunk with the same day and first_id) before its originals are deleted, and
+records already held by a stored chunk are only deleted, so an interrupted run
+can be repeated without losing or duplicating records. One worker runs the job
+at a time (lease on retention_state).
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import socket
+from collections import Counter, defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from bson import Binary, ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+RETENTION_INTERVAL = float(os.environ.get('RETENTION_INTERVAL', 3600))
+ADMIN_LOG_HOT_DAYS = int(os.environ.get('ADMIN_LOG_HOT_DAYS', 90))
+EMAIL_LOG_HOT_DAYS = int(os.environ.get('EMAIL_LOG_HOT_DAYS', 30))
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', 730))
+ARCHIVE_CHUNK_SIZE = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 2000))
+OAUTH_STATE_TTL = int(os.environ.get('OAUTH_STATE_TTL', 3600))
+RETENTION_LEASE_SECONDS = 1800
+
+class ArchivePolicy(NamedTuple):
+    """A log collection whose cold records are moved to `<collection>_archive`
+
+    `stats_field` names a field whose values are counted per chunk (e.g. email
+    status), so totals over the whole history need not decompress anything.
+    `subject_field` names the field identifying who a record is about (e.g. the
+    email recipient); its values are listed per chunk in `subjects`.
+    """
+    collection: str
+    hot_days: int
+    stats_field: Optional[str] = None
+    subject_field: Optional[str] = None
+
+ARCHIVE_POLICIES: List[ArchivePolicy] = [
+    ArchivePolicy("admin_logs", ADMIN_LOG_HOT_DAYS),
+    ArchivePolicy("email_logs", EMAIL_LOG_HOT_DAYS, stats_field="status", subject_field="recipient"),
+]
+
+def archive_collection_name(collection: str) -> str:
+    return f"{collection}_archive"
+
+def expire_after(seconds: int) -> datetime:
+    """`expire_at` value for documents removed by a TTL index"""
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+def _cutoff_id(days: int) -> ObjectId:
+    return ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(days=days))
+
+def _encode_chunk(records: List[dict]) -> bytes:
+    lines = "\n".join(json.dumps(record, default=str, separators=(",", ":")) for record in records)
+    return gzip.compress(lines.encode("utf-8"))
+
+def _decode_chunk(data: bytes) -> List[dict]:
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+
+def _subjects(policy: ArchivePolicy, records: List[dict]) -> List[str]:
+    return sorted({str(r[policy.subject_field]) for r in records if r.get(policy.subject_field)})
+
+async def _chunk_body(policy: ArchivePolicy, records: List[dict]) -> dict:
+    """The fields of a chunk derived from its records"""
+    body = {"count": len(records), "data": Binary(await asyncio.to_thread(_encode_chunk, records))}
+    if policy.stats_field:
+        body["stats"] = dict(Counter(str(r.get(policy.stats_field)) for r in records))
+    if policy.subject_field:
+        body["subjects"] = _subjects(policy, records)
+    return body
+
+# ==================== JOB STEPS ====================
+
+async def backfill_expiry():
+    """Give TTL-managed documents written before `expire_at` existed an expiry date"""
+    db = get_database()
+    await db.user_sessions.update_many(
+        {"expire_at": {"$exists": False}, "expires_at": {"$type": "string"}},
+        [{"$set": {"expire_at": {"$dateFromString": {"dateString": "$expires_at", "onError": "$$NOW"}}}}]
+    )
+    await db.oauth_states.update_many(
+        {"expire_at": {"$exists": False}},
+        [{"$set": {"expire_at": {"$add": [
+            {"$dateFromString": {"dateString": "$created_at", "onError": "$$NOW", "onNull": "$$NOW"}},
+            OAUTH_STATE_TTL * 1000
+        ]}}}]
+    )
+
+async def archive_cold_records(policy: ArchivePolicy) -> int:
+    """Move records older than the policy's hot window into the archive collection"""
+    db = get_database()
+    source = db[policy.collection]
+    archive = db[archive_collection_name(policy.collection)]
+    cutoff = _cutoff_id(policy.hot_days)
+    moved = 0
+    while True:
+        batch = await source.find({"_id": {"$lt": cutoff}}).sort("_id", 1).limit(ARCHIVE_CHUNK_SIZE).to_list(ARCHIVE_CHUNK_SIZE)
+        if not batch:
+            return moved
+
+        by_day: Dict[str, List[dict]] = defaultdict(list)
+        for record in batch:
+            by_day[record["_id"].generation_time.strftime("%Y-%m-%d")].append(record)
+
+        for day, records in by_day.items():
+            ids = [record["_id"] for record in records]
+            # An interrupted run may have stored some of these and deleted others
+            covering = await archive.find_one(
+                {"day": day, "first_id": {"$lt": str(ids[0])}, "last_id": {"$gte": str(ids[0])}},
+                {"_id": 0, "last_id": 1}
+            )
+            if covering:
+                stored = [i for i in ids if str(i) <= covering["last_id"]]
+                await source.delete_many({"_id": {"$in": stored}})
+                moved += len(stored)
+                ids, records = ids[len(stored):], records[len(stored):]
+                if not records:
+                    continue
+
+            for record in records:
+                record.pop("_id")
+            chunk = {
+                "day": day,
+                "first_id": str(ids[0]),
+                "last_id": str(ids[-1]),
+                **await _chunk_body(policy, records),
+                "archived_at": datetime.now(timezone.utc).isoformat()
+            }
+            # A retry can hold more records than the chunk it replaces
+            await archive.replace_one({"day": day, "first_id": chunk["first_id"]}, chunk, upsert=True)
+            await source.delete_many({"_id": {"$in": ids}})
+            moved += len(ids)
+        await asyncio.sleep(0)
+
+async def drop_expired_archives(policy: ArchivePolicy):
+    db = get_database()
+    oldest_day = (datetime.now(timezone.utc) - timedelta(days=ARCHIVE_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    await db[archive_collection_name(policy.collection)].delete_many({"day": {"$lt": oldest_day}})
+
+async def purge_archived_subject(collection: str, value: str) -> int:
+    """Remove every archived record about one subject (user deletion); returns how many"""
+    policy = next((p for p in ARCHIVE_POLICIES if p.collection == collection), None)
+    if not policy or not policy.subject_field:
+        return 0
+    db = get_database()
+    archive = db[archive_collection_name(collection)]
+    removed = 0
+    # Chunks archived before subjects were listed are checked (and listed) too
+    cursor = archive.find(
+        {"$or": [{"subjects": value}, {"subjects": {"$exists": False}}]},
+        {"_id": 1, "data": 1, "subjects": 1}
+    )
+    async for chunk in cursor:
+        records = await asyncio.to_thread(_decode_chunk, chunk["data"])
+        kept = [r for r in records if r.get(policy.subject_field) != value]
+        if len(kept) == len(records):
+            if "subjects" not in chunk:
+                await archive.update_one({"_id": chunk["_id"]}, {"$set": {"subjects": _subjects(policy, records)}})
+            continue
+        if kept:
+            await archive.update_one({"_id": chunk["_id"]}, {"$set": await _chunk_body(policy, kept)})
+        else:
+            await archive.delete_one({"_id": chunk["_id"]})
+        removed += len(records) - len(kept)
+    return removed
+
+async def purge_old_notifications() -> int:
+    """Delete old notifications, resetting unread counters they contributed to"""
+    from services.notifications import COUNTERS_COLLECTION
+
+    db = get_database()
+    query = {"_id": {"$lt": _cutoff_id(NOTIFICATION_RETENTION_DAYS)}}
+    user_ids = await db.notifications.distinct("user_id", {**query, "read": False})
+    result = await db.notifications.delete_many(query)
+    if user_ids:
+        await db[COUNTERS_COLLECTION].delete_many({"user_id": {"$in": user_ids}})
+    return result.deleted_count
+
+# ==================== READS ====================
+
+async def read_archive(collection: str, day: str, filters: Optional[dict] = None) -> List[dict]:
+    """Archived records of one day (newest first), filtered by field equality"""
+    db = get_database()
+    chunks = await db[archive_collection_name(collection)].find(
+        {"day": day}, {"_id": 0, "data": 1}
+    ).sort("first_id", -1).to_list(None)
+    records = []
+    for chunk in chunks:
+        decoded = await asyncio.to_thread(_decode_chunk, chunk["data"])
+        records.extend(reversed(decoded))
+    if filters:
+        records = [r for r in records if all(r.get(k) == v for k, v in filters.items())]
+    return records
+
+async def list_archive_days(collection: str, limit: int = 100) -> List[dict]:
+    """Archived days with their record counts, newest first"""
+    db = get_database()
+    return await db[archive_collection_name(collection)].aggregate([
+        {"$group": {"_id": "$day", "count": {"$sum": "$count"}}},
+        {"$sort": {"_id": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "day": "$_id", "count": 1}}
+    ]).to_list(limit)
+
+async def archived_stats(collection: str) -> Dict[str, int]:
+    """Totals of the policy's stats_field over all archived records"""
+    db = get_database()
+    totals: Dict[str, int] = defaultdict(int)
+    async for chunk in db[archive_collection_name(collection)].find({}, {"_id": 0, "stats": 1}):
+        for key, value in (chunk.get("stats") or {}).items():
+            totals[key] += value
+    return dict(totals)
+
+# ==================== WORKER ====================
+
+class RetentionWorker:
+    """Runs the retention job every RETENTION_INTERVAL on one worker at a time"""
+
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def _claim(self) -> bool:
+        db = get_database()
+        now = datetime.now(timezone.utc)
+        try:
+            await db.retention_state.find_one_and_update(
+                {"_id": "retention", "lease_until": {"$lt": now.isoformat()}},
+                {"$set": {
+                    "worker": self.origin,
+                    "lease_until": (now + timedelta(seconds=RETENTION_LEASE_SECONDS)).isoformat()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # another worker holds the lease
+        return True
+
+    async def _release(self):
+        db = get_database()
+        await db.retention_state.update_one(
+            {"_id": "retention", "worker": self.origin},
+            {"$set": {"lease_until": datetime.now(timezone.utc).isoformat(), "last_run_at": datetime.now(timezone.utc).isoformat()}}
+        )
+
+    async def run_once(self):
+        if not await self._claim():
+            return
+        try:
+            await backfill_expiry()
+            for policy in ARCHIVE_POLICIES:
+                moved = await archive_cold_records(policy)
+                await drop_expired_archives(policy)
+                if moved:
+                    logger.info(f"Archived {moved} {policy.collection} records")
+            purged = await purge_old_notifications()
+            if purged:
+                logger.info(f"Deleted {purged} notifications past retention")
+        finally:
+            await self._release()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Retention job failed: {e}")
+            await asyncio.sleep(RETENTION_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+retention_worker = RetentionWorker()
+
+def get_retention_worker() -> RetentionWorker:
+    return retention_worker
@@ -0,0 +1,236 @@
+"""
+Revenue Analytics Engine - MRR/ARR/ARPU/churn computed in the database
+
+Revenue stats are three concurrent aggregations over subscriptions, each
+opening with a $match its index serves: active subscriptions (status) are
+joined against db.plans for their real price (normalized to a monthly amount
+for yearly plans) and grouped by plan, churn is counted per plan over the
+trailing window (status, cancelled_at), and subscriptions since the first
+cohort month (created_at) are bucketed into monthly signup cohorts. A $facet
+would run every branch over a full collection scan, since only the stages
+before it can use an index. Results are cached for REVENUE_CACHE_TTL seconds.
+
+Every REVENUE_SNAPSHOT_INTERVAL one worker (lease on revenue_state) recomputes
+the stats and upserts the day's snapshot into revenue_snapshots for trend
+charts, so days without admin traffic still get a snapshot.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+REVENUE_CACHE_TTL = int(os.environ.get('REVENUE_CACHE_TTL', 60))
+REVENUE_SNAPSHOT_INTERVAL = float(os.environ.get('REVENUE_SNAPSHOT_INTERVAL', 3600))
+CHURN_WINDOW_DAYS = 30
+COHORT_MONTHS = 12
+SNAPSHOTS_COLLECTION = "revenue_snapshots"
+
+# Used only for subscriptions whose plan is missing from db.plans
+FALLBACK_PLAN_PRICES = {
+    "starter": 19,
+    "pro": 49,
+    "agency": 149,
+    "enterprise": 299
+}
+DEFAULT_PLAN_ID = "starter"
+YEARLY_CYCLES = ["yearly", "annual", "annually"]
+
+def _fallback_price() -> dict:
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$plan_key", plan_id]}, "then": price}
+            for plan_id, price in FALLBACK_PLAN_PRICES.items()
+        ],
+        "default": 0
+    }}
+
+def cohort_start_month(now: datetime, months: int = COHORT_MONTHS) -> str:
+    """First month ("YYYY-MM") of the `months` signup cohorts ending with now's month"""
+    year, month = divmod(now.year * 12 + now.month - 1 - (months - 1), 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+def _mrr_by_plan_stages() -> list:
+    """Active subscriptions -> [{_id: plan_id, subscribers, mrr}]"""
+    return [
+        {"$match": {"status": "active"}},
+        {"$set": {"plan_key": {"$ifNull": ["$plan_id", DEFAULT_PLAN_ID]}}},
+        {"$lookup": {
+            "from": "plans",
+            "localField": "plan_key",
+            "foreignField": "plan_id",
+            "as": "plan"
+        }},
+        {"$set": {"plan": {"$arrayElemAt": ["$plan", 0]}}},
+        {"$set": {"price": {"$ifNull": ["$plan.price", _fallback_price()]}}},
+        {"$set": {"monthly_price": {"$cond": [
+            {"$in": ["$plan.billing_cycle", YEARLY_CYCLES]},
+            {"$divide": ["$price", 12]},
+            "$price"
+        ]}}},
+        {"$group": {"_id": "$plan_key", "subscribers": {"$sum": 1}, "mrr": {"$sum": "$monthly_price"}}}
+    ]
+
+class RevenueEngine:
+    """Computes, caches and snapshots revenue metrics"""
+
+    def __init__(self, ttl: int = REVENUE_CACHE_TTL, interval: float = REVENUE_SNAPSHOT_INTERVAL):
+        self.ttl = ttl
+        self.interval = interval
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._stats: Optional[dict] = None
+        self._computed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def invalidate(self):
+        """Drop cached stats (call after subscription or plan changes)"""
+        self._stats = None
+
+    async def get_stats(self) -> dict:
+        if self._stats is not None and time.monotonic() - self._computed_at < self.ttl:
+            return self._stats
+        async with self._lock:
+            if self._stats is None or time.monotonic() - self._computed_at >= self.ttl:
+                self._stats = await self._compute()
+                self._computed_at = time.monotonic()
+        return self._stats
+
+    async def _compute(self) -> dict:
+        db = get_database()
+        now = datetime.now(timezone.utc)
+        churn_start = (now - timedelta(days=CHURN_WINDOW_DAYS)).isoformat()
+        cohort_start = cohort_start_month(now)
+
+        active_by_plan, churned_rows, cohort_rows, transactions = await asyncio.gather(
+            db.subscriptions.aggregate(_mrr_by_plan_stages()).to_list(None),
+            db.subscriptions.aggregate([
+                {"$match": {"status": "cancelled", "cancelled_at": {"$gte": churn_start}}},
+                {"$group": {"_id": {"$ifNull": ["$plan_id", DEFAULT_PLAN_ID]}, "count": {"$sum": 1}}}
+            ]).to_list(None),
+            db.subscriptions.aggregate([
+                # ISO dates compare as strings, so "YYYY-MM" selects from the cohort month on
+                {"$match": {"created_at": {"$gte": cohort_start}}},
+                {"$group": {
+                    "_id": {"$substrCP": ["$created_at", 0, 7]},
+                    "started": {"$sum": 1},
+                    "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+                    "cancelled": {"$sum": {"$cond": [{"$eq": ["$status", "cancelled"]}, 1, 0]}}
+                }},
+                {"$sort": {"_id": 1}}
+            ]).to_list(None),
+            db.payment_transactions.aggregate([
+                {"$match": {"status": "completed"}},
+                {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
+            ]).to_list(1)
+        )
+
+        revenue_by_plan = {row["_id"]: round(row["mrr"], 2) for row in active_by_plan}
+        subscribers_by_plan = {row["_id"]: row["subscribers"] for row in active_by_plan}
+        churned_by_plan = {row["_id"]: row["count"] for row in churned_rows}
+
+        mrr = sum(revenue_by_plan.values())
+        active = sum(subscribers_by_plan.values())
+        churned = sum(churned_by_plan.values())
+        # Subscribers at the start of the window = still active + those who left during it
+        period_start_subscribers = active + churned
+
+        return {
+            "mrr": round(mrr, 2),
+            "arr": round(mrr * 12, 2),
+            "arpu": round(mrr / active, 2) if active else 0,
+            "churn_rate": round(churned / period_start_subscribers * 100, 2) if period_start_subscribers else 0,
+            "total_revenue": transactions[0]["total"] if transactions else 0,
+            "revenue_by_plan": revenue_by_plan,
+            "subscribers_by_plan": subscribers_by_plan,
+            "churn_by_plan": {
+                plan_id: round(count / (subscribers_by_plan.get(plan_id, 0) + count) * 100, 2)
+                for plan_id, count in churned_by_plan.items()
+            },
+            "cohorts": [
+                {
+                    "month": row["_id"],
+                    "started": row["started"],
+                    "active": row["active"],
+                    "cancelled": row["cancelled"],
+                    "retention": round(row["active"] / row["started"] * 100, 2) if row["started"] else 0
+                }
+                for row in cohort_rows
+            ],
+            "active_subscriptions": active,
+            "computed_at": now.isoformat()
+        }
+
+    async def _claim(self) -> bool:
+        db = get_database()
+        now = datetime.now(timezone.utc)
+        try:
+            await db.revenue_state.find_one_and_update(
+                {"_id": "snapshot", "next_run_at": {"$lt": now.isoformat()}},
+                {"$set": {
+                    "worker": self.origin,
+                    "next_run_at": (now + timedelta(seconds=self.interval)).isoformat()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # snapshotted recently or by another worker
+        return True
+
+    async def snapshot(self):
+        """Recompute the stats and upsert today's snapshot"""
+        stats = await self._compute()
+        self._stats, self._computed_at = stats, time.monotonic()
+        day = stats["computed_at"][:10]
+        db = get_database()
+        snapshot = {k: stats[k] for k in ("mrr", "arr", "arpu", "churn_rate", "active_subscriptions", "revenue_by_plan")}
+        await db[SNAPSHOTS_COLLECTION].update_one(
+            {"date": day},
+            {"$set": {**snapshot, "date": day, "updated_at": stats["computed_at"]}},
+            upsert=True
+        )
+
+    async def get_trends(self, days: int = 90) -> list:
+        """Daily snapshots for the last `days` days, oldest first"""
+        db = get_database()
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+        return await db[SNAPSHOTS_COLLECTION].find(
+            {"date": {"$gte": since}}, {"_id": 0}
+        ).sort("date", 1).to_list(days + 1)
+
+    async def _loop(self):
+        while True:
+            try:
+                if await self._claim():
+                    await self.snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Revenue snapshot failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+revenue_engine = RevenueEngine()
+
+def get_revenue_engine() -> RevenueEngine:
+    return revenue_engine
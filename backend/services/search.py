@@ -0,0 +1,130 @@
+"""
+Admin Search Index - Prefix (edge n-gram) terms stored on the searched documents
+
+Admin search boxes used unanchored case-insensitive $regex, which scans the
+whole collection. Searchable documents now carry a `search_terms` array
+(multikey-indexed) holding normalized lowercase prefixes of every word and of
+each whole field value, plus "=word" markers for exact words. A search is an
+index lookup on `search_terms` with $all over the query tokens, and results
+are ranked by how many query tokens match a whole word.
+
+Terms are written by the routers that create or edit searchable documents
+(with_search_terms / refresh_search_terms); documents written before this
+existed are backfilled on startup.
+"""
+import asyncio
+import logging
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+# collection -> fields that feed its search terms
+SEARCH_FIELDS: Dict[str, List[str]] = {
+    "users": ["email", "name"],
+    "support_tickets": ["subject", "user_email", "ticket_id"],
+    "instagram_accounts": ["username", "niche"],
+}
+
+SEARCH_TERMS_FIELD = "search_terms"
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+BACKFILL_BATCH = 500
+
+_WORD_SPLIT = re.compile(r"[\W_]+", re.UNICODE)
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+def _prefixes(word: str) -> Iterable[str]:
+    for size in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+        yield word[:size]
+
+def build_search_terms(doc: dict, fields: List[str]) -> List[str]:
+    """Prefix terms for the given fields of a document"""
+    terms = set()
+    for field in fields:
+        value = doc.get(field)
+        if not value:
+            continue
+        whole = normalize(value)
+        terms.update(_prefixes(whole))
+        terms.add(f"={whole}")
+        for word in _WORD_SPLIT.split(whole):
+            if word:
+                terms.update(_prefixes(word))
+                terms.add(f"={word}")
+    return sorted(terms)
+
+def with_search_terms(collection: str, doc: dict) -> dict:
+    """Attach search terms to a document before it is inserted"""
+    doc[SEARCH_TERMS_FIELD] = build_search_terms(doc, SEARCH_FIELDS[collection])
+    return doc
+
+async def refresh_search_terms(collection: str, query: dict, doc: Optional[dict] = None):
+    """Recompute search terms after the searchable fields of a document changed"""
+    db = get_database()
+    fields = SEARCH_FIELDS[collection]
+    if doc is None:
+        doc = await db[collection].find_one(query, {"_id": 0, **{f: 1 for f in fields}})
+        if not doc:
+            return
+    await db[collection].update_one(query, {"$set": {SEARCH_TERMS_FIELD: build_search_terms(doc, fields)}})
+
+def _words(text: str) -> List[str]:
+    """Query words, split the same way as indexed words"""
+    return [word for word in _WORD_SPLIT.split(normalize(text)) if word]
+
+def _query_tokens(text: str) -> List[str]:
+    return [word[:MAX_PREFIX] for word in _words(text) if len(word) >= MIN_PREFIX]
+
+def search_filter(text: str) -> dict:
+    """Filter matching documents whose terms cover every query token"""
+    tokens = _query_tokens(text)
+    if not tokens:
+        # Single-character searches only match whole one-letter words
+        return {SEARCH_TERMS_FIELD: f"={normalize(text)}"} if text.strip() else {}
+    return {SEARCH_TERMS_FIELD: {"$all": tokens}}
+
+def rank_stages(text: str) -> List[dict]:
+    """Stages that set `search_score` (number of query tokens matching a whole word)"""
+    exact = [f"={word}" for word in _words(text)]
+    return [{"$set": {"search_score": {"$size": {"$setIntersection": [
+        {"$ifNull": [f"${SEARCH_TERMS_FIELD}", []]}, exact
+    ]}}}}]
+
+async def _backfill_collection(collection: str):
+    from pymongo import UpdateOne
+
+    db = get_database()
+    fields = SEARCH_FIELDS[collection]
+    projection = {"_id": 1, **{f: 1 for f in fields}}
+    updated = 0
+    while True:
+        docs = await db[collection].find(
+            {SEARCH_TERMS_FIELD: {"$exists": False}}, projection
+        ).limit(BACKFILL_BATCH).to_list(BACKFILL_BATCH)
+        if not docs:
+            break
+        await db[collection].bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {SEARCH_TERMS_FIELD: build_search_terms(doc, fields)}})
+            for doc in docs
+        ], ordered=False)
+        updated += len(docs)
+    if updated:
+        logger.info(f"Backfilled search terms for {updated} {collection} documents")
+
+async def backfill_search_terms():
+    """Index documents that predate the search terms field"""
+    for collection in SEARCH_FIELDS:
+        try:
+            await _backfill_collection(collection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Search terms backfill failed for {collection}: {e}")
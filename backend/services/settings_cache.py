@@ -0,0 +1,94 @@
+"""
+System Settings Cache - In-process snapshot of the global system_settings document
+
+Hot paths (email sending, Meta OAuth) read settings from an immutable snapshot
+instead of querying Mongo on every call. A background poll fetches only the
+`version` field of the settings document and reloads the full document when it
+changes; update_system_settings bumps the version so every worker picks up the
+change within SETTINGS_POLL_INTERVAL seconds. A versioned poll is used rather
+than a change stream because change streams require a replica set.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from database import get_database
+from models.admin_models import SystemSettings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SETTING_ID = "global"
+SETTINGS_POLL_INTERVAL = float(os.environ.get('SETTINGS_POLL_INTERVAL', 5))
+
+class SettingsCache:
+    """Holds the current SystemSettings snapshot and keeps it fresh"""
+
+    def __init__(self, poll_interval: float = SETTINGS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._snapshot: Optional[SystemSettings] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> SystemSettings:
+        """Return the current snapshot, loading it on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.refresh(force=True)
+        # Without a running poller (scripts, one-off workers) check the version lazily
+        if self._task is None and time.monotonic() - self._checked_at > self.poll_interval:
+            return await self.refresh()
+        return snapshot
+
+    async def refresh(self, force: bool = False) -> SystemSettings:
+        """Reload the snapshot if the stored version differs (or unconditionally when forced)"""
+        async with self._lock:
+            db = get_database()
+            if not force and self._snapshot is not None:
+                head = await db.system_settings.find_one(
+                    {"setting_id": GLOBAL_SETTING_ID}, {"_id": 0, "version": 1}
+                )
+                if (head or {}).get("version", 0) == self._snapshot.version:
+                    self._checked_at = time.monotonic()
+                    return self._snapshot
+
+            doc = await db.system_settings.find_one({"setting_id": GLOBAL_SETTING_ID}, {"_id": 0})
+            self._snapshot = SystemSettings(**(doc or {}))
+            self._checked_at = time.monotonic()
+            logger.info(f"System settings snapshot loaded (version {self._snapshot.version})")
+            return self._snapshot
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"System settings refresh failed: {e}")
+
+    def start(self):
+        """Start the background version poll (call from app startup)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+settings_cache = SettingsCache()
+
+async def get_system_settings() -> SystemSettings:
+    """Typed accessor for the current system settings snapshot"""
+    return await settings_cache.get()
+
+def get_settings_cache() -> SettingsCache:
+    return settings_cache
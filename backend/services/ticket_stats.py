@@ -0,0 +1,125 @@
+"""
+Ticket Statistics - One-pass support ticket breakdowns kept current in memory
+
+The status, priority and category breakdowns are computed in a single $facet
+aggregation, held in memory and adjusted incrementally by the ticket routers
+whenever a ticket is created, deleted, or changes status or priority. The
+snapshot is recomputed after TICKET_STATS_TTL seconds, which also absorbs
+changes made by other workers.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+TICKET_STATS_TTL = int(os.environ.get('TICKET_STATS_TTL', 60))
+TICKET_STATUSES = ("open", "pending", "closed")
+
+# Fields a ticket contributes to the stats through
+STATS_FIELDS = {"_id": 0, "status": 1, "priority": 1, "category": 1}
+
+def _contribution(ticket: Optional[dict]) -> Dict[str, int]:
+    """Flat counter contributions of one ticket"""
+    if not ticket:
+        return {}
+    status = ticket.get("status")
+    contribution = {"total": 1}
+    if status in TICKET_STATUSES:
+        contribution[status] = 1
+    if status != "closed":
+        if ticket.get("priority") == "urgent":
+            contribution["urgent"] = 1
+        elif ticket.get("priority") == "high":
+            contribution["high_priority"] = 1
+        contribution[f"category:{ticket.get('category')}"] = 1
+    return contribution
+
+class TicketStats:
+    """Cached ticket breakdowns backing the admin ticket list and stats endpoints"""
+
+    def __init__(self, ttl: int = TICKET_STATS_TTL):
+        self.ttl = ttl
+        self._counts: Optional[Dict[str, int]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _load(self):
+        db = get_database()
+        result = await db.support_tickets.aggregate([
+            {"$facet": {
+                "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "by_priority": [
+                    {"$match": {"status": {"$ne": "closed"}, "priority": {"$in": ["urgent", "high"]}}},
+                    {"$group": {"_id": "$priority", "count": {"$sum": 1}}}
+                ],
+                "by_category": [
+                    {"$match": {"status": {"$ne": "closed"}}},
+                    {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+                ]
+            }}
+        ]).to_list(1)
+        facet = result[0] if result else {"by_status": [], "by_priority": [], "by_category": []}
+
+        counts: Dict[str, int] = defaultdict(int)
+        for row in facet["by_status"]:
+            counts["total"] += row["count"]
+            if row["_id"] in TICKET_STATUSES:
+                counts[row["_id"]] = row["count"]
+        for row in facet["by_priority"]:
+            counts["urgent" if row["_id"] == "urgent" else "high_priority"] = row["count"]
+        for row in facet["by_category"]:
+            counts[f"category:{row['_id']}"] = row["count"]
+
+        self._counts = counts
+        self._loaded_at = time.monotonic()
+
+    async def _current(self) -> Dict[str, int]:
+        if self._counts is None or time.monotonic() - self._loaded_at > self.ttl:
+            async with self._lock:
+                if self._counts is None or time.monotonic() - self._loaded_at > self.ttl:
+                    await self._load()
+        return self._counts
+
+    async def get_stats(self) -> dict:
+        counts = await self._current()
+        return {
+            "total": counts.get("total", 0),
+            "open": counts.get("open", 0),
+            "pending": counts.get("pending", 0),
+            "closed": counts.get("closed", 0),
+            "urgent": counts.get("urgent", 0),
+            "high_priority": counts.get("high_priority", 0),
+            "by_category": {
+                key.split(":", 1)[1]: value
+                for key, value in counts.items()
+                if key.startswith("category:") and value > 0
+            }
+        }
+
+    async def get_status_counts(self) -> dict:
+        counts = await self._current()
+        return {status: counts.get(status, 0) for status in TICKET_STATUSES}
+
+    def record_change(self, before: Optional[dict], after: Optional[dict]):
+        """Apply a ticket change (None before = created, None after = deleted)"""
+        if self._counts is None:
+            return
+        try:
+            for key, amount in _contribution(before).items():
+                self._counts[key] = max(0, self._counts.get(key, 0) - amount)
+            for key, amount in _contribution(after).items():
+                self._counts[key] = self._counts.get(key, 0) + amount
+        except Exception as e:
+            logger.error(f"Failed to apply ticket stats change: {e}")
+            self._counts = None
+
+ticket_stats = TicketStats()
+
+def get_ticket_stats() -> TicketStats:
+    return ticket_stats
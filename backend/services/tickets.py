@@ -0,0 +1,140 @@
+"""
+Support Ticket Storage - Compact ticket headers plus a ticket_messages collection
+
+support_tickets documents hold only the ticket header: subject, status,
+priority, assignment, a last_message preview and message_count. Messages live
+in ticket_messages (one document per message) and are paged newest-first by
+keyset cursor, so list endpoints return fixed-size headers however long a
+conversation grows.
+
+Tickets created before the split still embed a `messages` array; they are
+moved out on startup by migrate_embedded_messages.
+"""
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from database import get_database
+from services.pagination import keyset_page
+from services.ticket_stats import STATS_FIELDS, get_ticket_stats
+
+logger = logging.getLogger(__name__)
+
+TICKET_MESSAGES_COLLECTION = "ticket_messages"
+MESSAGE_PREVIEW_CHARS = 140
+MESSAGES_PAGE_SIZE = 50
+
+# Projection for ticket list views and header reads
+HEADER_PROJECTION = {"_id": 0, "messages": 0, "search_terms": 0}
+
+def build_message(sender_type: str, sender_id: str, sender_name: str, message: str, attachments: Optional[List] = None) -> dict:
+    return {
+        "message_id": f"MSG-{uuid.uuid4().hex[:8]}",
+        "sender_type": sender_type,
+        "sender_id": sender_id,
+        "sender_name": sender_name,
+        "message": message,
+        "attachments": attachments or [],
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+def message_preview(message: dict) -> dict:
+    return {
+        "message_id": message["message_id"],
+        "sender_type": message["sender_type"],
+        "sender_name": message.get("sender_name"),
+        "preview": message.get("message", "")[:MESSAGE_PREVIEW_CHARS],
+        "created_at": message["created_at"]
+    }
+
+async def add_message(ticket_id: str, message: dict, set_fields: Optional[dict] = None) -> Optional[dict]:
+    """Store a message and update the ticket header (preview, count, updated_at)"""
+    from pymongo import ReturnDocument
+
+    db = get_database()
+    set_fields = set_fields or {}
+    await db[TICKET_MESSAGES_COLLECTION].insert_one({**message, "ticket_id": ticket_id})
+    before = await db.support_tickets.find_one_and_update(
+        {"ticket_id": ticket_id},
+        {
+            "$set": {
+                **set_fields,
+                "last_message": message_preview(message),
+                "updated_at": message["created_at"]
+            },
+            "$inc": {"message_count": 1}
+        },
+        projection=STATS_FIELDS,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before and ("status" in set_fields or "priority" in set_fields):
+        get_ticket_stats().record_change(before, {**before, **set_fields})
+    return before
+
+async def get_messages(ticket_id: str, cursor: Optional[str] = None, limit: int = MESSAGES_PAGE_SIZE) -> dict:
+    """One page of a ticket's messages, newest page first, oldest-first within the page"""
+    db = get_database()
+    page = await keyset_page(
+        db[TICKET_MESSAGES_COLLECTION], {"ticket_id": ticket_id},
+        "created_at", "message_id", -1, limit, cursor,
+        projection={"_id": 0, "ticket_id": 0}, count="none"
+    )
+    return {
+        "messages": list(reversed(page["items"])),
+        "messages_cursor": page["next_cursor"],
+        "has_more_messages": page["has_more"]
+    }
+
+async def get_ticket_with_messages(query: dict) -> Optional[dict]:
+    """Ticket header plus its most recent page of messages"""
+    db = get_database()
+    ticket = await db.support_tickets.find_one(query, HEADER_PROJECTION)
+    if not ticket:
+        return None
+    ticket.update(await get_messages(ticket["ticket_id"]))
+    return ticket
+
+async def delete_ticket_messages(ticket_ids: List[str]):
+    db = get_database()
+    await db[TICKET_MESSAGES_COLLECTION].delete_many({"ticket_id": {"$in": ticket_ids}})
+
+async def migrate_embedded_messages():
+    """Move embedded `messages` arrays out of legacy ticket documents"""
+    from pymongo import UpdateOne
+
+    db = get_database()
+    migrated = 0
+    try:
+        async for ticket in db.support_tickets.find({"messages": {"$exists": True}}, {"_id": 1, "ticket_id": 1, "messages": 1}):
+            messages = ticket.get("messages") or []
+            if messages:
+                # Upsert so a migration interrupted half-way can safely re-run
+                await db[TICKET_MESSAGES_COLLECTION].bulk_write([
+                    UpdateOne(
+                        {"ticket_id": ticket["ticket_id"], "message_id": m.get("message_id"), "created_at": m.get("created_at")},
+                        {"$setOnInsert": {**m, "ticket_id": ticket["ticket_id"]}},
+                        upsert=True
+                    )
+                    for m in messages
+                ], ordered=False)
+            # Replies posted meanwhile already went to ticket_messages and $inc'd
+            # message_count, so add to the count and keep a newer preview
+            header = {"message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, len(messages)]}}
+            if messages:
+                preview = message_preview(messages[-1])
+                header["last_message"] = {"$cond": [
+                    {"$gt": ["$last_message.created_at", preview["created_at"]]},
+                    "$last_message",
+                    {"$literal": preview}
+                ]}
+            await db.support_tickets.update_one(
+                {"_id": ticket["_id"], "messages": {"$exists": True}},
+                [{"$set": header}, {"$unset": "messages"}]
+            )
+            migrated += 1
+    except Exception as e:
+        logger.error(f"Ticket message migration stopped after {migrated} tickets: {e}")
+        return
+    if migrated:
+        logger.info(f"Moved embedded messages of {migrated} tickets to {TICKET_MESSAGES_COLLECTION}")
@@ -0,0 +1,155 @@
+"""
+List Response Benchmark
+
+Compares the previous list path (a model per document, response_model
+re-validation, stdlib json) with the current one on 100-item lists: growth
+plans are read with the response projection and served as trusted documents
+with orjson; accounts (several writers, so still validated) only gain the
+projection and orjson. Runs in-process against the real
+models, no database needed, and fails if a fast path serves different data
+or is not faster and smaller than the path it replaces:
+
+    cd backend && python tests/bench_list_responses.py
+
+"trusted" is the full growth plan without re-validation, isolating the
+serialization gain from the smaller summary schema.
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.testclient import TestClient
+
+from models import GrowthPlan, GrowthPlanSummary, InstagramAccount, list_projection, response_projection
+
+ITEMS = 100
+REQUESTS = 200
+
+def growth_plan_doc(i: int) -> dict:
+    return {
+        "plan_id": f"plan_{uuid.uuid4().hex[:12]}",
+        "account_id": "acc_bench",
+        "user_id": "user_bench",
+        "duration": 30,
+        "daily_tasks": [
+            {
+                "day": day,
+                "title": f"Day {day}: Engage Focus",
+                "description": "Reply to every comment within the first hour and engage with 20 accounts in your niche",
+                "type": "engage",
+                "priority": "high"
+            }
+            for day in range(1, 31)
+        ],
+        "based_on_real_data": True,
+        "metrics_at_creation": {"followers": 12000, "engagement_rate": 3.4, "content_mix": {"IMAGE": 10, "VIDEO": 8}},
+        "created_at": (datetime.now(timezone.utc) - timedelta(days=i)).isoformat()
+    }
+
+def account_doc(i: int) -> dict:
+    return {
+        "account_id": f"acc_{uuid.uuid4().hex[:12]}",
+        "user_id": "user_bench",
+        "username": f"bench_account_{i}",
+        "niche": "Fitness",
+        "access_token": "x" * 200,
+        "follower_count": 10000 + i,
+        "engagement_rate": 3.2,
+        "estimated_reach": 4000,
+        "posting_frequency": "3.5 posts per week",
+        "best_posting_time": "Friday 2:00 PM UTC",
+        "data_source": "niche_benchmark",
+        "status": "active",
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+def _project(docs: List[dict], projection: dict) -> List[dict]:
+    """What Mongo returns for the projection"""
+    return [{k: v for k, v in doc.items() if k in projection} for doc in docs]
+
+def build_app() -> FastAPI:
+    plans = [growth_plan_doc(i) for i in range(ITEMS)]
+    plan_rows = [
+        {**row, "task_count": len(doc["daily_tasks"])}
+        for row, doc in zip(_project(plans, response_projection(GrowthPlanSummary, exclude=("task_count",))), plans)
+    ]
+    accounts = [account_doc(i) for i in range(ITEMS)]
+    account_rows = _project(accounts, list_projection(InstagramAccount, exclude=("access_token", "token_expires_at")))
+
+    app = FastAPI(default_response_class=JSONResponse)
+    fast = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/before/growth-plans", response_model=List[GrowthPlan])
+    async def plans_before():
+        return [GrowthPlan(**p) for p in plans]
+
+    @app.get("/trusted/growth-plans", response_model=List[GrowthPlan])
+    async def plans_trusted():
+        return ORJSONResponse(plans)
+
+    @app.get("/after/growth-plans", response_model=List[GrowthPlanSummary])
+    async def plans_after():
+        return ORJSONResponse(plan_rows)
+
+    @app.get("/before/accounts", response_model=List[InstagramAccount])
+    async def accounts_before():
+        return [InstagramAccount(**a) for a in accounts]
+
+    @fast.get("/after/accounts", response_model=List[InstagramAccount])
+    async def accounts_after():
+        return account_rows
+
+    app.mount("/fast", fast)
+    return app
+
+def measure(client: TestClient, path: str) -> tuple:
+    client.get(path)  # warm up
+    start = time.process_time()
+    size = 0
+    for _ in range(REQUESTS):
+        size = len(client.get(path).content)
+    return (time.process_time() - start) / REQUESTS * 1000, size
+
+def check_responses(client: TestClient):
+    """The fast paths must serve what the validated paths would (compared as models:
+    the raw documents keep "+00:00" where pydantic writes "Z")"""
+    validated = [GrowthPlan(**row) for row in client.get("/before/growth-plans").json()]
+    assert [GrowthPlan(**row) for row in client.get("/trusted/growth-plans").json()] == validated
+
+    summaries = [GrowthPlanSummary(**row) for row in client.get("/after/growth-plans").json()]
+    assert len(summaries) == ITEMS
+    for summary, plan in zip(summaries, validated):
+        full = plan.model_dump()
+        assert summary.task_count == len(plan.daily_tasks)
+        assert all(value == full[field] for field, value in summary.model_dump().items() if field in full)
+
+    accounts = client.get("/fast/after/accounts").json()
+    # The projection drops the OAuth token; the model default fills in null
+    assert all(row.get("access_token") is None for row in accounts)
+    expected = [a.model_dump(exclude={"access_token", "token_expires_at"}) for a in (InstagramAccount(**row) for row in client.get("/before/accounts").json())]
+    assert [InstagramAccount(**row).model_dump(exclude={"access_token", "token_expires_at"}) for row in accounts] == expected
+
+def main():
+    client = TestClient(build_app())
+    check_responses(client)
+    print(f"{ITEMS}-item lists, {REQUESTS} requests each (CPU per request includes the test client round trip)")
+    results = {}
+    for path in ("/before/growth-plans", "/trusted/growth-plans", "/after/growth-plans", "/before/accounts", "/fast/after/accounts"):
+        cpu, size = measure(client, path)
+        results[path] = (cpu, size)
+        print(f"  {path:<24} {cpu:7.2f} ms  {size / 1024:7.1f} KB")
+
+    for before, after in (("/before/growth-plans", "/after/growth-plans"), ("/before/accounts", "/fast/after/accounts")):
+        assert results[after][0] < results[before][0], f"{after} is not faster than {before}"
+        assert results[after][1] < results[before][1], f"{after} is not smaller than {before}"
+    assert results["/trusted/growth-plans"][0] < results["/before/growth-plans"][0], "skipping validation did not help"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Test Suite for Background Services:
+- User deletion cascade (admin delete -> job progress -> account gone)
+- Data deletion requests (confirmation required before anything is scheduled)
+- Log retention archive (archived days and replay of one day)
+- Notification unread counters
+"""
+import pytest
+import requests
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+ADMIN_CREDS = {
+    "email": "superadmin@instagrowth.com",
+    "password": "SuperAdmin123!",
+    "admin_code": "INSTAGROWTH_ADMIN_2024"
+}
+TEST_PASSWORD = "TestPassword123!"
+JOB_TIMEOUT = 30
+
+
+def register_user(session: requests.Session) -> dict:
+    """Register a throwaway user; returns {email, token, user}"""
+    email = f"test_bg_{uuid.uuid4().hex[:8]}@example.com"
+    response = session.post(f"{BASE_URL}/api/auth/register", json={
+        "email": email,
+        "password": TEST_PASSWORD,
+        "name": "Background Test"
+    })
+    if response.status_code != 200:
+        pytest.skip(f"User registration failed: {response.status_code}")
+    data = response.json()
+    session.headers.update({"Authorization": f"Bearer {data['token']}"})
+    return {"email": email, **data}
+
+
+def admin_login(session: requests.Session):
+    response = session.post(f"{BASE_URL}/api/admin-panel/auth/login", params=ADMIN_CREDS)
+    if response.status_code != 200 or not response.json().get("token"):
+        pytest.skip("Admin login failed or requires 2FA")
+    session.headers.update({"Authorization": f"Bearer {response.json()['token']}"})
+
+
+class TestDeletionCascade:
+    """Admin user deletion runs as a background cascade job"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.admin = requests.Session()
+        admin_login(self.admin)
+        self.user_session = requests.Session()
+        self.user = register_user(self.user_session)
+
+    def wait_for_job(self, job_id: str) -> dict:
+        deadline = time.time() + JOB_TIMEOUT
+        while time.time() < deadline:
+            response = self.admin.get(f"{BASE_URL}/api/admin-panel/deletion-jobs/{job_id}")
+            assert response.status_code == 200
+            job = response.json()
+            if job["status"] in ("completed", "failed", "cancelled"):
+                return job
+            time.sleep(0.5)
+        pytest.fail(f"Deletion job {job_id} did not finish within {JOB_TIMEOUT}s")
+
+    def test_delete_user_cascades(self):
+        """Deleting a user removes the account and reports per-collection progress"""
+        user_id = self.user["user"]["user_id"]
+        # Registration queues a welcome notification; let the writer flush it first
+        deadline = time.time() + 5
+        while not self.user_session.get(f"{BASE_URL}/api/notifications").json() and time.time() < deadline:
+            time.sleep(0.25)
+
+        response = self.admin.delete(f"{BASE_URL}/api/admin-panel/users/{user_id}")
+        assert response.status_code == 200
+        job_id = response.json()["job_id"]
+        assert job_id
+
+        job = self.wait_for_job(job_id)
+        assert job["status"] == "completed", job
+        assert job["progress"].get("notifications", 0) >= 1
+
+        login = requests.post(f"{BASE_URL}/api/auth/login", json={"email": self.user["email"], "password": TEST_PASSWORD})
+        assert login.status_code == 401
+
+        details = self.admin.get(f"{BASE_URL}/api/admin-panel/users/{user_id}")
+        assert details.status_code == 404
+        print(f"✅ Deletion job {job_id} completed: {job['progress']}")
+
+    def test_unknown_job_returns_404(self):
+        response = self.admin.get(f"{BASE_URL}/api/admin-panel/deletion-jobs/job_does_not_exist")
+        assert response.status_code == 404
+        print("✅ Unknown deletion job returns 404")
+
+    def test_cancel_completed_job_rejected(self):
+        """Only queued jobs can be cancelled"""
+        user_id = self.user["user"]["user_id"]
+        job_id = self.admin.delete(f"{BASE_URL}/api/admin-panel/users/{user_id}").json()["job_id"]
+        self.wait_for_job(job_id)
+
+        response = self.admin.post(f"{BASE_URL}/api/admin-panel/deletion-jobs/{job_id}/cancel")
+        assert response.status_code == 400
+        print("✅ Finished deletion job cannot be cancelled")
+
+
+class TestDataDeletionRequest:
+    """Public data deletion requests wait for email confirmation"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.user_session = requests.Session()
+        self.user = register_user(self.user_session)
+
+    def test_anonymous_request_awaits_confirmation(self):
+        """A request for someone else's email schedules nothing"""
+        response = requests.post(f"{BASE_URL}/api/auth/data-deletion-request", json={"email": self.user["email"]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "awaiting_confirmation"
+        assert data["deletion_id"]
+
+        time.sleep(2)
+        login = requests.post(f"{BASE_URL}/api/auth/login", json={"email": self.user["email"], "password": TEST_PASSWORD})
+        assert login.status_code == 200
+        print("✅ Unconfirmed deletion request left the account intact")
+
+    def test_invalid_confirm_token_rejected(self):
+        response = requests.post(f"{BASE_URL}/api/auth/data-deletion-confirm", params={"token": "not-a-token"})
+        assert response.status_code == 400
+        print("✅ Invalid confirmation token rejected")
+
+
+class TestRetentionArchive:
+    """Archived admin and email logs can be listed by day and replayed"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.admin = requests.Session()
+        admin_login(self.admin)
+
+    @pytest.mark.parametrize("path", ["/api/admin-panel/logs/archive", "/api/email-automation/logs/archive"])
+    def test_archive_days_and_replay(self, path):
+        response = self.admin.get(f"{BASE_URL}{path}")
+        assert response.status_code == 200
+        days = response.json()["days"]
+        assert [d["day"] for d in days] == sorted((d["day"] for d in days), reverse=True)
+        if not days:
+            print(f"✅ {path}: no archived days yet")
+            return
+
+        newest = days[0]
+        response = self.admin.get(f"{BASE_URL}{path}", params={"day": newest["day"]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["day"] == newest["day"]
+        assert data["total"] == len(data["logs"]) == newest["count"]
+        print(f"✅ {path}: replayed {data['total']} logs of {newest['day']}")
+
+    def test_archive_day_without_chunks_is_empty(self):
+        response = self.admin.get(f"{BASE_URL}/api/admin-panel/logs/archive", params={"day": "1970-01-01"})
+        assert response.status_code == 200
+        assert response.json() == {"day": "1970-01-01", "logs": [], "total": 0}
+        print("✅ Unarchived day replays as empty")
+
+    def test_archive_requires_admin(self):
+        response = requests.get(f"{BASE_URL}/api/admin-panel/logs/archive")
+        assert response.status_code in (401, 403)
+        print("✅ Archive requires admin authentication")
+
+
+class TestArchiveChunks:
+    """Archive chunk encoding round-trips (no server needed)"""
+
+    def test_encode_decode_round_trip(self):
+        from services.retention import _encode_chunk, _decode_chunk
+
+        records = [
+            {"log_id": f"log_{i}", "action": "update_user", "details": {"n": i, "note": "ünïcode"}, "created_at": f"2024-05-01T00:00:{i:02d}+00:00"}
+            for i in range(50)
+        ]
+        encoded = _encode_chunk(records)
+        assert isinstance(encoded, bytes)
+        assert _decode_chunk(encoded) == records
+        print(f"✅ {len(records)} records round-trip through a {len(encoded)}-byte chunk")
+
+
+class TestNotificationCounters:
+    """Unread badge count stays in step with the notifications themselves"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.session = requests.Session()
+        self.user = register_user(self.session)
+
+    def unread_count(self) -> int:
+        response = self.session.get(f"{BASE_URL}/api/notifications/unread-count")
+        assert response.status_code == 200
+        return response.json()["count"]
+
+    def unread_notifications(self) -> list:
+        response = self.session.get(f"{BASE_URL}/api/notifications")
+        assert response.status_code == 200
+        return [n for n in response.json() if not n["read"]]
+
+    def wait_for_welcome(self) -> list:
+        """Notifications are written by a batching writer, so allow a flush interval"""
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            unread = self.unread_notifications()
+            if unread:
+                return unread
+            time.sleep(0.25)
+        pytest.fail("Welcome notification was never written")
+
+    def test_counter_matches_unread(self):
+        unread = self.wait_for_welcome()
+        assert self.unread_count() == len(unread)
+        print(f"✅ Unread counter matches {len(unread)} unread notifications")
+
+    def test_mark_read_decrements(self):
+        unread = self.wait_for_welcome()
+        before = self.unread_count()
+
+        response = self.session.put(f"{BASE_URL}/api/notifications/{unread[0]['notification_id']}/read")
+        assert response.status_code == 200
+        assert self.unread_count() == before - 1
+
+        # Marking it again must not decrement twice
+        self.session.put(f"{BASE_URL}/api/notifications/{unread[0]['notification_id']}/read")
+        assert self.unread_count() == before - 1
+        print("✅ Marking read decrements the counter once")
+
+    def test_read_all_resets_counter(self):
+        self.wait_for_welcome()
+
+        response = self.session.put(f"{BASE_URL}/api/notifications/read-all")
+        assert response.status_code == 200
+        assert self.unread_count() == 0
+        assert self.unread_notifications() == []
+
+        # Never goes negative
+        self.session.put(f"{BASE_URL}/api/notifications/read-all")
+        assert self.unread_count() == 0
+        print("✅ Read-all resets the counter to 0")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
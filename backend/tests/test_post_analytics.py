@@ -0,0 +1,138 @@
+"""
+Unit tests for services.post_analytics (no server needed):
+- Hour-of-week slots (epoch was a Thursday)
+- Posting cadence (n posts span n - 1 gaps)
+- MAD outliers
+- Unknown media types
+"""
+import pytest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.post_analytics import (  # noqa: E402
+    MEDIA_TYPES, analyze_posts, hour_of_week, posting_cadence, to_columns, _outliers
+)
+
+# Monday 2024-01-01 and the four following posts, two days apart
+CADENCE_POSTS = [
+    {"id": f"cad_{i}", "media_type": "IMAGE", "like_count": 100, "comments_count": 10,
+     "timestamp": f"2024-01-{1 + 2 * i:02d}T18:00:00+0000", "caption": "Morning run #fitness"}
+    for i in range(5)
+]
+
+# Eight ordinary posts and one that went viral
+OUTLIER_POSTS = [
+    {"id": f"out_{i}", "media_type": "VIDEO", "like_count": likes, "comments_count": 0,
+     "timestamp": f"2024-02-{i + 1:02d}T12:00:00+0000"}
+    for i, likes in enumerate([10, 11, 12, 10, 11, 12, 10, 11, 500])
+]
+
+MIXED_POSTS = [
+    {"id": "mix_image", "media_type": "IMAGE", "like_count": 40, "comments_count": 2, "timestamp": "2024-03-04T09:00:00+0000"},
+    {"id": "mix_album", "media_type": "CAROUSEL_ALBUM", "like_count": 60, "comments_count": 4, "timestamp": "2024-03-05T09:00:00+0000"},
+    {"id": "mix_reel", "media_type": "REEL", "like_count": 900, "comments_count": 30, "timestamp": "2024-03-06T09:00:00+0000"},
+    {"id": "mix_reel_2", "media_type": "REEL", "like_count": 700, "comments_count": 20, "timestamp": "2024-03-07T09:00:00+0000"},
+]
+
+
+class TestHourOfWeek:
+    """Slots count from Monday 00:00 UTC"""
+
+    def test_epoch_is_thursday(self):
+        assert hour_of_week(np.array([0.0])).tolist() == [72]
+        print("✅ 1970-01-01 00:00 UTC maps to slot 72 (Thursday)")
+
+    def test_monday_midnight_and_sunday_last_hour(self):
+        cols = to_columns([
+            {"timestamp": "2024-01-01T00:00:00+0000"},
+            {"timestamp": "2024-01-07T23:00:00+0000"},
+        ])
+        assert hour_of_week(cols.timestamps).tolist() == [0, 167]
+        print("✅ Monday 00:00 is slot 0 and Sunday 23:00 is slot 167")
+
+    def test_unknown_timestamp(self):
+        cols = to_columns([{"timestamp": None}, {"timestamp": "not a date"}])
+        assert hour_of_week(cols.timestamps).tolist() == [-1, -1]
+        print("✅ Unknown timestamps map to -1")
+
+
+class TestPostingCadence:
+    """Posting frequency is measured over the gaps between posts"""
+
+    def test_n_posts_span_n_minus_one_gaps(self):
+        cadence = posting_cadence(to_columns(CADENCE_POSTS).timestamps)
+        # 4 gaps over 8 days; counting 5 posts would report 4.4
+        assert cadence["posts_per_week"] == 3.5
+        assert cadence["avg_days_between_posts"] == 2.0
+        assert cadence["median_days_between_posts"] == 2.0
+        assert cadence["posting_frequency"] == "Several times a week"
+        assert sum(cadence["weekly_post_counts"]) == len(CADENCE_POSTS)
+        print(f"✅ {len(CADENCE_POSTS)} posts: {cadence['posts_per_week']} posts/week")
+
+    def test_order_does_not_matter(self):
+        forward = posting_cadence(to_columns(CADENCE_POSTS).timestamps)
+        backward = posting_cadence(to_columns(CADENCE_POSTS[::-1]).timestamps)
+        assert forward == backward
+        print("✅ Cadence is independent of the media order")
+
+    @pytest.mark.parametrize("posts", [[], CADENCE_POSTS[:1], [{"timestamp": None}, {"timestamp": None}]])
+    def test_fewer_than_two_known_posts(self, posts):
+        cadence = posting_cadence(to_columns(posts).timestamps)
+        assert cadence["posting_frequency"] == "Unknown"
+        assert cadence["posts_per_week"] is None
+        print("✅ Fewer than two dated posts give an unknown cadence")
+
+
+class TestOutliers:
+    """Robust z-score on the median absolute deviation"""
+
+    def test_viral_post_flagged_high(self):
+        flagged = _outliers(to_columns(OUTLIER_POSTS), OUTLIER_POSTS)
+        assert [p["id"] for p in flagged] == ["out_8"]
+        assert flagged[0]["direction"] == "high"
+        assert flagged[0]["z_score"] > 3.5
+        assert flagged[0]["engagement"] == 500
+        print(f"✅ Viral post flagged with z={flagged[0]['z_score']}")
+
+    def test_identical_engagement_has_no_outliers(self):
+        flagged = _outliers(to_columns(CADENCE_POSTS), CADENCE_POSTS)
+        assert flagged == []
+        print("✅ Zero MAD flags nothing")
+
+
+class TestAnalyzePosts:
+    """Full analysis over a media list"""
+
+    def test_empty(self):
+        assert analyze_posts([]) == {}
+        print("✅ No posts give an empty analysis")
+
+    def test_unknown_media_type(self):
+        analysis = analyze_posts(MIXED_POSTS, follower_count=1000)
+        assert analysis["total_posts_analyzed"] == 4
+        assert analysis["post_types"] == {"IMAGE": 1, "VIDEO": 0, "CAROUSEL_ALBUM": 1, "REEL": 2}
+        # Per-type engagement covers the known types only
+        assert analysis["type_engagement"] == {"IMAGE": 42.0, "CAROUSEL_ALBUM": 64.0}
+        assert "REEL" not in MEDIA_TYPES
+        assert analysis["best_performing_post"]["id"] == "mix_reel"
+        assert analysis["best_performing_post"]["type"] == "REEL"
+        assert analysis["worst_performing_post"]["type"] == "IMAGE"
+        print(f"✅ Unknown media types counted: {analysis['post_types']}")
+
+    def test_totals_and_rate(self):
+        analysis = analyze_posts(CADENCE_POSTS, follower_count=1000)
+        assert analysis["total_likes"] == 500
+        assert analysis["total_comments"] == 50
+        assert analysis["avg_engagement"] == 110.0
+        assert analysis["engagement_rate"] == 11.0
+        assert analysis["uses_hashtags"] is True
+        assert {(s["hour"], s["avg_engagement"]) for s in analysis["best_time_slots"]} == {(18, 110.0)}
+        print("✅ Totals, engagement rate and time slots computed")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,277 @@
+"""
+Unit tests for pure service helpers (no server needed):
+- Keyset pagination cursors and filters (null sort values)
+- Admin search terms
+- Streaming export encoders (csv / ndjson / columnar, gzip, completion hook)
+- Posting-time slot scores
+- Revenue cohort range
+"""
+import pytest
+import asyncio
+import csv
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from io import StringIO
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException  # noqa: E402
+
+from services import exports  # noqa: E402
+from services.pagination import decode_cursor, encode_cursor, keyset_filter  # noqa: E402
+from services.posting_times import score_slots  # noqa: E402
+from services.revenue import cohort_start_month  # noqa: E402
+from services.search import MAX_PREFIX, build_search_terms  # noqa: E402
+
+EXPORT_FIELDS = ["user_id", "email", "plan"]
+EXPORT_ROWS = [
+    {"user_id": f"user_{i}", "email": f"user{i}@example.com", "plan": "pro" if i % 2 else None, "password_hash": "x"}
+    for i in range(7)
+]
+
+
+class FakeCursor:
+    """Async iterator standing in for a Motor cursor"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+def collect(stream) -> list:
+    async def drain():
+        return [chunk async for chunk in stream]
+    return asyncio.run(drain())
+
+
+class TestKeysetCursor:
+    """Opaque cursors round-trip and are bound to their sort field"""
+
+    @pytest.mark.parametrize("value", ["2024-05-01T00:00:00+00:00", 42, None])
+    def test_round_trip(self, value):
+        cursor = encode_cursor("created_at", value, "user_1")
+        assert "=" not in cursor
+        assert decode_cursor(cursor, "created_at") == (value, "user_1")
+        print(f"✅ Cursor round-trips {value!r}")
+
+    def test_datetime_serialized_as_string(self):
+        moment = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        assert decode_cursor(encode_cursor("created_at", moment, "u"), "created_at") == (str(moment), "u")
+        print("✅ Datetimes are serialized with str()")
+
+    def test_other_sort_rejected(self):
+        cursor = encode_cursor("created_at", 1, "user_1")
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, "email")
+        assert exc.value.status_code == 400
+        print("✅ Cursor issued for another sort is rejected")
+
+    def test_garbage_rejected(self):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor("not-a-cursor!", "created_at")
+        assert exc.value.status_code == 400
+        print("✅ Malformed cursor is rejected")
+
+
+class TestKeysetFilter:
+    """Rows strictly after (sort_value, id); nulls sort before every value"""
+
+    def test_descending_value_includes_null_block(self):
+        assert keyset_filter("last_login", "user_id", -1, "2024-05-01", "user_9") == {"$or": [
+            {"last_login": {"$lt": "2024-05-01"}},
+            {"last_login": "2024-05-01", "user_id": {"$lt": "user_9"}},
+            {"last_login": None},
+        ]}
+        print("✅ Descending pages continue into the null block")
+
+    def test_ascending_value(self):
+        assert keyset_filter("last_login", "user_id", 1, "2024-05-01", "user_9") == {"$or": [
+            {"last_login": {"$gt": "2024-05-01"}},
+            {"last_login": "2024-05-01", "user_id": {"$gt": "user_9"}},
+        ]}
+        print("✅ Ascending pages never return to the null block")
+
+    def test_descending_null_stays_in_null_block(self):
+        assert keyset_filter("last_login", "user_id", -1, None, "user_9") == {
+            "last_login": None, "user_id": {"$lt": "user_9"}
+        }
+        print("✅ Descending page after a null row stays among nulls")
+
+    def test_ascending_null_moves_on_to_values(self):
+        assert keyset_filter("last_login", "user_id", 1, None, "user_9") == {"$or": [
+            {"last_login": None, "user_id": {"$gt": "user_9"}},
+            {"last_login": {"$ne": None}},
+        ]}
+        print("✅ Ascending page after a null row continues into values")
+
+
+class TestSearchTerms:
+    """Prefix terms and exact-word markers"""
+
+    def test_whole_value_and_words(self):
+        terms = build_search_terms({"email": "Jo.Doe@Ex.com"}, ["email"])
+        assert terms == sorted(terms)
+        assert "=jo.doe@ex.com" in terms
+        assert {"jo", "do", "doe", "ex", "co", "com", "jo.doe@ex.c"} <= set(terms)
+        assert {"=jo", "=doe", "=ex", "=com"} <= set(terms)
+        # Prefixes start at two characters
+        assert not [t for t in terms if len(t) < 2]
+        print(f"✅ {len(terms)} terms for an email address")
+
+    def test_accents_and_case_folded(self):
+        terms = build_search_terms({"name": "José Müller"}, ["name"])
+        assert {"jo", "jos", "jose", "=jose", "mu", "muller", "=muller", "=jose muller"} <= set(terms)
+        print("✅ Accents and case are folded")
+
+    def test_missing_and_empty_fields_skipped(self):
+        assert build_search_terms({"name": "", "email": None}, ["name", "email", "username"]) == []
+        print("✅ Missing fields add no terms")
+
+    def test_prefix_length_capped(self):
+        word = "a" * 30
+        terms = build_search_terms({"username": word}, ["username"])
+        prefixes = [t for t in terms if not t.startswith("=")]
+        assert max(len(t) for t in prefixes) == MAX_PREFIX
+        assert f"={word}" in terms
+        print(f"✅ Prefixes stop at {MAX_PREFIX} characters")
+
+
+class TestExportEncoders:
+    """Chunked encoders and the streaming wrapper"""
+
+    def test_csv(self, monkeypatch):
+        monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 3)
+        chunks = collect(exports._csv_chunks(FakeCursor(EXPORT_ROWS), EXPORT_FIELDS))
+        # Header first, then rows in groups of EXPORT_CHUNK_ROWS
+        assert len(chunks) == 1 + 3
+        assert chunks[0] == "user_id,email,plan\r\n"
+        rows = list(csv.DictReader(StringIO("".join(chunks))))
+        assert [r["user_id"] for r in rows] == [r["user_id"] for r in EXPORT_ROWS]
+        assert "password_hash" not in rows[0]
+        assert rows[0]["plan"] == ""
+        print(f"✅ CSV export in {len(chunks)} chunks")
+
+    def test_ndjson(self, monkeypatch):
+        monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 3)
+        chunks = collect(exports._ndjson_chunks(FakeCursor(EXPORT_ROWS), EXPORT_FIELDS))
+        assert len(chunks) == 3
+        lines = [json.loads(line) for line in "".join(chunks).splitlines()]
+        assert lines == [{f: row[f] for f in EXPORT_FIELDS} for row in EXPORT_ROWS]
+        print(f"✅ NDJSON export of {len(lines)} lines")
+
+    def test_columnar(self, monkeypatch):
+        monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 4)
+        groups = [json.loads(c) for c in collect(exports._columnar_chunks(FakeCursor(EXPORT_ROWS), EXPORT_FIELDS))]
+        assert [g["rows"] for g in groups] == [4, 3]
+        assert groups[0]["columns"]["user_id"] == ["user_0", "user_1", "user_2", "user_3"]
+        assert groups[1]["columns"]["plan"] == [None, "pro", None]
+        assert set(groups[0]["columns"]) == set(EXPORT_FIELDS)
+        print("✅ Columnar export in row groups")
+
+    def test_empty_csv_has_header_only(self):
+        assert collect(exports._csv_chunks(FakeCursor([]), EXPORT_FIELDS)) == ["user_id,email,plan\r\n"]
+        print("✅ Empty CSV export is just the header")
+
+    def test_gzip_with_transform_and_completion(self):
+        completed = []
+
+        async def on_complete(count, finished):
+            completed.append((count, finished))
+
+        def transform(doc):
+            return {**doc, "email": doc["email"].upper()}
+
+        stream = exports.stream_export(
+            FakeCursor(EXPORT_ROWS), EXPORT_FIELDS, "ndjson", compress=True, transform=transform, on_complete=on_complete
+        )
+        body = gzip.decompress(b"".join(collect(stream))).decode("utf-8")
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert lines[0]["email"] == "USER0@EXAMPLE.COM"
+        assert len(lines) == len(EXPORT_ROWS)
+        assert completed == [(len(EXPORT_ROWS), True)]
+        print(f"✅ Gzip export decompresses to {len(lines)} rows")
+
+    def test_aborted_stream_reports_unfinished(self, monkeypatch):
+        monkeypatch.setattr(exports, "EXPORT_CHUNK_ROWS", 2)
+        completed = []
+
+        async def on_complete(count, finished):
+            completed.append((count, finished))
+
+        async def read_first_chunk():
+            stream = exports.stream_export(FakeCursor(EXPORT_ROWS), EXPORT_FIELDS, "ndjson", on_complete=on_complete)
+            first = await stream.__anext__()
+            await stream.aclose()
+            return first
+
+        first = asyncio.run(read_first_chunk())
+        assert len(first.splitlines()) == 2
+        assert completed == [(2, False)]
+        print("✅ Aborted download reports the rows sent and finished=False")
+
+
+class TestScoreSlots:
+    """Shrunk, smoothed slot scores"""
+
+    def test_no_data_is_neutral(self):
+        scores, counts = score_slots(None, None)
+        assert scores.shape == counts.shape == (168,)
+        assert np.allclose(scores, 1.0)
+        assert not counts.any()
+        print("✅ Without data every slot scores 1.0")
+
+    def test_strong_slot_ranks_first(self):
+        account = {"posts": 30, "counts": {"40": 20, "100": 10}, "scores": {"40": 40.0, "100": 5.0}}
+        scores, counts = score_slots(account, None)
+        assert int(np.argmax(scores)) == 40
+        assert counts[40] == 20 and counts[100] == 10
+        assert scores[100] < 1.0
+        # Smoothing lifts the neighbouring hours
+        assert scores[39] > 1.0 and scores[41] > 1.0
+        print(f"✅ Slot 40 ranks first with score {scores[40]:.2f}")
+
+    def test_few_posts_shrunk_towards_niche(self):
+        account = {"posts": 1, "counts": {"40": 1}, "scores": {"40": 3.0}}
+        niche = {"posts": 200, "counts": {"10": 200}, "scores": {"10": 400.0}}
+        scores, _ = score_slots(account, niche)
+        # One lucky post does not beat a slot the whole niche agrees on
+        assert scores[10] > scores[40] > 1.0
+        print("✅ A single post is shrunk towards the niche prior")
+
+    def test_smoothing_wraps_around_the_week(self):
+        account = {"posts": 20, "counts": {"0": 20}, "scores": {"0": 60.0}}
+        scores, _ = score_slots(account, None)
+        assert scores[167] > 1.0 and scores[1] > 1.0
+        print("✅ Sunday 23:00 and Monday 00:00 are neighbours")
+
+
+class TestCohortRange:
+    """First month of the signup cohort window"""
+
+    @pytest.mark.parametrize("now,months,expected", [
+        (datetime(2026, 10, 19, tzinfo=timezone.utc), 12, "2025-11"),
+        (datetime(2026, 1, 31, tzinfo=timezone.utc), 12, "2025-02"),
+        (datetime(2026, 12, 1, tzinfo=timezone.utc), 12, "2026-01"),
+        (datetime(2026, 3, 15, tzinfo=timezone.utc), 1, "2026-03"),
+        (datetime(2026, 3, 15, tzinfo=timezone.utc), 3, "2026-01"),
+        (datetime(2026, 3, 15, tzinfo=timezone.utc), 4, "2025-12"),
+        (datetime(2026, 3, 15, tzinfo=timezone.utc), 27, "2024-01"),
+    ])
+    def test_start_month(self, now, months, expected):
+        assert cohort_start_month(now, months) == expected
+        print(f"✅ {months} cohorts ending {now:%Y-%m} start {expected}")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -9,6 +9,8 @@ from collections import defaultdict
 from typing import Optional
 import os
 
+from fastapi.responses import ORJSONResponse
+
 logger = logging.getLogger(__name__)
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default_secret')
@@ -18,6 +20,15 @@ rate_limit_storage = defaultdict(list)
 RATE_LIMIT_WINDOW = 60
 RATE_LIMIT_MAX_REQUESTS = 10
 
+def trusted_response(docs) -> ORJSONResponse:
+    """Serialize documents read with models.response_projection, skipping response_model validation
+
+    Only for collections with a guaranteed shape (one writer that builds the
+    documents from the model), since nothing is validated here. Routes keep
+    their response_model, which still documents the output in the OpenAPI schema.
+    """
+    return ORJSONResponse(docs)
+
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
@@ -65,15 +65,22 @@ const AdminPanelLayout = ({ children }) => {
       wsRef.current.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
-          if (data.type === 'pong' || data.type === 'connection') return;
-          
-          // Add to notifications
+          if (['pong', 'connection', 'subscribed', 'unsubscribed'].includes(data.type)) return;
+
+          // Dashboard counter deltas are applied by the dashboard page, not shown as notifications
+          if (data.type === 'stats_delta') {
+            window.dispatchEvent(new CustomEvent('admin-stats-delta', { detail: data.delta }));
+            return;
+          }
+
+          // Add to notifications (batched frames from high-rate channels become one entry)
+          const isBatch = data.type === 'batch';
           const notification = {
             id: Date.now(),
-            type: data.type,
-            title: data.title || 'Notification',
-            message: data.message || '',
-            priority: data.priority || 'normal',
+            type: isBatch ? data.channel : data.type,
+            title: isBatch ? `${data.count} new ${data.channel}` : (data.title || 'Notification'),
+            message: isBatch ? (data.events?.[data.events.length - 1]?.message || '') : (data.message || ''),
+            priority: isBatch ? 'low' : (data.priority || 'normal'),
             timestamp: new Date().toISOString()
           };
           
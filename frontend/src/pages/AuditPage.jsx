@@ -64,7 +64,7 @@ const AuditPage = ({ auth }) => {
         const data = await response.json();
         setAudits(data);
         if (data.length > 0) {
-          setCurrentAudit(data[0]);
+          selectAudit(data[0].audit_id);
         }
       }
     } catch (error) {
@@ -72,6 +72,20 @@ const AuditPage = ({ auth }) => {
     }
   };
 
+  // The list holds summaries; load the full audit when one is opened
+  const selectAudit = async (auditId) => {
+    try {
+      const response = await fetch(`${API_URL}/api/audits/${auditId}`, {
+        credentials: "include",
+      });
+      if (response.ok) {
+        setCurrentAudit(await response.json());
+      }
+    } catch (error) {
+      console.error("Failed to fetch audit:", error);
+    }
+  };
+
   const generateAudit = async () => {
     if (!selectedAccount) {
       toast.error("Please select an account first");
@@ -327,7 +341,7 @@ const AuditPage = ({ auth }) => {
                   {audits.map((audit) => (
                     <button
                       key={audit.audit_id}
-                      onClick={() => setCurrentAudit(audit)}
+                      onClick={() => selectAudit(audit.audit_id)}
                       className={`w-full p-4 rounded-xl text-left transition-all ${
                         currentAudit?.audit_id === audit.audit_id
                           ? 'bg-indigo-500/10 border border-indigo-500/30'
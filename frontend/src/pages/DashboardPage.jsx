@@ -11,6 +11,7 @@ import DashboardLayout from "../components/DashboardLayout";
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from "recharts";
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
+const WS_URL = API_URL.replace('https://', 'wss://').replace('http://', 'ws://');
 
 const DashboardPage = ({ auth }) => {
   const [stats, setStats] = useState(null);
@@ -24,6 +25,30 @@ const DashboardPage = ({ auth }) => {
     fetchAnnouncements();
   }, []);
 
+  // Live counter updates instead of re-polling /api/dashboard/stats
+  useEffect(() => {
+    const userId = auth.user?.user_id;
+    if (!userId) return;
+    const ws = new WebSocket(`${WS_URL}/api/ws/${userId}`);
+    ws.onmessage = (event) => {
+      try {
+        const data = JSON.parse(event.data);
+        if (data.type !== "stats_delta") return;
+        setStats((prev) => {
+          if (!prev) return prev;
+          const next = { ...prev };
+          Object.entries(data.delta || {}).forEach(([key, value]) => {
+            next[key] = (next[key] || 0) + value;
+          });
+          return next;
+        });
+      } catch (e) {
+        console.error("WebSocket message error:", e);
+      }
+    };
+    return () => ws.close();
+  }, [auth.user?.user_id]);
+
   const fetchStats = async () => {
     try {
       const response = await fetch(`${API_URL}/api/dashboard/stats`, {
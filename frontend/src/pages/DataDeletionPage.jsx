@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { motion } from "framer-motion";
 import { Link, useSearchParams } from "react-router-dom";
 import { Trash2, ArrowLeft, Instagram, AlertTriangle, CheckCircle2, Loader2 } from "lucide-react";
@@ -11,11 +11,37 @@ const API_URL = process.env.REACT_APP_BACKEND_URL;
 const DataDeletionPage = () => {
   const [searchParams] = useSearchParams();
   const confirmationId = searchParams.get("id");
+  const confirmToken = searchParams.get("token");
   
   const [email, setEmail] = useState("");
   const [loading, setLoading] = useState(false);
   const [submitted, setSubmitted] = useState(false);
   const [deletionId, setDeletionId] = useState(confirmationId);
+  const [status, setStatus] = useState(confirmationId ? "pending" : null);
+
+  // Opened from the confirmation email
+  useEffect(() => {
+    if (!confirmToken) return;
+    const confirm = async () => {
+      try {
+        const response = await fetch(
+          `${API_URL}/api/auth/data-deletion-confirm?token=${encodeURIComponent(confirmToken)}`,
+          { method: "POST" }
+        );
+        const data = await response.json();
+        if (!response.ok) {
+          throw new Error(data.detail || "Failed to confirm request");
+        }
+        setDeletionId(data.deletion_id);
+        setStatus(data.status);
+        setSubmitted(true);
+        toast.success("Data deletion confirmed");
+      } catch (error) {
+        toast.error(error.message);
+      }
+    };
+    confirm();
+  }, [confirmToken]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -25,6 +51,7 @@ const DataDeletionPage = () => {
       const response = await fetch(`${API_URL}/api/auth/data-deletion-request`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
+        credentials: "include",
         body: JSON.stringify({ email })
       });
 
@@ -35,8 +62,9 @@ const DataDeletionPage = () => {
 
       const data = await response.json();
       setDeletionId(data.deletion_id);
+      setStatus(data.status);
       setSubmitted(true);
-      toast.success("Data deletion request submitted");
+      toast.success(data.message);
     } catch (error) {
       toast.error(error.message);
     } finally {
@@ -97,7 +125,9 @@ const DataDeletionPage = () => {
                 <p className="text-xl font-mono text-green-400">{deletionId}</p>
               </div>
               <p className="text-white/50 text-sm mt-4">
-                Please save this ID for your records. Your data will be deleted within 30 days.
+                {status === "awaiting_confirmation"
+                  ? "We sent a confirmation link to your email. Nothing is deleted until you open it."
+                  : "Please save this ID for your records. Your data will be deleted within 30 days."}
               </p>
             </div>
           ) : (
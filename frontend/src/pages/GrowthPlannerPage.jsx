@@ -59,7 +59,7 @@ const GrowthPlannerPage = ({ auth }) => {
         const data = await response.json();
         setPlans(data);
         if (data.length > 0) {
-          setCurrentPlan(data[0]);
+          selectPlan(data[0].plan_id);
         }
       }
     } catch (error) {
@@ -67,6 +67,19 @@ const GrowthPlannerPage = ({ auth }) => {
     }
   };
 
+  // The list holds summaries; load the full plan (with daily tasks) when one is opened
+  const selectPlan = async (planId) => {
+    try {
+      const response = await fetch(`${API_URL}/api/growth-plans/${planId}`, { credentials: "include" });
+      if (response.ok) {
+        setCurrentPlan(await response.json());
+        setCompletedTasks(new Set());
+      }
+    } catch (error) {
+      console.error("Failed to fetch plan:", error);
+    }
+  };
+
   const generatePlan = async () => {
     if (!selectedAccount) {
       toast.error("Please select an account first");
@@ -92,7 +105,7 @@ const GrowthPlannerPage = ({ auth }) => {
 
       const plan = await response.json();
       setCurrentPlan(plan);
-      setPlans([plan, ...plans]);
+      setPlans([{ ...plan, task_count: plan.daily_tasks?.length || 0 }, ...plans]);
       setCompletedTasks(new Set());
       toast.success(`${duration}-day growth plan created!`);
     } catch (error) {
@@ -360,10 +373,7 @@ const GrowthPlannerPage = ({ auth }) => {
                   {plans.map((plan) => (
                     <button
                       key={plan.plan_id}
-                      onClick={() => {
-                        setCurrentPlan(plan);
-                        setCompletedTasks(new Set());
-                      }}
+                      onClick={() => selectPlan(plan.plan_id)}
                       className={`w-full p-4 rounded-xl text-left transition-all ${
                         currentPlan?.plan_id === plan.plan_id
                           ? 'bg-indigo-500/10 border border-indigo-500/30'
@@ -373,7 +383,7 @@ const GrowthPlannerPage = ({ auth }) => {
                       <div className="flex items-center justify-between mb-1">
                         <span className="font-medium text-white">{plan.duration}-Day Plan</span>
                         <Badge variant="outline" className="text-xs bg-white/5 border-white/10 text-white/60">
-                          {plan.daily_tasks?.length || 0} tasks
+                          {plan.task_count || 0} tasks
                         </Badge>
                       </div>
                       <span className="text-xs text-white/40">
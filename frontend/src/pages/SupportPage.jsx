@@ -112,6 +112,27 @@ const SupportPage = ({ auth }) => {
     }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!selectedTicket?.messages_cursor) return;
+    try {
+      const response = await fetch(
+        `${API_URL}/api/support/tickets/${selectedTicket.ticket_id}/messages?cursor=${encodeURIComponent(selectedTicket.messages_cursor)}`,
+        { credentials: "include" }
+      );
+      if (response.ok) {
+        const page = await response.json();
+        setSelectedTicket(prev => ({
+          ...prev,
+          messages: [...page.messages, ...prev.messages],
+          messages_cursor: page.messages_cursor,
+          has_more_messages: page.has_more_messages
+        }));
+      }
+    } catch (error) {
+      toast.error("Failed to load messages");
+    }
+  };
+
   const sendReply = async () => {
     if (!replyText.trim()) return;
     setSubmitting(true);
@@ -208,7 +229,15 @@ const SupportPage = ({ auth }) => {
             </div>
 
             <div className="p-6 space-y-4 max-h-96 overflow-y-auto">
-              {selectedTicket.messages.map((msg, idx) => (
+              {selectedTicket.has_more_messages && (
+                <button
+                  onClick={loadEarlierMessages}
+                  className="w-full text-sm text-indigo-400 hover:text-indigo-300"
+                >
+                  Load earlier messages
+                </button>
+              )}
+              {(selectedTicket.messages || []).map((msg, idx) => (
                 <div
                   key={idx}
                   className={`p-4 rounded-xl ${
@@ -385,7 +414,7 @@ const SupportPage = ({ auth }) => {
                     </div>
                     <h3 className="font-semibold text-white">{ticket.subject}</h3>
                     <p className="text-white/50 text-sm mt-1">
-                      {ticket.category} • {ticket.messages?.length || 1} messages
+                      {ticket.category} • {ticket.message_count || 1} messages
                     </p>
                   </div>
                   <div className="text-right">
@@ -17,6 +17,9 @@ import { toast } from "sonner";
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
+// Uploaded logos are served from the asset store at /api/assets/<hash>
+const logoSrc = (url) => (url && url.startsWith("/api/") ? `${API_URL}${url}` : url);
+
 const TeamPage = ({ auth }) => {
   const [searchParams] = useSearchParams();
   const navigate = useNavigate();
@@ -313,7 +316,7 @@ const TeamPage = ({ auth }) => {
                         <Label className="text-white/70 mb-2 block">Team Logo</Label>
                         <div className="flex items-center gap-4">
                           <Avatar className="w-16 h-16">
-                            <AvatarImage src={currentTeam.logo_url} />
+                            <AvatarImage src={logoSrc(currentTeam.logo_url)} />
                             <AvatarFallback className="bg-indigo-500 text-white text-xl">
                               {currentTeam.name?.charAt(0)}
                             </AvatarFallback>
@@ -467,7 +470,7 @@ const TeamPage = ({ auth }) => {
             <div className="p-6 rounded-2xl bg-gradient-to-br from-indigo-600/20 to-purple-600/20 border border-indigo-500/20">
               <div className="flex items-center gap-4 mb-6">
                 <Avatar className="w-16 h-16">
-                  <AvatarImage src={currentTeam?.logo_url} />
+                  <AvatarImage src={logoSrc(currentTeam?.logo_url)} />
                   <AvatarFallback className="bg-indigo-500 text-white text-2xl">
                     {currentTeam?.name?.charAt(0)}
                   </AvatarFallback>
@@ -20,6 +20,22 @@ const AdminDashboardPage = ({ admin }) => {
     fetchDashboardData();
   }, []);
 
+  // Apply live counter deltas pushed over the admin WebSocket
+  useEffect(() => {
+    const applyDelta = (event) => {
+      setStats(prev => {
+        if (!prev) return prev;
+        const next = { ...prev };
+        Object.entries(event.detail || {}).forEach(([key, value]) => {
+          next[key] = (next[key] || 0) + value;
+        });
+        return next;
+      });
+    };
+    window.addEventListener('admin-stats-delta', applyDelta);
+    return () => window.removeEventListener('admin-stats-delta', applyDelta);
+  }, []);
+
   const fetchDashboardData = async () => {
     const token = localStorage.getItem('admin_panel_token');
     const headers = { 'Authorization': `Bearer ${token}` };
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { FileText, Search, Filter, ChevronLeft, ChevronRight, Loader2, User, Settings, CreditCard, Shield } from 'lucide-react';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
@@ -8,6 +8,11 @@ const LogsPage = ({ admin }) => {
   const [total, setTotal] = useState(0);
   const [loading, setLoading] = useState(true);
   const [page, setPage] = useState(0);
+  // cursors[n] is the keyset cursor that opens page n
+  const [cursors, setCursors] = useState([null]);
+  // Only the latest request may update the list and cursors
+  const latestRequest = useRef(0);
+  const [hasMore, setHasMore] = useState(false);
   const [actionFilter, setActionFilter] = useState('');
   const [typeFilter, setTypeFilter] = useState('');
   const limit = 50;
@@ -15,27 +20,44 @@ const LogsPage = ({ admin }) => {
   const token = localStorage.getItem('admin_panel_token');
   const headers = { 'Authorization': `Bearer ${token}` };
 
+  // Filter changes restart paging in the same update as the filter itself
+  const resetPaging = () => {
+    setCursors([null]);
+    setPage(0);
+  };
+
   useEffect(() => {
     fetchLogs();
   }, [page, actionFilter, typeFilter]);
 
   const fetchLogs = async () => {
+    const requestId = ++latestRequest.current;
     setLoading(true);
     try {
-      let url = `${API_URL}/api/admin-panel/logs?skip=${page * limit}&limit=${limit}`;
+      let url = `${API_URL}/api/admin-panel/logs?limit=${limit}`;
+      url += cursors[page] ? `&cursor=${encodeURIComponent(cursors[page])}` : `&skip=${page * limit}`;
       if (actionFilter) url += `&action=${actionFilter}`;
       if (typeFilter) url += `&target_type=${typeFilter}`;
 
       const response = await fetch(url, { credentials: 'include', headers });
+      if (requestId !== latestRequest.current) return;
       if (response.ok) {
         const data = await response.json();
         setLogs(data.logs || []);
         setTotal(data.total || 0);
+        setHasMore(!!data.has_more);
+        if (data.next_cursor) {
+          setCursors(prev => {
+            const next = prev.slice(0, page + 1);
+            next[page + 1] = data.next_cursor;
+            return next;
+          });
+        }
       }
     } catch (error) {
       console.error('Failed to fetch logs:', error);
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) setLoading(false);
     }
   };
 
@@ -64,7 +86,7 @@ const LogsPage = ({ admin }) => {
       <div className="flex flex-col md:flex-row gap-4">
         <select
           value={actionFilter}
-          onChange={(e) => { setActionFilter(e.target.value); setPage(0); }}
+          onChange={(e) => { setActionFilter(e.target.value); resetPaging(); }}
           className="px-4 py-2.5 bg-[#1e293b] border border-white/10 rounded-lg text-white focus:border-indigo-500 focus:outline-none"
         >
           <option value="">All Actions</option>
@@ -78,7 +100,7 @@ const LogsPage = ({ admin }) => {
         </select>
         <select
           value={typeFilter}
-          onChange={(e) => { setTypeFilter(e.target.value); setPage(0); }}
+          onChange={(e) => { setTypeFilter(e.target.value); resetPaging(); }}
           className="px-4 py-2.5 bg-[#1e293b] border border-white/10 rounded-lg text-white focus:border-indigo-500 focus:outline-none"
         >
           <option value="">All Types</option>
@@ -163,7 +185,7 @@ const LogsPage = ({ admin }) => {
             </button>
             <button
               onClick={() => setPage(page + 1)}
-              disabled={(page + 1) * limit >= total}
+              disabled={!hasMore}
               className="p-2 text-white/50 hover:text-white hover:bg-white/10 rounded-lg disabled:opacity-30"
             >
               <ChevronRight className="w-5 h-5" />
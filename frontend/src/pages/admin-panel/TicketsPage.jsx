@@ -67,6 +67,27 @@ const TicketsPage = () => {
     }
   };
 
+  const loadEarlierMessages = async () => {
+    if (!selectedTicket?.messages_cursor) return;
+    try {
+      const response = await fetch(
+        `${API_URL}/api/admin-panel/tickets/${selectedTicket.ticket_id}/messages?cursor=${encodeURIComponent(selectedTicket.messages_cursor)}`,
+        { headers }
+      );
+      if (response.ok) {
+        const page = await response.json();
+        setSelectedTicket(prev => ({
+          ...prev,
+          messages: [...page.messages, ...prev.messages],
+          messages_cursor: page.messages_cursor,
+          has_more_messages: page.has_more_messages
+        }));
+      }
+    } catch (error) {
+      toast.error('Failed to load messages');
+    }
+  };
+
   const sendReply = async () => {
     if (!replyText.trim()) return;
     setSubmitting(true);
@@ -311,6 +332,14 @@ const TicketsPage = () => {
 
               {/* Messages */}
               <div className="p-5 space-y-4 max-h-80 overflow-y-auto">
+                {selectedTicket.has_more_messages && (
+                  <button
+                    onClick={loadEarlierMessages}
+                    className="w-full text-sm text-indigo-400 hover:text-indigo-300"
+                  >
+                    Load earlier messages
+                  </button>
+                )}
                 {selectedTicket.messages?.map((msg, idx) => (
                   <div
                     key={idx}
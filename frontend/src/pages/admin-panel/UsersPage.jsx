@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Search, Filter, MoreHorizontal, Eye, Edit, Key, Ban, 
   Trash2, Download, ChevronLeft, ChevronRight, Loader2,
@@ -15,6 +15,11 @@ const UsersPage = ({ admin }) => {
   const [search, setSearch] = useState('');
   const [planFilter, setPlanFilter] = useState('');
   const [page, setPage] = useState(0);
+  // cursors[n] is the keyset cursor that opens page n
+  const [cursors, setCursors] = useState([null]);
+  // Only the latest request may update the list and cursors
+  const latestRequest = useRef(0);
+  const [hasMore, setHasMore] = useState(false);
   const [selectedUser, setSelectedUser] = useState(null);
   const [showUserModal, setShowUserModal] = useState(false);
   const [actionLoading, setActionLoading] = useState(false);
@@ -23,27 +28,44 @@ const UsersPage = ({ admin }) => {
   const token = localStorage.getItem('admin_panel_token');
   const headers = { 'Authorization': `Bearer ${token}` };
 
+  // Filter changes restart paging in the same update as the filter itself
+  const resetPaging = () => {
+    setCursors([null]);
+    setPage(0);
+  };
+
   useEffect(() => {
     fetchUsers();
   }, [page, search, planFilter]);
 
   const fetchUsers = async () => {
+    const requestId = ++latestRequest.current;
     setLoading(true);
     try {
-      let url = `${API_URL}/api/admin-panel/users?skip=${page * limit}&limit=${limit}`;
+      let url = `${API_URL}/api/admin-panel/users?limit=${limit}`;
+      url += cursors[page] ? `&cursor=${encodeURIComponent(cursors[page])}` : `&skip=${page * limit}`;
       if (search) url += `&search=${encodeURIComponent(search)}`;
       if (planFilter) url += `&plan=${planFilter}`;
 
       const response = await fetch(url, { credentials: 'include', headers });
+      if (requestId !== latestRequest.current) return;
       if (response.ok) {
         const data = await response.json();
         setUsers(data.users || []);
         setTotal(data.total || 0);
+        setHasMore(!!data.has_more);
+        if (data.next_cursor) {
+          setCursors(prev => {
+            const next = prev.slice(0, page + 1);
+            next[page + 1] = data.next_cursor;
+            return next;
+          });
+        }
       }
     } catch (error) {
       toast.error('Failed to fetch users');
     } finally {
-      setLoading(false);
+      if (requestId === latestRequest.current) setLoading(false);
     }
   };
 
@@ -192,14 +214,14 @@ const UsersPage = ({ admin }) => {
           <input
             type="text"
             value={search}
-            onChange={(e) => { setSearch(e.target.value); setPage(0); }}
+            onChange={(e) => { setSearch(e.target.value); resetPaging(); }}
             placeholder="Search users..."
             className="w-full pl-11 pr-4 py-2.5 bg-[#1e293b] border border-white/10 rounded-lg text-white placeholder-white/30 focus:border-indigo-500 focus:outline-none"
           />
         </div>
         <select
           value={planFilter}
-          onChange={(e) => { setPlanFilter(e.target.value); setPage(0); }}
+          onChange={(e) => { setPlanFilter(e.target.value); resetPaging(); }}
           className="px-4 py-2.5 bg-[#1e293b] border border-white/10 rounded-lg text-white focus:border-indigo-500 focus:outline-none"
         >
           <option value="">All Plans</option>
@@ -302,7 +324,7 @@ const UsersPage = ({ admin }) => {
             </button>
             <button
               onClick={() => setPage(page + 1)}
-              disabled={(page + 1) * limit >= total}
+              disabled={!hasMore}
               className="p-2 text-white/50 hover:text-white hover:bg-white/10 rounded-lg disabled:opacity-30"
             >
               <ChevronRight className="w-5 h-5" />